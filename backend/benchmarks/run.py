@@ -0,0 +1,242 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Reproducible benchmark suite for the CSV pipeline.
+#
+#   cd backend
+#   python -m benchmarks.run                          # 1k,10k,100k,1m rows
+#   python -m benchmarks.run --sizes 10k,10m --repeat 5
+#   python -m benchmarks.run --check                  # exit 1 on regressions
+#   python -m benchmarks.run --update-baseline        # store a new baseline
+#
+# Inputs come from core.synthetic (seeded, TopStepX schema). Each size runs in
+# a fresh process so its peak RSS is not inflated by earlier sizes; the
+# result cache is disabled there so every repeat does the full work.
+#
+# Timed stages (median of --repeat runs):
+#   detect_formats       parse plan from the sample rows (uncached)
+#   read_csv             pl.read_csv of the raw export with the plan's projection and overrides
+#   normalize            normalize_trades on the parsed frame
+#   load_trades          read + normalize, as process_csv does it
+#   calculate_stats      stats payload
+#   prepare_charts_data  chart series
+#   build_results        stats + charts sharing the daily aggregate
+#   make_response        response dict including the trade rows
+#   encode_json          serialization of that response
+#   process_csv          end to end, without serialization
+#   upload               POST /upload through FastAPI's test client
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = "1k,10k,100k,1m"
+DEFAULT_TOLERANCE = 0.25
+# Differences below this are noise, whatever the ratio
+NOISE_FLOOR_SECONDS = 0.005
+
+_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    if value and value[-1] in _SUFFIXES:
+        return int(float(value[:-1]) * _SUFFIXES[value[-1]])
+    return int(value)
+
+
+def size_label(rows: int) -> str:
+    for suffix, scale in (("m", 1_000_000), ("k", 1_000)):
+        if rows >= scale and rows % scale == 0:
+            return f"{rows // scale}{suffix}"
+    return str(rows)
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median": statistics.median(samples), "min": min(samples)}
+
+
+def run_case(path: str, rows: int, repeat: int) -> Dict[str, Any]:
+    """Time every stage on one generated export. Runs in its own process."""
+    # Imported here so the settings above apply before anything is created
+    import polars as pl
+    from fastapi.testclient import TestClient
+    from core.encoding import encode_json
+    from core.processor import (SAMPLE_ROWS, build_plan, build_results, calculate_stats, load_trades,
+                                make_response, normalize_trades, prepare_charts_data, process_csv)
+    from main import app
+
+    with open(path, "rb") as f:
+        content = f.read()
+    sample = pl.read_csv(io.BytesIO(content), n_rows=SAMPLE_ROWS, infer_schema=False)
+    plan = build_plan(sample)
+    raw = pl.read_csv(io.BytesIO(content), columns=plan.projection, schema_overrides=plan.overrides)
+    df = load_trades(io.BytesIO(content))
+    results = build_results(df)
+    response = make_response(df, results)
+
+    stages = {
+        "detect_formats": lambda: build_plan(sample),
+        "read_csv": lambda: pl.read_csv(io.BytesIO(content), columns=plan.projection,
+                                        schema_overrides=plan.overrides),
+        "normalize": lambda: normalize_trades(raw.lazy(), plan).collect(),
+        "load_trades": lambda: load_trades(io.BytesIO(content)),
+        "calculate_stats": lambda: calculate_stats(df),
+        "prepare_charts_data": lambda: prepare_charts_data(df),
+        "build_results": lambda: build_results(df),
+        "make_response": lambda: make_response(df, results),
+        "encode_json": lambda: encode_json(response),
+        "process_csv": lambda: process_csv(io.BytesIO(content)),
+    }
+    timings = {name: _time(fn, repeat) for name, fn in stages.items()}
+
+    with TestClient(app) as client:
+        def upload():
+            r = client.post("/upload", files={"file": ("bench.csv", content, "text/csv")})
+            r.raise_for_status()
+        timings["upload"] = _time(upload, repeat)
+
+    for timing in timings.values():
+        timing["rows_per_sec"] = round(rows / timing["median"]) if timing["median"] else None
+        timing["median"] = round(timing["median"], 6)
+        timing["min"] = round(timing["min"], 6)
+    return {
+        "rows": rows,
+        "bytes": len(content),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": timings,
+    }
+
+
+def machine_info() -> Dict[str, Any]:
+    import polars as pl
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Annotate stages with their change vs the baseline; returns regressions."""
+    regressions = []
+    for label, case in results.items():
+        base_case = baseline.get("results", {}).get(label)
+        if not base_case:
+            continue
+        for stage, timing in case["stages"].items():
+            base = base_case["stages"].get(stage)
+            if not base or not base["median"]:
+                continue
+            timing["baseline"] = base["median"]
+            timing["change"] = round(timing["median"] / base["median"] - 1, 3)
+            if (timing["change"] > tolerance
+                    and timing["median"] - base["median"] > NOISE_FLOOR_SECONDS):
+                regressions.append({"size": label, "stage": stage, **timing})
+    return regressions
+
+
+def run(sizes: Sequence[int], repeat: int = 3, seed: int = 0,
+        baseline: Optional[Dict[str, Any]] = None, tolerance: float = DEFAULT_TOLERANCE,
+        progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    from core.synthetic import export_csv
+
+    # Inherited by the per-size processes
+    os.environ["RESULT_CACHE_ENTRIES"] = "0"
+    os.environ.pop("RESULT_CACHE_DIR", None)
+    os.environ.setdefault("UPLOAD_TIMEOUT", "3600")
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        for rows in sizes:
+            label = size_label(rows)
+            path = os.path.join(tmp, f"{label}.csv")
+            export_csv(rows, seed, path=path)
+            if progress:
+                progress(f"{label}: {os.path.getsize(path) / 1e6:.1f} MB")
+            with context.Pool(1) as pool:
+                results[label] = pool.apply(run_case, (path, rows, repeat))
+            os.remove(path)
+
+    report = {"machine": machine_info(), "seed": seed, "repeat": repeat, "results": results}
+    if baseline is not None:
+        if baseline.get("machine") != report["machine"]:
+            report["warning"] = "Baseline was recorded on a different machine or library version"
+        report["regressions"] = compare(results, baseline, tolerance)
+    return report
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    for label, case in report["results"].items():
+        print(f"\n{label} rows ({case['bytes'] / 1e6:.1f} MB, peak RSS {case['peak_rss_mb']} MB)", file=sys.stderr)
+        for stage, t in case["stages"].items():
+            change = f"{t['change']:+.0%}" if "change" in t else ""
+            print(f"  {stage:<20} {t['median'] * 1000:>10.2f} ms {t['rows_per_sec'] or 0:>12} rows/s {change:>7}",
+                  file=sys.stderr)
+    for r in report.get("regressions", []):
+        print(f"REGRESSION {r['size']} {r['stage']}: {r['baseline'] * 1000:.2f} ms -> {r['median'] * 1000:.2f} ms "
+              f"({r['change']:+.0%})", file=sys.stderr)
+    if "warning" in report:
+        print(f"warning: {report['warning']}", file=sys.stderr)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Benchmark the CSV pipeline.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated row counts (default: {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the median is reported (default: 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown before a stage counts as a regression (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--check", action="store_true", help="exit 1 when a regression is found")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if not args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    report = run(sizes, args.repeat, args.seed, baseline, args.tolerance,
+                 progress=lambda msg: print(msg, file=sys.stderr))
+    _print_table(report)
+
+    payload = json.dumps(report, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    elif not args.update_baseline:
+        print(payload)
+    return 1 if args.check and report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
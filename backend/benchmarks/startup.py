@@ -0,0 +1,141 @@
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+# Startup benchmark: how long a new worker takes to serve its first requests.
+#
+#   cd backend
+#   python -m benchmarks.startup                   # 5 runs of each mode
+#   python -m benchmarks.startup --rows 100k --repeat 3
+#
+# Every run is a fresh process, so nothing is imported or built beforehand;
+# the result cache is disabled so the second upload does the full work again.
+# Each run is done with the warmup off ("cold") and on ("warm", as serve.py
+# starts workers).
+#
+# Timings (median of --repeat runs):
+#   import_main     import of the app module
+#   startup         app startup (the lifespan, including the warmup)
+#   first_upload    first POST /upload
+#   second_upload   the same upload again
+#   first_dataset   first GET /datasets/{id}/analytics
+#   first_response  import_main + startup + first_upload: process start to first result
+#
+# `heavy_imports` lists the modules among polars and numpy already loaded
+# after `import main` (none are expected).
+
+DEFAULT_ROWS = "10k"
+MODES = {"cold": "0", "warm": "1"}
+HEAVY_MODULES = ("polars", "numpy")
+
+
+def _timed(fn: Callable[[], Any], timings: Dict[str, float], name: str) -> Any:
+    start = time.perf_counter()
+    result = fn()
+    timings[name] = time.perf_counter() - start
+    return result
+
+
+def run_case(path: str) -> Dict[str, Any]:
+    """Start the app and time its first requests. Runs in its own process."""
+    import importlib
+
+    timings: Dict[str, float] = {}
+    app = _timed(lambda: importlib.import_module("main").app, timings, "import_main")
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    from fastapi.testclient import TestClient
+
+    with open(path, "rb") as f:
+        content = f.read()
+    client = TestClient(app)
+    _timed(client.__enter__, timings, "startup")
+    try:
+        def upload():
+            r = client.post("/upload", files={"file": ("bench.csv", content, "text/csv")})
+            r.raise_for_status()
+            return r.json()["dataset_id"]
+
+        dataset_id = _timed(upload, timings, "first_upload")
+        _timed(upload, timings, "second_upload")
+        _timed(lambda: client.get(f"/datasets/{dataset_id}/analytics").raise_for_status(), timings, "first_dataset")
+    finally:
+        client.__exit__(None, None, None)
+    timings["first_response"] = timings["import_main"] + timings["startup"] + timings["first_upload"]
+    return {"timings": timings, "heavy_imports": heavy}
+
+
+def run(rows: int, repeat: int = 5, seed: int = 0,
+        progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    from benchmarks.run import machine_info
+    from core.synthetic import export_csv
+
+    # Inherited by the spawned processes
+    os.environ["RESULT_CACHE_ENTRIES"] = "0"
+    os.environ.pop("RESULT_CACHE_DIR", None)
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        path = os.path.join(tmp, "startup.csv")
+        export_csv(rows, seed, path=path)
+        for mode, flag in MODES.items():
+            os.environ["APP_WARMUP"] = flag
+            runs = []
+            for i in range(repeat):
+                if progress:
+                    progress(f"{mode}: run {i + 1}/{repeat}")
+                with context.Pool(1) as pool:
+                    runs.append(pool.apply(run_case, (path,)))
+            results[mode] = {
+                "timings": {name: round(statistics.median(r["timings"][name] for r in runs), 6)
+                            for name in runs[0]["timings"]},
+                "heavy_imports": sorted({name for r in runs for name in r["heavy_imports"]}),
+            }
+    return {"machine": machine_info(), "rows": rows, "seed": seed, "repeat": repeat, "results": results}
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    modes = list(report["results"])
+    print(f"\n{report['rows']} rows, median of {report['repeat']} runs", file=sys.stderr)
+    print(f"  {'':<16}" + "".join(f"{mode:>12}" for mode in modes), file=sys.stderr)
+    for name in report["results"][modes[0]]["timings"]:
+        cells = "".join(f"{report['results'][mode]['timings'][name] * 1000:>9.1f} ms" for mode in modes)
+        print(f"  {name:<16}{cells}", file=sys.stderr)
+    for mode in modes:
+        heavy = report["results"][mode]["heavy_imports"]
+        if heavy:
+            print(f"warning: `import main` loaded {', '.join(heavy)} ({mode})", file=sys.stderr)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from benchmarks.run import parse_size
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup",
+                                     description="Benchmark worker startup and first-request latency.")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help=f"rows of the uploaded export (default: {DEFAULT_ROWS})")
+    parser.add_argument("--repeat", type=int, default=5, help="processes per mode, the median is reported (default: 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(parse_size(args.rows), args.repeat, args.seed, progress=lambda msg: print(msg, file=sys.stderr))
+    _print_table(report)
+
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
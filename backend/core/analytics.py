@@ -0,0 +1,194 @@
+import math
+from typing import Any, Dict, List
+
+import polars as pl
+
+from core.stats import Frame, daily_aggregate
+
+# Risk analytics on top of the normalized trades: drawdowns, win/loss streaks
+# and rolling ratios. Everything is a cumulative, run-length or rolling-window
+# expression over the trade sequence (Date order, export order within a day),
+# so the cost is a few vectorized passes whatever the number of trades.
+#
+# Rolling windows are counted in trades (`unit='trades'`, ratios per trade)
+# or in calendar days (`unit='days'`, computed on daily NetPnL, Sharpe and
+# Sortino annualized with sqrt(TRADING_DAYS)).
+
+UNITS = ('trades', 'days')
+DEFAULT_WINDOW = 50
+MAX_WINDOW = 10_000
+TRADING_DAYS = 252
+
+_is_win = pl.col('PnL') > 0
+
+
+def _ordered(df: Frame) -> pl.LazyFrame:
+    return df.lazy().sort('Date', maintain_order=True)
+
+
+def equity_curve(df: Frame) -> pl.LazyFrame:
+    """Per trade: Equity (cumulative NetPnL), Peak (running high, the start at
+    0 included), Drawdown (Equity - Peak, <= 0), PeakIndex (row of that high,
+    -1 for the start) and PeakDate."""
+    equity = pl.col('NetPnL').cum_sum()
+    return _ordered(df).select(
+        'Date',
+        equity.alias('Equity'),
+    ).with_columns(
+        pl.max_horizontal(pl.col('Equity').cum_max(), pl.lit(0.0)).alias('Peak'),
+        pl.int_range(pl.len()).alias('Index'),
+    ).with_columns(
+        (pl.col('Equity') - pl.col('Peak')).alias('Drawdown'),
+    ).with_columns(
+        pl.when(pl.col('Drawdown') >= 0).then(pl.col('Index')).forward_fill().fill_null(-1).alias('PeakIndex'),
+    ).with_columns(
+        # The start counts as dated like the first trade
+        pl.col('Date').gather(pl.col('PeakIndex').clip(lower_bound=0)).alias('PeakDate'),
+    )
+
+
+def drawdown(df: Frame) -> Dict[str, Any]:
+    """Max drawdown (depth, when it started, bottomed out and recovered) and
+    the longest time spent below a previous high. max_drawdown_pct is None
+    without a drawdown from a profitable high (including no trades)."""
+    curve = equity_curve(df).collect()
+    empty = {
+        "max_drawdown": 0.0, "max_drawdown_pct": None, "peak_date": None, "trough_date": None,
+        "recovery_date": None, "trades_to_trough": 0, "trades_to_recovery": None,
+        "days_to_trough": 0, "days_to_recovery": None, "current_drawdown": 0.0,
+        "longest_underwater_trades": 0, "longest_underwater_days": 0,
+    }
+    if len(curve) == 0:
+        return empty
+
+    dates = curve['Date']
+    trough = curve['Drawdown'].arg_min()
+    depth = curve['Drawdown'][trough]
+
+    # Underwater periods: consecutive trades below the same high. A period
+    # ends on the trade that gets back to the high, or on the last trade.
+    periods = curve.with_columns(
+        pl.col('Date').shift(-1).fill_null(pl.col('Date').last()).alias('NextDate'),
+    ).filter(pl.col('Drawdown') < 0).group_by('PeakIndex').agg(
+        pl.len().alias('trades'),
+        (pl.col('NextDate').last() - pl.col('PeakDate').first()).dt.total_days().alias('days'),
+    ).select(pl.col('trades', 'days').max())
+    longest_trades, longest_days = periods.row(0) if len(periods) else (0, 0)
+    longest_trades, longest_days = longest_trades or 0, longest_days or 0
+
+    if depth >= 0:
+        return {**empty, "longest_underwater_trades": longest_trades, "longest_underwater_days": longest_days}
+
+    peak_index = curve['PeakIndex'][trough]
+    peak_value = curve['Peak'][trough]
+    after = curve['Index'].filter((curve['Index'] > trough) & (curve['Drawdown'] >= 0))
+    recovery = after[0] if len(after) else None
+    return {
+        "max_drawdown": round(depth, 2),
+        # Relative to the high it fell from, when that high was a profit
+        "max_drawdown_pct": round(depth / peak_value * 100, 2) if peak_value > 0 else None,
+        "peak_date": curve['PeakDate'][trough].isoformat(),
+        "trough_date": dates[trough].isoformat(),
+        "recovery_date": dates[recovery].isoformat() if recovery is not None else None,
+        "trades_to_trough": trough - peak_index,
+        "trades_to_recovery": recovery - trough if recovery is not None else None,
+        "days_to_trough": (dates[trough] - curve['PeakDate'][trough]).days,
+        "days_to_recovery": (dates[recovery] - dates[trough]).days if recovery is not None else None,
+        "current_drawdown": round(curve['Drawdown'][-1], 2),
+        "longest_underwater_trades": longest_trades,
+        "longest_underwater_days": longest_days,
+    }
+
+
+def streaks(df: Frame) -> Dict[str, Any]:
+    """Longest win/loss streaks and the streak the sequence ends on
+    (a win is PnL > 0, as in calculate_stats)."""
+    runs = _ordered(df).select(_is_win.rle().alias('run')).unnest('run').collect()
+    if len(runs) == 0:
+        return {"max_win_streak": 0, "max_loss_streak": 0, "current_streak": 0, "current_streak_type": None}
+    by_kind = runs.group_by('value').agg(pl.col('len').max())
+    longest = dict(zip(by_kind['value'].to_list(), by_kind['len'].to_list()))
+    last = runs.row(-1, named=True)
+    return {
+        "max_win_streak": longest.get(True, 0),
+        "max_loss_streak": longest.get(False, 0),
+        "current_streak": last['len'],
+        "current_streak_type": 'win' if last['value'] else 'loss',
+    }
+
+
+def _ratios(mean: pl.Expr, std: pl.Expr, downside: pl.Expr, scale: float) -> List[pl.Expr]:
+    return [
+        (mean / std * scale).alias('Sharpe'),
+        (mean / downside.sqrt() * scale).alias('Sortino'),
+    ]
+
+
+def rolling(df: Frame, window: int = DEFAULT_WINDOW, unit: str = 'trades') -> pl.DataFrame:
+    """Rolling win rate (%), expectancy (avg NetPnL per trade), Sharpe and
+    Sortino over the last `window` trades or calendar days.
+
+    One row per trade (with its 1-based number) or per trading day; rows
+    before the first full window are left out.
+    """
+    if unit not in UNITS:
+        raise ValueError(f"Unknown unit '{unit}'. Use one of: {', '.join(UNITS)}")
+    if not 1 < window <= MAX_WINDOW:
+        raise ValueError(f"window must be between 2 and {MAX_WINDOW}")
+
+    if unit == 'trades':
+        pnl = pl.col('NetPnL')
+        roll = dict(window_size=window, min_samples=window)
+        series = _ordered(df).select(
+            'Date',
+            pl.int_range(1, pl.len() + 1).alias('Trade'),
+            (_is_win.cast(pl.Float64).rolling_mean(**roll) * 100).alias('WinRate'),
+            pnl.rolling_mean(**roll).alias('Expectancy'),
+            *_ratios(pnl.rolling_mean(**roll), pnl.rolling_std(**roll),
+                     pnl.clip(upper_bound=0).pow(2).rolling_mean(**roll), 1.0),
+        ).filter(pl.col('Trade') >= window)
+    else:
+        # Windows of calendar days ending on each trading day
+        roll = dict(by='Date', window_size=f'{window}d')
+        pnl = pl.col('DailyPnL')
+        trades = pl.col('TradeCount').rolling_sum_by(**roll)
+        series = daily_aggregate(df).select(
+            'Date',
+            (pl.col('WinCount').rolling_sum_by(**roll) / trades * 100).alias('WinRate'),
+            (pnl.rolling_sum_by(**roll) / trades).alias('Expectancy'),
+            *_ratios(pnl.rolling_mean_by(**roll), pnl.rolling_std_by(**roll),
+                     pnl.clip(upper_bound=0).pow(2).rolling_mean_by(**roll), math.sqrt(TRADING_DAYS)),
+        ).filter(pl.col('Date') >= pl.col('Date').first() + pl.duration(days=window - 1))
+
+    # Flat or loss-free windows have no ratio (JSON has no inf/NaN)
+    return series.with_columns(
+        pl.col('WinRate', 'Expectancy').round(2),
+        *[pl.when(pl.col(c).is_finite()).then(pl.col(c).round(3)).alias(c) for c in ('Sharpe', 'Sortino')],
+    ).collect()
+
+
+def underwater(df: Frame) -> pl.DataFrame:
+    """Daily drawdown of the equity curve below its running high."""
+    return daily_aggregate(df).select(
+        'Date',
+        (pl.col('CumulativePnL') - pl.max_horizontal(pl.col('CumulativePnL').cum_max(), pl.lit(0.0)))
+        .round(2).alias('Drawdown'),
+    ).collect()
+
+
+def compute_analytics(df: Frame, window: int = DEFAULT_WINDOW, unit: str = 'trades',
+                      layout: str = 'rows') -> Dict[str, Any]:
+    """Analytics payload; series as row dicts or, with layout='columnar', one
+    list per column."""
+    def encode(frame: pl.DataFrame):
+        # Dates as strings, like the chart series
+        frame = frame.with_columns(pl.col('Date').dt.to_string('%Y-%m-%d'))
+        return frame.to_dict(as_series=False) if layout == 'columnar' else frame.to_dicts()
+
+    series = rolling(df, window, unit)
+    return {
+        "drawdown": drawdown(df),
+        "streaks": streaks(df),
+        "rolling": {"window": window, "unit": unit, "series": encode(series)},
+        "underwater": encode(underwater(df)),
+    }
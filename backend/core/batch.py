@@ -0,0 +1,285 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import polars as pl
+
+from core.ingest import SAMPLE_BYTES, detect_encoding, file_encoding
+from core.processor import load_trades, load_trades_path
+from core.stats import aggregate, combine_daily, finalize, merge_totals
+
+# Batch processing of many exports from the command line, e.g. the nightly
+# report for every account on the desk:
+#
+#   cd backend
+#   python -m core.batch "exports/*.csv" --out reports/ --workers 8
+#
+# Each file is one account (named after the file) and is processed in its
+# own worker process. Workers return mergeable totals and the daily
+# aggregate, so the portfolio rollup is a cheap merge in the parent and the
+# trades themselves never cross process boundaries.
+#
+# Output (--out):
+#   report.json        per-account stats, portfolio stats, per-file timing;
+#                      with --format json also every daily series
+#   accounts.parquet   --format parquet: one row of flattened stats per account
+#   daily.parquet      --format parquet: daily PnL per account
+#   portfolio.parquet  --format parquet: combined daily PnL and equity curve
+
+FORMATS = ('json', 'parquet')
+
+
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """Resolve directories (all *.csv inside) and glob patterns to CSV paths."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, '*.csv')))
+        else:
+            paths.extend(glob.glob(item))
+    # De-duplicate overlapping patterns, keep a stable order for the report
+    return sorted(set(os.path.abspath(p) for p in paths if os.path.isfile(p)))
+
+
+def account_names(paths: Sequence[str]) -> Dict[str, str]:
+    """Account name per path: the file name without extension, prefixed with
+    the parent directory when two files share a name."""
+    stems = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    names = {}
+    for path, stem in zip(paths, stems):
+        if stems.count(stem) > 1:
+            stem = f"{os.path.basename(os.path.dirname(path))}/{stem}"
+        names[path] = stem
+    return names
+
+
+def load_file(path: str) -> pl.DataFrame:
+    with open(path, 'rb') as f:
+        utf8 = detect_encoding(f.read(SAMPLE_BYTES)) == 'utf8'
+    if utf8:
+        try:
+            return load_trades_path(path)
+        except ValueError:
+            # Only a legacy byte after the sample is retried below; the
+            # whole file is checked on this (failing) path only
+            if file_encoding(path) == 'utf8':
+                raise
+    # Rare: legacy encodings are transcoded in memory
+    with open(path, 'rb') as f:
+        return load_trades(f)
+
+
+def process_file(path: str) -> Dict[str, Any]:
+    """Load one export and aggregate it. Top-level so it can run in a worker
+    process; never raises, failures are reported in the result."""
+    result: Dict[str, Any] = {"path": path, "bytes": os.path.getsize(path)}
+    start = time.perf_counter()
+    try:
+        df = load_file(path)
+        loaded = time.perf_counter()
+        totals, daily = aggregate(df)
+    except Exception as e:
+        result.update(error=str(e), seconds=time.perf_counter() - start)
+        return result
+    end = time.perf_counter()
+    result.update(
+        rows=len(df),
+        totals=totals,
+        daily=daily,
+        load_seconds=loaded - start,
+        stats_seconds=end - loaded,
+        seconds=end - start,
+    )
+    return result
+
+
+def _timing(result: Dict[str, Any]) -> Dict[str, Any]:
+    seconds = result['seconds']
+    timing = {
+        "bytes": result['bytes'],
+        "seconds": round(seconds, 4),
+        "mb_per_sec": round(result['bytes'] / 1e6 / seconds, 2) if seconds else None,
+    }
+    if 'rows' in result:
+        timing.update(
+            rows=result['rows'],
+            load_seconds=round(result['load_seconds'], 4),
+            stats_seconds=round(result['stats_seconds'], 4),
+            rows_per_sec=round(result['rows'] / seconds) if seconds else None,
+        )
+    return timing
+
+
+def _daily_rows(daily: pl.DataFrame) -> List[Dict[str, Any]]:
+    return daily.with_columns(pl.col('Date').dt.to_string("%Y-%m-%d")).to_dicts()
+
+
+def worker_count(workers: Optional[int], files: int) -> int:
+    return max(1, min(workers or os.cpu_count() or 1, files or 1))
+
+
+def run_batch(paths: Sequence[str], workers: Optional[int] = None, progress=None) -> Dict[str, Any]:
+    """Process `paths` on a process pool and build the report.
+
+    `progress(account, result)` is called as each file finishes. The report
+    keeps the daily frames (key 'daily' of accounts and portfolio) as
+    DataFrames; write_report serializes them.
+    """
+    names = account_names(paths)
+    workers = worker_count(workers, len(paths))
+
+    results: Dict[str, Dict[str, Any]] = {}
+    started = time.perf_counter()
+    if workers == 1:
+        for path in paths:
+            results[path] = process_file(path)
+            if progress:
+                progress(names[path], results[path])
+    else:
+        # spawn, not fork: forking a process with a running Polars thread
+        # pool can deadlock
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {executor.submit(process_file, path): path for path in paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                results[path] = future.result()
+                if progress:
+                    progress(names[path], results[path])
+    wall = time.perf_counter() - started
+
+    accounts = {}
+    errors = {}
+    totals = None
+    for path in paths:
+        result = results[path]
+        name = names[path]
+        if 'error' in result:
+            errors[name] = {"path": path, "error": result['error'], "timing": _timing(result)}
+            continue
+        accounts[name] = {
+            "path": path,
+            "stats": finalize(result['totals'], result['daily']),
+            "daily": result['daily'],
+            "timing": _timing(result),
+        }
+        totals = result['totals'] if totals is None else merge_totals(totals, result['totals'])
+
+    portfolio_daily = combine_daily([a['daily'] for a in accounts.values()])
+    total_rows = sum(a['timing']['rows'] for a in accounts.values())
+    total_bytes = sum(r['bytes'] for r in results.values())
+    return {
+        "accounts": accounts,
+        "errors": errors,
+        "portfolio": {
+            "accounts": len(accounts),
+            "stats": finalize(totals, portfolio_daily) if totals else None,
+            "daily": portfolio_daily,
+        },
+        "timing": {
+            "files": len(paths),
+            "workers": workers,
+            "rows": total_rows,
+            "bytes": total_bytes,
+            "wall_seconds": round(wall, 4),
+            "files_per_sec": round(len(paths) / wall, 2) if wall else None,
+            "rows_per_sec": round(total_rows / wall) if wall else None,
+            "mb_per_sec": round(total_bytes / 1e6 / wall, 2) if wall else None,
+        },
+    }
+
+
+def _flatten(stats: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {f"{section}_{key}": value for section, values in stats.items() for key, value in values.items()}
+
+
+def write_report(report: Dict[str, Any], out_dir: str, fmt: str = 'json') -> List[str]:
+    """Write the report to `out_dir`; returns the files written."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    accounts = report['accounts']
+    portfolio = report['portfolio']
+
+    if fmt == 'parquet':
+        account_rows = [{"account": name, "path": a['path'], **_flatten(a['stats'])} for name, a in accounts.items()]
+        daily = [a['daily'].select(pl.lit(name).alias('Account'), pl.all()) for name, a in accounts.items()]
+        tables = {
+            'accounts.parquet': pl.DataFrame(account_rows),
+            'daily.parquet': pl.concat(daily, how='vertical_relaxed') if daily else portfolio['daily'],
+            'portfolio.parquet': portfolio['daily'],
+        }
+        for filename, table in tables.items():
+            path = os.path.join(out_dir, filename)
+            table.write_parquet(path)
+            written.append(path)
+
+    payload = {
+        "accounts": {name: {"path": a['path'], "stats": a['stats'], "timing": a['timing']}
+                     for name, a in accounts.items()},
+        "errors": report['errors'],
+        "portfolio": {"accounts": portfolio['accounts'], "stats": portfolio['stats']},
+        "timing": report['timing'],
+    }
+    if fmt == 'json':
+        # Daily series live in the parquet files when that format was asked for
+        for name, a in accounts.items():
+            payload['accounts'][name]['daily'] = _daily_rows(a['daily'])
+        payload['portfolio']['daily'] = _daily_rows(portfolio['daily'])
+    path = os.path.join(out_dir, 'report.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    written.append(path)
+    return written
+
+
+def _print_progress(account: str, result: Dict[str, Any]) -> None:
+    timing = _timing(result)
+    if 'error' in result:
+        print(f"FAILED {account}: {result['error']}", file=sys.stderr)
+    else:
+        print(f"{account:<32} {timing['rows']:>9} rows {timing['bytes'] / 1e6:>8.1f} MB "
+              f"{timing['seconds']:>7.2f}s {timing['rows_per_sec'] or 0:>10} rows/s", file=sys.stderr)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m core.batch",
+        description="Process many trade exports in parallel and write per-account and portfolio reports.",
+    )
+    parser.add_argument('inputs', nargs='+', help="CSV files, directories or glob patterns")
+    parser.add_argument('-o', '--out', default='reports', help="output directory (default: reports)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('-f', '--format', choices=FORMATS, default='json', help="daily series format (default: json)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="no per-file progress")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no CSV files matched")
+
+    workers = worker_count(args.workers, len(paths))
+    # Split the cores between the workers instead of letting every worker's
+    # Polars thread pool claim all of them. Polars sizes its pool on import,
+    # so this is set before the workers are spawned (they inherit it).
+    os.environ.setdefault('POLARS_MAX_THREADS', str(max(1, (os.cpu_count() or 1) // workers)))
+    report = run_batch(paths, workers, None if args.quiet else _print_progress)
+    write_report(report, args.out, args.format)
+
+    timing = report['timing']
+    print(f"{len(report['accounts'])}/{timing['files']} files, {timing['rows']} rows in "
+          f"{timing['wall_seconds']:.2f}s on {timing['workers']} workers "
+          f"({timing['files_per_sec']} files/s, {timing['rows_per_sec']} rows/s) -> {args.out}",
+          file=sys.stderr)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import polars as pl
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Duration bucketing engine.
+# Every trade gets a bucket index from a binary search over the bucket edges,
+# then a single group_by computes all per-bucket metrics, so adding a metric
+# or a histogram never costs another scan of the trades.
+
+INF = float('inf')
+
+# Edges in seconds; bucket i is [edges[i], edges[i + 1])
+PRESETS: Dict[str, List[float]] = {
+    "default": [0, 15, 45, 60, 120, 300, 600, 1800, 3600, 7200, 14400, INF],
+    "scalper": [0, 5, 10, 15, 30, 45, 60, 90, 120, 180, 300, INF],
+    "swing": [0, 300, 900, 1800, 3600, 7200, 14400, 28800, 86400, 172800, 604800, INF],
+}
+
+# Labels used by the dashboard before bucket schemes were configurable
+DEFAULT_LABELS = [
+    "Under 15 sec",
+    "15-45 sec",
+    "45 sec - 1 min",
+    "1 min - 2 min",
+    "2 min - 5 min",
+    "5 min - 10 min",
+    "10 min - 30 min",
+    "30 min - 1 hour",
+    "1 hour - 2 hours",
+    "2 hours - 4 hours",
+    "4 hours and up",
+]
+
+MAX_BUCKETS = 100
+
+
+def _format_seconds(seconds: float) -> str:
+    for size, unit in ((86400, "day"), (3600, "hour"), (60, "min")):
+        if seconds >= size and seconds % size == 0:
+            n = int(seconds // size)
+            return f"{n} {unit}" if unit == "min" or n == 1 else f"{n} {unit}s"
+    return f"{seconds:g} sec"
+
+
+def make_labels(edges: Sequence[float]) -> List[str]:
+    labels = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi == INF:
+            labels.append(f"{_format_seconds(lo)} and up")
+        elif lo == 0:
+            labels.append(f"Under {_format_seconds(hi)}")
+        else:
+            labels.append(f"{_format_seconds(lo)} - {_format_seconds(hi)}")
+    return labels
+
+
+def parse_scheme(spec: Optional[str]) -> Tuple[List[float], List[str]]:
+    """Resolve a preset name or comma-separated edges (seconds) into (edges, labels).
+
+    Custom edges are sorted ascending; an open-ended last bucket is added
+    when the final edge isn't 'inf'.
+    """
+    if not spec or spec == "default":
+        return PRESETS["default"], DEFAULT_LABELS
+    if spec in PRESETS:
+        edges = PRESETS[spec]
+        return edges, make_labels(edges)
+
+    try:
+        edges = [float(v) for v in spec.split(",") if v.strip()]
+    except ValueError:
+        raise ValueError(
+            f"Invalid bucket scheme '{spec}'. Use one of {', '.join(PRESETS)} "
+            "or comma-separated edges in seconds, e.g. 0,30,60,300"
+        )
+    edges = sorted(edges)
+    if not edges or edges == [INF]:
+        raise ValueError("A bucket scheme needs at least one finite edge")
+    if edges[0] < 0 or len(set(edges)) != len(edges):
+        raise ValueError("Bucket edges must be distinct and non-negative")
+    if edges[-1] != INF:
+        edges.append(INF)
+    if len(edges) - 1 > MAX_BUCKETS:
+        raise ValueError(f"At most {MAX_BUCKETS} buckets are supported")
+    return edges, make_labels(edges)
+
+
+def bucket_index(edges: Sequence[float], column: str = 'Duration') -> pl.Expr:
+    """Bucket number of each row, -1 when outside all buckets (or null)."""
+    idx = pl.lit(pl.Series(edges, dtype=pl.Float64)).search_sorted(pl.col(column), side='right').cast(pl.Int32) - 1
+    return pl.when(idx < len(edges) - 1).then(idx).otherwise(-1)
+
+
+def bucket_totals(df: pl.DataFrame, edges: Sequence[float]) -> pl.DataFrame:
+    """Per-bucket count, wins, NetPnL sum and gross profit/loss (mergeable sums).
+
+    Wins are trades with NetPnL > 0, as in the original duration chart.
+    """
+    is_win = pl.col('NetPnL') > 0
+    return (
+        df.lazy()
+        .select(bucket_index(edges).alias('bucket'), 'NetPnL')
+        .filter(pl.col('bucket') >= 0)
+        .group_by('bucket')
+        .agg([
+            pl.len().alias('count'),
+            is_win.sum().alias('wins'),
+            pl.col('NetPnL').sum().alias('net_pnl'),
+            pl.col('NetPnL').filter(is_win).sum().alias('gross_profit'),
+            pl.col('NetPnL').filter(~is_win).sum().alias('gross_loss'),
+        ])
+        .collect()
+    )
+
+
+def merge_bucket_totals(a: pl.DataFrame, b: pl.DataFrame) -> pl.DataFrame:
+    # Both sides have at most one row per bucket, so this is O(buckets)
+    return pl.concat([a, b], how='vertical_relaxed').group_by('bucket').agg(pl.all().sum())
+
+
+def bucket_rows(totals: pl.DataFrame, labels: Sequence[str]) -> List[Dict[str, Any]]:
+    """Finalize bucket totals into the duration_distribution payload."""
+    by_bucket = {row['bucket']: row for row in totals.iter_rows(named=True)}
+
+    distribution = []
+    for i, label in enumerate(labels):
+        row = by_bucket.get(i)
+        count = row['count'] if row else 0
+        if count > 0:
+            win_rate = (row['wins'] / count) * 100
+            avg_pnl = row['net_pnl'] / count
+            gross_loss = abs(row['gross_loss'])
+            profit_factor = (row['gross_profit'] / gross_loss) if gross_loss > 0 else 0.0 # Avoid inf for JSON safety
+            net_pnl = row['net_pnl']
+        else:
+            win_rate = avg_pnl = profit_factor = net_pnl = 0.0
+
+        distribution.append({
+            "range": label,
+            "count": count,
+            "win_rate": round(win_rate, 1),
+            "avg_pnl": round(avg_pnl, 2),
+            "profit_factor": round(profit_factor, 2),
+            "net_pnl": round(net_pnl, 2),
+        })
+    return distribution
+
+
+def bucket_stats(df: pl.DataFrame, edges: Sequence[float], labels: Sequence[str]) -> List[Dict[str, Any]]:
+    """Count, win rate, avg NetPnL, profit factor and total NetPnL per bucket."""
+    return bucket_rows(bucket_totals(df, edges), labels)
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+import polars as pl
+
+from core.processor import PROCESSOR_VERSION
+
+# Content-addressed cache for processed uploads.
+# Key = sha256(processor version + uploaded bytes), so a re-upload of the same
+# export is served without re-parsing, and a processor change invalidates
+# everything computed by older code.
+#
+# Two tiers:
+#   memory  LRU bounded by entry count and approximate size
+#   disk    optional; <key>.parquet (normalized frame) + <key>.json (stats/charts).
+#           Survives restarts and is shared by every worker pointing at the
+#           same directory. Bounded by size: after a write, the entries read
+#           or written least recently (by mtime) are removed.
+#
+# Appended datasets (see core.datasets) are kept as recipes instead: the
+# parent ID and the appended export (<key>.csv + <key>.parent on disk), so
+# storing one costs what the appended rows cost. Recipes are bounded and
+# evicted along with the entries.
+#
+# Configuration (environment variables):
+#   RESULT_CACHE_ENTRIES  max entries kept in memory (default: 32)
+#   RESULT_CACHE_MAX_MB   max approximate memory tier size in MB (default: 512)
+#   RESULT_CACHE_DIR      directory for the disk tier (disabled when unset)
+#   RESULT_CACHE_DISK_MB  max disk tier size in MB (default: 2048)
+
+CacheEntry = Tuple[pl.DataFrame, Dict[str, Any]]
+# (parent ID, appended export)
+Recipe = Tuple[str, bytes]
+
+
+def content_hasher():
+    """Incremental hasher for content keys, for uploads read in chunks."""
+    h = hashlib.sha256()
+    h.update(f"processor-v{PROCESSOR_VERSION}\0".encode())
+    return h
+
+
+def content_key(content: bytes) -> str:
+    h = content_hasher()
+    h.update(content)
+    return h.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 32, max_bytes: int = 512 * 1024 * 1024, directory: Optional[str] = None,
+                 max_disk_bytes: int = 2048 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        # Entries and recipes, in one LRU order
+        self._entries: "OrderedDict[str, Union[CacheEntry, Recipe]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        return cls(
+            max_entries=int(os.environ.get("RESULT_CACHE_ENTRIES", 32)),
+            max_bytes=int(float(os.environ.get("RESULT_CACHE_MAX_MB", 512)) * 1024 * 1024),
+            directory=os.environ.get("RESULT_CACHE_DIR") or None,
+            max_disk_bytes=int(float(os.environ.get("RESULT_CACHE_DISK_MB", 2048)) * 1024 * 1024),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    # -- memory tier -------------------------------------------------------
+
+    def get_memory(self, key: str) -> Optional[CacheEntry]:
+        entry = self._get_memory(key)
+        return entry if entry is not None and isinstance(entry[0], pl.DataFrame) else None
+
+    def _get_memory(self, key: str) -> Optional[Union[CacheEntry, Recipe]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put_memory(self, key: str, entry: Union[CacheEntry, Recipe]) -> None:
+        if isinstance(entry[0], pl.DataFrame):
+            size = entry[0].estimated_size() + len(json.dumps(entry[1]))
+        else:
+            size = len(entry[0]) + len(entry[1])
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+
+    # -- disk tier ---------------------------------------------------------
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.directory, f"{key}.parquet"),
+            os.path.join(self.directory, f"{key}.json"),
+        )
+
+    def _recipe_paths(self, key: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.directory, f"{key}.csv"),
+            os.path.join(self.directory, f"{key}.parent"),
+        )
+
+    def _get_disk(self, key: str) -> Optional[CacheEntry]:
+        if not self.directory:
+            return None
+        frame_path, results_path = self._paths(key)
+        # The json file is written last, so its presence means a complete entry
+        if not os.path.exists(results_path):
+            return None
+        try:
+            with open(results_path, "r", encoding="utf-8") as f:
+                results = json.load(f)
+            df = pl.read_parquet(frame_path)
+        except (OSError, ValueError, pl.exceptions.PolarsError):
+            return None
+        try:
+            # Recently used: pruned last
+            os.utime(results_path)
+        except OSError:
+            pass
+        return df, results
+
+    def _put_disk(self, key: str, entry: CacheEntry) -> None:
+        if not self.directory:
+            return
+        frame_path, results_path = self._paths(key)
+        # Write to unique temp names and rename, so concurrent workers
+        # never observe a half-written entry.
+        tmp = f".{uuid.uuid4().hex}.tmp"
+        try:
+            entry[0].write_parquet(frame_path + tmp)
+            os.replace(frame_path + tmp, frame_path)
+            with open(results_path + tmp, "w", encoding="utf-8") as f:
+                json.dump(entry[1], f)
+            os.replace(results_path + tmp, results_path)
+        except OSError:
+            for path in (frame_path + tmp, results_path + tmp):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        self._prune_disk(keep=key)
+
+    def _get_recipe_disk(self, key: str) -> Optional[Recipe]:
+        if not self.directory:
+            return None
+        content_path, parent_path = self._recipe_paths(key)
+        # The parent file is written last, so its presence means a complete recipe
+        try:
+            with open(parent_path, "r", encoding="utf-8") as f:
+                parent = f.read()
+            with open(content_path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(parent_path)
+        except OSError:
+            pass
+        return parent, content
+
+    def _put_recipe_disk(self, key: str, recipe: Recipe) -> None:
+        if not self.directory:
+            return
+        content_path, parent_path = self._recipe_paths(key)
+        tmp = f".{uuid.uuid4().hex}.tmp"
+        try:
+            with open(content_path + tmp, "wb") as f:
+                f.write(recipe[1])
+            os.replace(content_path + tmp, content_path)
+            with open(parent_path + tmp, "w", encoding="utf-8") as f:
+                f.write(recipe[0])
+            os.replace(parent_path + tmp, parent_path)
+        except OSError:
+            for path in (content_path + tmp, parent_path + tmp):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        self._prune_disk(keep=key)
+
+    def _prune_disk(self, keep: str) -> None:
+        """Remove the least recently used entries beyond max_disk_bytes. Other
+        workers may prune the same directory: missing files are skipped."""
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext not in (".parquet", ".json", ".csv", ".parent") or key.startswith("."):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            size, mtime = entries.get(key, (0, 0.0))
+            # The json (or parent) file is touched on reads
+            marker = ext in (".json", ".parent")
+            entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime) if marker else mtime)
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_disk_bytes:
+                break
+            if key == keep:
+                continue
+            # json (parent) first: without it, the entry counts as absent
+            for path in (*reversed(self._paths(key)), *reversed(self._recipe_paths(key))):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    # -- public API --------------------------------------------------------
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.get_memory(key)
+        if entry is None:
+            entry = self._get_disk(key)
+            if entry is not None:
+                self._put_memory(key, entry)
+        return entry
+
+    def put(self, key: str, df: pl.DataFrame, results: Dict[str, Any]) -> None:
+        entry = (df, results)
+        self._put_memory(key, entry)
+        self._put_disk(key, entry)
+
+    def get_recipe(self, key: str) -> Optional[Recipe]:
+        recipe = self._get_memory(key)
+        if recipe is None:
+            recipe = self._get_recipe_disk(key)
+            if recipe is not None:
+                self._put_memory(key, recipe)
+        return recipe if recipe is not None and isinstance(recipe[0], str) else None
+
+    def put_recipe(self, key: str, parent: str, content: bytes) -> None:
+        recipe = (parent, content)
+        self._put_memory(key, recipe)
+        self._put_recipe_disk(key, recipe)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache.from_env()
+        return _cache
@@ -0,0 +1,108 @@
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import polars as pl
+
+# Calendar heatmap payloads, precomputed per dataset.
+# Built from the daily aggregate that calculate_stats already collects
+# (NetPnL, trade and win counts per day), so it costs O(days), never a pass
+# over the trades. Every month is stored as its final JSON-ready payload --
+# days, ISO-week rollups and month totals -- keyed by 'YYYY-MM', and every
+# year as the list of its months, so navigating the calendar is a dict lookup.
+#
+# A week row covers the whole ISO week (Monday to Sunday), also when it
+# spills into the previous or next month.
+
+
+class CalendarIndex(NamedTuple):
+    months: Dict[str, Dict[str, Any]]
+    years: Dict[int, Dict[str, Any]]
+
+
+def _totals(frame: pl.DataFrame, *keys: str) -> pl.DataFrame:
+    return frame.group_by(*keys, maintain_order=True).agg(
+        pl.col('DailyPnL').sum().round(2).alias('pnl'),
+        pl.col('TradeCount').sum().alias('trade_count'),
+        pl.col('WinCount').sum().alias('win_count'),
+        pl.len().alias('trading_days'),
+    )
+
+
+def _win_rate(row: Dict[str, Any]) -> Dict[str, Any]:
+    trades = row['trade_count']
+    return {**row, "win_rate": round(row['win_count'] / trades * 100, 2) if trades else 0.0}
+
+
+def empty_month(key: str) -> Dict[str, Any]:
+    return {"month": key, "pnl": 0.0, "trade_count": 0, "win_count": 0, "trading_days": 0,
+            "win_rate": 0.0, "days": [], "weeks": []}
+
+
+def build_calendar(daily: pl.DataFrame) -> CalendarIndex:
+    """Month and year payloads from a daily aggregate (see stats.daily_aggregate)."""
+    days = daily.select(
+        pl.col('Date'),
+        pl.col('Date').dt.to_string('%Y-%m').alias('Month'),
+        pl.col('Date').dt.iso_year().alias('IsoYear'),
+        pl.col('Date').dt.week().alias('Week'),
+        'DailyPnL',
+        'TradeCount',
+        'WinCount',
+    ).sort('Date')
+
+    weeks = _totals(days, 'IsoYear', 'Week').join(
+        days.group_by('IsoYear', 'Week').agg(
+            (pl.col('Date').min() - pl.duration(days=pl.col('Date').min().dt.weekday() - 1)).alias('start'),
+        ),
+        on=['IsoYear', 'Week'],
+    ).select(
+        pl.format('{}-W{}', 'IsoYear', pl.col('Week').cast(pl.Utf8).str.zfill(2)).alias('week'),
+        pl.col('start').dt.to_string('%Y-%m-%d'),
+        (pl.col('start') + pl.duration(days=6)).dt.to_string('%Y-%m-%d').alias('end'),
+        'pnl', 'trade_count', 'win_count', 'trading_days', 'IsoYear', 'Week',
+    )
+    week_rows = {(row.pop('IsoYear'), row.pop('Week')): _win_rate(row) for row in weeks.iter_rows(named=True)}
+    month_weeks = days.select('Month', 'IsoYear', 'Week').unique(maintain_order=True)
+
+    weeks_by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for month, iso_year, week in month_weeks.iter_rows():
+        weeks_by_month.setdefault(month, []).append(week_rows[(iso_year, week)])
+
+    day_rows = days.select(
+        pl.col('Date').dt.to_string('%Y-%m-%d'), pl.col('DailyPnL').round(2), 'TradeCount', 'WinCount', 'Month',
+    ).partition_by('Month', as_dict=True, include_key=False, maintain_order=True)
+
+    months = {}
+    for row in _totals(days, 'Month').iter_rows(named=True):
+        key = row.pop('Month')
+        months[key] = {"month": key, **_win_rate(row), "days": day_rows[(key,)].to_dicts(),
+                       "weeks": weeks_by_month[key]}
+
+    years = {}
+    for row in _totals(days.with_columns(pl.col('Date').dt.year().alias('Year')), 'Year').iter_rows(named=True):
+        year = row.pop('Year')
+        years[year] = {"year": year, **_win_rate(row),
+                       "months": [m for key, m in months.items() if key.startswith(f"{year:04d}-")]}
+    return CalendarIndex(months, years)
+
+
+def parse_month(month: str) -> str:
+    """Normalize 'YYYY-MM' (or 'YYYY-M')."""
+    try:
+        return datetime.strptime(month, '%Y-%m').strftime('%Y-%m')
+    except ValueError:
+        raise ValueError(f"Invalid month '{month}', expected YYYY-MM")
+
+
+def lookup(index: CalendarIndex, month: Optional[str] = None, year: Optional[int] = None) -> Dict[str, Any]:
+    """One month, one year, or (neither given) every month with trades."""
+    if month is not None:
+        key = parse_month(month)
+        return {"months": [index.months.get(key) or empty_month(key)]}
+    if year is not None:
+        found = index.years.get(year)
+        if found is None:
+            return {"year": year, "pnl": 0.0, "trade_count": 0, "win_count": 0, "trading_days": 0,
+                    "win_rate": 0.0, "months": []}
+        return found
+    return {"months": list(index.months.values())}
@@ -0,0 +1,295 @@
+import os
+import tempfile
+import uuid
+import weakref
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import polars as pl
+
+from core.formats import DatetimeFormat, detect_datetime, wall_clock
+
+# Compact storage for the normalized trades that datasets keep server-side.
+# Every encoding is lossless -- decoding gives back a frame equal to the one
+# that was encoded, so results do not change -- and is only applied to a
+# column when its values allow it:
+#   - money (PnL, Fees, prices) as integer cents, when no value has more than
+#     two decimals
+#   - NetPnL is not stored; it is PnL - Fees, recomputed on decode
+#   - integers and whole-number floats (durations) in the narrowest integer type
+#   - Symbol and Direction as Enums: one byte per row for up to 256 values
+#   - timestamp text (EnteredAt, ...) as integer epoch seconds of its wall
+#     clock plus an Enum of its UTC offset suffix, when formatting them back
+#     gives the original strings
+# The compact frame is then written to an uncompressed Arrow IPC file and
+# read back memory-mapped, so its pages belong to the OS page cache (shared,
+# and reclaimable under memory pressure) rather than to the process heap.
+# A plain CompactFrame wraps a frame as is, until it is worth encoding.
+#
+# Configuration (environment variables):
+#   DATASET_MMAP       memory-map datasets from disk (default: 1)
+#   DATASET_SPILL_DIR  where their Arrow files go (default: <temp>/trading-datasets)
+
+MONEY = ('PnL', 'Fees', 'EntryPrice', 'ExitPrice')
+DERIVED = {'NetPnL': ('PnL', 'Fees')}
+CATEGORICAL = ('Symbol', 'Direction')
+INT_TYPES = (pl.Int8, pl.Int16, pl.Int32, pl.Int64)
+INT_BITS = (8, 16, 32, 64)
+MAX_CATEGORIES = 65_536     # Enum codes up to UInt16
+SAMPLE_ROWS = 100           # rows tried when detecting a timestamp format
+
+
+class Codec(NamedTuple):
+    schema: Dict[str, pl.DataType]          # decoded schema, in column order
+    stored: Dict[str, pl.DataType]          # stored dtype of every column kept
+    cents: Tuple[str, ...]                  # money columns stored as integer cents
+    derived: Tuple[str, ...]                # columns recomputed on decode
+    timestamps: Dict[str, DatetimeFormat]   # text columns stored as epoch seconds (or dates)
+
+
+def _offset_column(name: str) -> str:
+    return f'{name}:offset'
+
+
+def _wall_clock(name: str, fmt: DatetimeFormat) -> pl.Expr:
+    """The stored form of a timestamp text column: epoch seconds, or the date."""
+    wall = wall_clock(name, fmt)
+    return wall.dt.epoch('s') if fmt.has_time else wall
+
+
+def _timestamp_text(stored: pl.Expr, offset: pl.Expr, fmt: DatetimeFormat) -> pl.Expr:
+    text = (pl.from_epoch(stored, 's') if fmt.has_time else stored).dt.strftime(fmt.fmt)
+    return text + offset.cast(pl.Utf8) if fmt.offset_len else text
+
+
+def mmap_enabled() -> bool:
+    return os.environ.get("DATASET_MMAP", "1").lower() not in ("0", "false", "no")
+
+
+def spill_dir() -> str:
+    return os.environ.get("DATASET_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "trading-datasets")
+
+
+def _narrowest(lo, hi) -> Optional[pl.DataType]:
+    if lo is None:
+        return pl.Int8      # all null
+    return next((t for t, bits in zip(INT_TYPES, INT_BITS) if -(1 << bits - 1) <= lo and hi < 1 << bits - 1), None)
+
+
+def _from_cents(cents: pl.Expr) -> pl.Expr:
+    # Through Decimal: Polars divides by a literal as a multiplication by its
+    # reciprocal, which is not correctly rounded (13820 / 100 != 138.2)
+    return (cents.cast(pl.Decimal(38, 0), strict=False) * pl.lit(Decimal('0.01'))).cast(pl.Float64)
+
+
+def _exact(col: pl.Expr, cents: bool) -> pl.Expr:
+    """Whether every value survives rounding to whole units or cents (no NaN, inf or -0.0)."""
+    rounded = (col * 100).round() if cents else col.round()
+    negative_zero = (col == 0) & ((1 / col) < 0)
+    restored = _from_cents(rounded) if cents else rounded
+    return (restored.eq_missing(col) & col.is_finite().fill_null(True) & ~negative_zero.fill_null(False)).all()
+
+
+def _timestamp_format(values: pl.Series) -> Optional[DatetimeFormat]:
+    fmt = detect_datetime(values.head(SAMPLE_ROWS))
+    # Formats strftime can't write back as read ("Z", variable fractions) stay text
+    return fmt if fmt is not None and not fmt.zulu and '%.f' not in fmt.fmt else None
+
+
+def plan_codec(df: pl.DataFrame) -> Codec:
+    """The compact encoding `df` allows, from one pass over it."""
+    schema = df.schema
+    formats = {}
+    checks = []
+    for name, dtype in schema.items():
+        col = pl.col(name)
+        if name in DERIVED and all(c in schema for c in DERIVED[name]):
+            a, b = DERIVED[name]
+            checks.append((pl.col(a) - pl.col(b)).eq_missing(col).all().alias(f'{name}:derived'))
+        elif dtype == pl.Float64:
+            scaled = (col * 100 if name in MONEY else col).round()
+            checks += [_exact(col, name in MONEY).alias(f'{name}:exact'),
+                       scaled.min().alias(f'{name}:min'), scaled.max().alias(f'{name}:max')]
+        elif dtype.is_integer():
+            checks += [col.min().alias(f'{name}:min'), col.max().alias(f'{name}:max')]
+        elif dtype == pl.String and name in CATEGORICAL:
+            checks.append(col.n_unique().alias(f'{name}:unique'))
+        elif dtype == pl.String and (fmt := _timestamp_format(df[name])) is not None:
+            formats[name] = fmt
+            wall = _wall_clock(name, fmt)
+            text = _timestamp_text(wall, col.str.tail(fmt.offset_len), fmt)
+            checks += [text.eq_missing(col).all().alias(f'{name}:exact'),
+                       wall.min().alias(f'{name}:min'), wall.max().alias(f'{name}:max')]
+    facts = df.select(checks).row(0, named=True) if checks else {}
+
+    stored, cents, derived, timestamps = {}, [], [], {}
+    for name, dtype in schema.items():
+        target = dtype
+        if facts.get(f'{name}:derived'):
+            derived.append(name)
+            continue
+        if name in formats:
+            if facts[f'{name}:exact']:
+                fmt = timestamps[name] = formats[name]
+                target = pl.Date
+                if fmt.has_time:
+                    target = _narrowest(facts[f'{name}:min'], facts[f'{name}:max']) or pl.Int64
+                if fmt.offset_len:
+                    offsets = df[name].str.tail(fmt.offset_len).drop_nulls().unique().sort()
+                    stored[_offset_column(name)] = pl.Enum(offsets)
+        elif dtype.is_integer() or facts.get(f'{name}:exact'):
+            narrow = _narrowest(facts[f'{name}:min'], facts[f'{name}:max'])
+            if narrow is not None:
+                target = narrow
+                if dtype == pl.Float64 and name in MONEY:
+                    cents.append(name)
+        elif name in CATEGORICAL and facts.get(f'{name}:unique', MAX_CATEGORIES + 1) <= MAX_CATEGORIES:
+            target = pl.Enum(df[name].drop_nulls().unique().sort())
+        stored[name] = target
+    return Codec(dict(schema), stored, tuple(cents), tuple(derived), timestamps)
+
+
+def _stored_value(name: str, codec: Codec) -> pl.Expr:
+    """A stored column from the decoded frame, before the cast to its stored type."""
+    if name in codec.timestamps:
+        return _wall_clock(name, codec.timestamps[name])
+    if name in codec.cents:
+        return (pl.col(name) * 100).round()
+    source = name[:-len(':offset')]
+    if name.endswith(':offset') and source in codec.timestamps:
+        return pl.col(source).str.tail(codec.timestamps[source].offset_len)
+    return pl.col(name)
+
+
+def encode_with(df: pl.DataFrame, codec: Codec) -> pl.DataFrame:
+    return df.select([_stored_value(name, codec).cast(dtype).alias(name) for name, dtype in codec.stored.items()])
+
+
+def decode_exprs(codec: Codec, columns: Optional[Sequence[str]] = None) -> List[pl.Expr]:
+    def value(name: str) -> pl.Expr:
+        if name in codec.timestamps:
+            return _timestamp_text(pl.col(name), pl.col(_offset_column(name)), codec.timestamps[name])
+        if name in codec.derived:
+            a, b = DERIVED[name]
+            return value(a) - value(b)
+        if name in codec.cents:
+            return _from_cents(pl.col(name))
+        return pl.col(name).cast(codec.schema[name])
+
+    return [value(name).alias(name) for name in (columns or codec.schema)]
+
+
+def _fits(df: pl.DataFrame, codec: Codec) -> bool:
+    """Whether rows can be stored with an existing codec unchanged."""
+    fresh = plan_codec(df)
+    if not set(fresh.derived) >= set(codec.derived):
+        return False
+    for name, fmt in codec.timestamps.items():
+        if name not in fresh.timestamps or fresh.timestamps[name]._replace(cache=fmt.cache) != fmt:
+            return False
+    for name, dtype in codec.stored.items():
+        new = fresh.stored.get(name)
+        if isinstance(dtype, pl.Enum):
+            values = df.select(_stored_value(name, codec)).to_series().drop_nulls()
+            if not values.is_in(dtype.categories.to_list()).all():
+                return False
+        elif name in codec.cents or (dtype.is_integer() and dtype != codec.schema[name]):
+            # The new rows need an integer type at most as wide (cents as cents)
+            if new not in INT_TYPES or INT_TYPES.index(new) > INT_TYPES.index(dtype) or \
+                    (name in codec.cents) != (name in fresh.cents):
+                return False
+    return True
+
+
+class CompactFrame:
+    """A normalized trades frame in compact form (see the module comment)."""
+
+    def __init__(self, frame: pl.DataFrame, codec: Codec, path: Optional[str] = None, encoded: bool = True):
+        self.frame = frame
+        self.codec = codec
+        self.encoded = encoded
+        if path is not None:
+            # Unlinking is safe while mapped (POSIX); done once the frame is gone
+            weakref.finalize(self, _remove, path)
+        self.mapped = path is not None
+
+    @classmethod
+    def plain(cls, df: pl.DataFrame) -> "CompactFrame":
+        schema = dict(df.schema)
+        return cls(df, Codec(schema, schema, (), (), {}), encoded=False)
+
+    @classmethod
+    def encode(cls, df: pl.DataFrame, mmap: Optional[bool] = None) -> "CompactFrame":
+        codec = plan_codec(df)
+        compact = cls(encode_with(df, codec), codec)
+        return compact.spill() if (mmap_enabled() if mmap is None else mmap) else compact
+
+    def spill(self) -> "CompactFrame":
+        """The same frame, memory-mapped from an Arrow IPC file."""
+        directory = spill_dir()
+        path = os.path.join(directory, f"{uuid.uuid4().hex}.arrow")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.frame.write_ipc(path, compression='uncompressed')
+            # Uncompressed local IPC files are read memory-mapped
+            frame = pl.read_ipc(path)
+        except (OSError, pl.exceptions.PolarsError):
+            _remove(path)
+            return self
+        return CompactFrame(frame, self.codec, path)
+
+    def __len__(self) -> int:
+        return self.frame.height
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.codec.schema)
+
+    @property
+    def schema(self) -> Dict[str, pl.DataType]:
+        return self.codec.schema
+
+    @property
+    def value_columns(self) -> List[str]:
+        """Columns other than raw timestamp text, which is only passed through
+        to the trade log (Date, Duration and EntryHour were parsed from it),
+        and is the slowest column to decode."""
+        return [name for name in self.codec.schema if name not in self.codec.timestamps]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the stored columns."""
+        return int(self.frame.estimated_size())
+
+    def decode(self, rows: Optional[pl.Series] = None, columns: Optional[Sequence[str]] = None) -> pl.DataFrame:
+        """The original frame, or the given rows (indices) and columns of it."""
+        frame = self.frame if rows is None else self.frame[rows]
+        return frame.select(decode_exprs(self.codec, columns))
+
+    def slice(self, offset: int, length: int, columns: Optional[Sequence[str]] = None) -> pl.DataFrame:
+        return self.frame.slice(offset, length).select(decode_exprs(self.codec, columns))
+
+    def column(self, name: str) -> pl.Series:
+        return self.frame.select(decode_exprs(self.codec, [name])).to_series()
+
+    def stored(self, name: str) -> pl.Series:
+        """A column as stored (Enum, cents, ...), for filters that work on it as is."""
+        return self.frame[name]
+
+    def extend(self, df: pl.DataFrame) -> "CompactFrame":
+        """These rows followed by `df` (normalized, same columns). When `df`
+        fits the current encoding, the stored rows are shared, not copied."""
+        df = df.select(self.columns)
+        if not self.encoded:
+            return CompactFrame.plain(self.frame.vstack(df))
+        if _fits(df, self.codec):
+            # The new rows stay on the heap; the mapped chunks are shared
+            return CompactFrame(self.frame.vstack(encode_with(df, self.codec)), self.codec)
+        return CompactFrame.encode(pl.concat([self.decode(), df]), mmap=self.mapped)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
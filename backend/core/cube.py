@@ -0,0 +1,120 @@
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import polars as pl
+
+from core.stats import Frame
+
+# Breakdown cube: trades pre-aggregated by Date x Symbol x entry Hour x
+# Direction, built with one group_by per dataset. Every cell holds additive
+# measures only (counts and sums), so any roll-up over a subset of the
+# dimensions -- a per-symbol table, an hour-of-day heatmap, weekday bars --
+# is a group_by over the cells, whose number is bounded by
+# days x symbols x 24 x 3 rather than by the number of trades. Weekday is
+# derived from the Date cells, and keeping Date in the cube lets date-range
+# slices be answered from it too. Merging two cubes (appends) is again a
+# group_by sum. Cells are sorted on all the keys, so a cube is deterministic.
+
+# Dimensions a breakdown can be grouped by
+DIMENSIONS = ('Symbol', 'Weekday', 'Hour', 'Direction')
+KEYS = ('Date', 'Symbol', 'Hour', 'Direction')
+
+# Normalized Direction values, with calculate_stats' long/short patterns
+DIRECTIONS = ('long', 'short', 'unknown')
+
+_is_win = pl.col('PnL') > 0
+
+
+def _direction(schema: pl.Schema) -> pl.Expr:
+    if 'Direction' not in schema:
+        return pl.lit('unknown')
+    direction = pl.col('Direction').cast(pl.Utf8).str.to_lowercase()
+    return (
+        pl.when(direction.str.contains('long|buy')).then(pl.lit('long'))
+        .when(direction.str.contains('short|sell')).then(pl.lit('short'))
+        .otherwise(pl.lit('unknown'))
+    )
+
+
+def build_cube(df: Frame) -> pl.DataFrame:
+    """One row per (Date, Symbol, Hour, Direction) with count, wins and the
+    PnL, NetPnL, Fees and Duration sums. Hour is null when the export has no
+    entry time."""
+    lazy = df.lazy()
+    schema = lazy.collect_schema()
+    symbol = pl.col('Symbol').cast(pl.Utf8) if 'Symbol' in schema else pl.lit(None, pl.Utf8)
+    hour = pl.col('EntryHour') if 'EntryHour' in schema else pl.lit(None, pl.Int8)
+    return (
+        lazy.group_by(
+            'Date',
+            symbol.alias('Symbol'),
+            hour.alias('Hour'),
+            _direction(schema).alias('Direction'),
+        )
+        .agg([
+            pl.len().cast(pl.Int64).alias('count'),
+            _is_win.sum().cast(pl.Int64).alias('wins'),
+            pl.col('PnL').sum().alias('pnl'),
+            pl.col('NetPnL').sum().alias('net_pnl'),
+            pl.col('Fees').sum().alias('fees'),
+            pl.col('Duration').sum().alias('duration'),
+        ])
+        .sort(list(KEYS), nulls_last=True)
+        .collect()
+    )
+
+
+def merge_cubes(a: pl.DataFrame, b: pl.DataFrame) -> pl.DataFrame:
+    # Cells present on both sides (the same day appended twice) are summed
+    return (
+        pl.concat([a, b], how='vertical_relaxed')
+        .group_by(list(KEYS), maintain_order=True)
+        .agg(pl.all().sum())
+        .sort(list(KEYS), nulls_last=True)
+    )
+
+
+def parse_dimensions(spec: Optional[str]) -> List[str]:
+    """Comma-separated dimension names (case-insensitive) -> list."""
+    by = []
+    lookup = {name.lower(): name for name in DIMENSIONS}
+    for part in (spec or '').split(','):
+        name = lookup.get(part.strip().lower())
+        if name is None:
+            if part.strip():
+                raise ValueError(f"Unknown dimension '{part.strip()}'. Use any of: {', '.join(DIMENSIONS)}")
+            continue
+        if name not in by:
+            by.append(name)
+    return by
+
+
+def rollup(cube: pl.DataFrame, by: Sequence[str] = (), start: Optional[date] = None,
+           end: Optional[date] = None, filters: Optional[Dict[str, object]] = None) -> pl.DataFrame:
+    """Sum cube cells grouped by `by` (no dimensions: one total row).
+
+    `filters` maps dimensions to the value to keep. Weekday is ISO (1 = Monday).
+    Adds win rate (%), average NetPnL per trade and average duration.
+    """
+    for name in list(by) + list(filters or {}):
+        if name not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{name}'. Use any of: {', '.join(DIMENSIONS)}")
+
+    cells = cube.lazy()
+    if start is not None:
+        cells = cells.filter(pl.col('Date') >= start)
+    if end is not None:
+        cells = cells.filter(pl.col('Date') <= end)
+    cells = cells.with_columns(pl.col('Date').dt.weekday().cast(pl.Int8).alias('Weekday'))
+    for name, value in (filters or {}).items():
+        cells = cells.filter(pl.col(name) == value)
+
+    measures = [pl.col('count', 'wins', 'pnl', 'net_pnl', 'fees', 'duration').sum()]
+    grouped = cells.group_by(list(by)).agg(measures).sort(list(by), nulls_last=True) if by else cells.select(measures)
+    count = pl.col('count')
+    return grouped.with_columns(
+        pl.when(count > 0).then(pl.col('wins') / count * 100).otherwise(0.0).round(2).alias('win_rate'),
+        pl.when(count > 0).then(pl.col('net_pnl') / count).otherwise(0.0).round(2).alias('avg_net_pnl'),
+        pl.when(count > 0).then(pl.col('duration') / count).otherwise(0.0).round(2).alias('avg_duration'),
+        pl.col('pnl', 'net_pnl', 'fees').round(2),
+    ).collect()
@@ -0,0 +1,540 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import polars as pl
+
+from core.analytics import DEFAULT_WINDOW, compute_analytics
+from core.buckets import DEFAULT_LABELS, PRESETS, bucket_rows, bucket_totals, merge_bucket_totals
+from core.calendar import build_calendar, lookup
+from core.compact import CompactFrame
+from core.cube import build_cube, merge_cubes, rollup
+from core.simulation import SimulationParams, simulate
+from core.processor import columnar_charts, daily_series, prepare_charts_data
+from core.stats import aggregate, compute_stats, finalize, merge_daily, merge_totals
+
+# Server-side handles for normalized trade frames.
+# A dataset ID is the content key of the upload (see core.cache), so the same
+# export always maps to the same dataset and a worker that has never seen it
+# can rehydrate it from the result cache's disk tier.
+#
+# Appending an export creates a new dataset (ID derived from the parent ID and
+# the appended content) that shares the parent's column buffers and merges
+# its aggregates incrementally. The result cache records it as a recipe
+# (parent ID + appended export), replayed onto the parent by a worker that
+# doesn't have it.
+#
+# Trades are kept in the compact, memory-mapped form of core.compact and
+# decoded per request (only the rows of a page, only the columns a filter
+# needs). A new dataset starts as the plain frame and is compacted on a
+# background thread, so the upload that created it doesn't wait for that.
+# The store evicts least recently used datasets beyond a count and a byte
+# budget; an evicted upload is rehydrated from the result cache.
+#
+# Configuration (environment variables):
+#   DATASET_STORE_ENTRIES  max datasets kept in memory (default: 64)
+#   DATASET_MEMORY_MB      max bytes of the datasets kept (default: 1024)
+#   DATASET_COMPACT        "background" (default), "sync" or "off"
+
+
+class DatasetNotFoundError(KeyError):
+    pass
+
+
+def derived_id(parent_id: str, content_key: str) -> str:
+    return hashlib.sha256(f"{parent_id}+{content_key}".encode()).hexdigest()
+
+
+# Columns the trade log can be sorted by
+SORT_KEYS = ['Date', 'PnL', 'NetPnL', 'Duration', 'EntryPrice', 'ExitPrice']
+
+# Direction filter values -> patterns, matching calculate_stats' long/short split
+DIRECTION_PATTERNS = {'long': 'long|buy', 'short': 'short|sell'}
+
+# Filtered permutations kept per dataset
+MAX_CACHED_VIEWS = 16
+
+
+class Dataset:
+    """Normalized trades sorted by Date, with a date index for range slicing."""
+
+    def __init__(self, dataset_id: str, df: Union[pl.DataFrame, CompactFrame], presorted: bool = False,
+                 aggregates: Optional[tuple] = None, ids: Optional[pl.Series] = None,
+                 cube: Optional[pl.DataFrame] = None, symbols: Optional[List[str]] = None):
+        self.id = dataset_id
+        if isinstance(df, pl.DataFrame):
+            # Stable sort keeps the export order within a day
+            df = CompactFrame.plain(df if presorted else df.sort('Date', maintain_order=True))
+        # Replaced (never mutated) by compact(); rows keep their order
+        self._data = df
+        # Date index: a view of the stored Date column (rebuilt by compact())
+        self._dates = self._data.column('Date')
+        # (totals, daily frame, default bucket totals) for the whole dataset,
+        # built on first use and merged on append
+        self._aggregates = aggregates
+        # Breakdown cube (see core.cube), built on first use and merged on append
+        self._cube = cube
+        # Sorted symbols, listed on first use and merged on append
+        self._symbols = symbols
+        # Calendar payloads (see core.calendar), built from the daily aggregate on first use
+        self._calendar = None
+        # Sorted trade Ids, for de-duplicating appends
+        self._ids = ids
+        # Sort permutations (row indices in ascending key order), built on first use
+        self._permutations: Dict[str, pl.Series] = {}
+        self._views: "OrderedDict[tuple, pl.Series]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def df(self) -> pl.DataFrame:
+        """The whole normalized frame (decoded on every access)."""
+        return self._data.decode()
+
+    @property
+    def columns(self) -> List[str]:
+        return self._data.columns
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    @property
+    def compacted(self) -> bool:
+        return self._data.encoded
+
+    def compact(self) -> "Dataset":
+        """Switch to the compact, memory-mapped form of the trades."""
+        data = self._data
+        if not data.encoded:
+            compact = CompactFrame.encode(data.frame)
+            # Date is stored as is: the index becomes a view of the mapped
+            # file instead of keeping the heap copy alive
+            dates = compact.column('Date')
+            with self._lock:
+                self._data, self._dates = compact, dates
+        return self
+
+    @property
+    def start_date(self) -> Optional[date]:
+        return self._dates[0] if len(self._dates) else None
+
+    @property
+    def end_date(self) -> Optional[date]:
+        return self._dates[-1] if len(self._dates) else None
+
+    def bounds(self, start: Optional[date] = None, end: Optional[date] = None) -> Tuple[int, int]:
+        """Row offsets [lo, hi) of trades with start <= Date <= end (binary search)."""
+        lo = int(self._dates.search_sorted(start, side='left')) if start else 0
+        hi = int(self._dates.search_sorted(end, side='right')) if end else len(self._dates)
+        return lo, max(lo, hi)
+
+    def slice(self, start: Optional[date] = None, end: Optional[date] = None,
+              columns: Optional[List[str]] = None) -> pl.DataFrame:
+        lo, hi = self.bounds(start, end)
+        return self._data.slice(lo, hi - lo, columns)
+
+    def _values(self, start: Optional[date] = None, end: Optional[date] = None) -> pl.DataFrame:
+        """The slice with the columns stats and analytics read."""
+        return self.slice(start, end, self._data.value_columns)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "dataset_id": self.id,
+            "rows": len(self),
+            "start_date": self.start_date.isoformat() if self.start_date else None,
+            "end_date": self.end_date.isoformat() if self.end_date else None,
+            "columns": self.columns,
+            "symbols": self.symbols(),
+        }
+
+    def _permutation(self, key: str) -> pl.Series:
+        perm = self._permutations.get(key)
+        if perm is None:
+            if key == 'Date':
+                # Already sorted by Date
+                perm = pl.int_range(0, len(self), dtype=pl.UInt32, eager=True)
+            else:
+                perm = self._data.column(key).arg_sort(nulls_last=True)
+            self._permutations[key] = perm
+        return perm
+
+    def _view(self, sort: str, symbol: Optional[str], direction: Optional[str],
+              start: Optional[date], end: Optional[date]) -> pl.Series:
+        """Row indices matching the filters, in ascending `sort` order."""
+        view_key = (sort, symbol, direction, start, end)
+        with self._lock:
+            view = self._views.get(view_key)
+            if view is not None:
+                self._views.move_to_end(view_key)
+                return view
+
+        view = self._permutation(sort)
+        if symbol or direction or start or end:
+            mask = pl.repeat(True, len(self), eager=True)
+            if start or end:
+                lo, hi = self.bounds(start, end)
+                idx = pl.int_range(0, len(self), eager=True)
+                mask = mask & (idx >= lo) & (idx < hi)
+            # On the stored columns: comparing an Enum to a string it doesn't hold is False
+            if symbol:
+                mask = mask & (self._data.stored('Symbol') == symbol)
+            if direction:
+                mask = mask & self._data.stored('Direction').cast(pl.Utf8).str.to_lowercase().str.contains(
+                    DIRECTION_PATTERNS[direction]
+                )
+            view = view.filter(mask.gather(view).fill_null(False))
+
+        with self._lock:
+            self._views[view_key] = view
+            while len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+        return view
+
+    def page(self, offset: int = 0, limit: int = 50, sort: str = 'Date', order: str = 'desc',
+             symbol: Optional[str] = None, direction: Optional[str] = None,
+             start: Optional[date] = None, end: Optional[date] = None) -> Tuple[int, pl.DataFrame]:
+        """(total matching rows, frame with the requested page)."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort}'. Use one of: {', '.join(SORT_KEYS)}")
+        if sort not in self.columns:
+            raise ValueError(f"Dataset has no '{sort}' column")
+        if direction and direction not in DIRECTION_PATTERNS:
+            raise ValueError("'direction' must be 'long' or 'short'")
+        if symbol and 'Symbol' not in self.columns:
+            raise ValueError("Dataset has no 'Symbol' column")
+
+        view = self._view(sort, symbol, direction, start, end)
+        total = len(view)
+        if order == 'desc':
+            # Walk the ascending permutation from the end
+            lo = max(total - offset - limit, 0)
+            hi = max(total - offset, 0)
+            rows = view.slice(lo, hi - lo).reverse()
+        else:
+            rows = view.slice(offset, limit)
+        return total, self._data.decode(rows)
+
+    def trades(self, offset: int = 0, limit: int = 50, sort: str = 'Date', order: str = 'desc',
+               symbol: Optional[str] = None, direction: Optional[str] = None,
+               start: Optional[date] = None, end: Optional[date] = None,
+               layout: str = 'rows') -> Dict[str, Any]:
+        total, page = self.page(offset, limit, sort, order, symbol, direction, start, end)
+        return {
+            "dataset_id": self.id,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "order": order,
+            "trades": page.to_dict(as_series=False) if layout == 'columnar' else page.to_dicts(),
+        }
+
+    def symbols(self) -> List[str]:
+        if self._symbols is None:
+            self._symbols = _symbols(self._data.stored('Symbol')) if 'Symbol' in self.columns else []
+        return self._symbols
+
+    def aggregates(self) -> tuple:
+        with self._lock:
+            if self._aggregates is None:
+                df = self._values()
+                totals, daily = aggregate(df)
+                self._aggregates = (totals, daily, bucket_totals(df, PRESETS['default']))
+            return self._aggregates
+
+    def cube(self) -> pl.DataFrame:
+        with self._lock:
+            if self._cube is None:
+                self._cube = build_cube(self._values())
+            return self._cube
+
+    def breakdown(self, by: List[str], start: Optional[date] = None, end: Optional[date] = None,
+                  symbol: Optional[str] = None, direction: Optional[str] = None,
+                  layout: str = 'rows') -> Dict[str, Any]:
+        """Totals per combination of `by` dimensions, summed from the cube."""
+        if direction and direction not in DIRECTION_PATTERNS:
+            raise ValueError("'direction' must be 'long' or 'short'")
+        filters = {'Symbol': symbol, 'Direction': direction}
+        rows = rollup(self.cube(), by, start, end, {k: v for k, v in filters.items() if v})
+        return {
+            "dataset_id": self.id,
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            "by": by,
+            "rows": rows.to_dict(as_series=False) if layout == 'columnar' else rows.to_dicts(),
+        }
+
+    def calendar(self, month: Optional[str] = None, year: Optional[int] = None) -> Dict[str, Any]:
+        index = self._calendar
+        if index is None:
+            # O(days): appended datasets rebuild it from their merged daily aggregate
+            _, daily, _ = self.aggregates()
+            index = build_calendar(daily)
+            with self._lock:
+                self._calendar = index
+        return {"dataset_id": self.id, **lookup(index, month, year)}
+
+    def summary(self) -> Dict[str, Any]:
+        totals, daily, _ = self.aggregates()
+        return finalize(totals, daily)
+
+    def stats(self, start: Optional[date] = None, end: Optional[date] = None,
+              layout: str = 'rows', bucket_scheme: Optional[str] = None,
+              max_points: Optional[int] = None) -> Dict[str, Any]:
+        df = self._values(start, end)
+        if start is None and end is None and bucket_scheme in (None, 'default'):
+            # Whole dataset: reuse the stored aggregates
+            totals, daily, buckets = self.aggregates()
+            stats = finalize(totals, daily)
+            charts = prepare_charts_data(df, daily, bucket_totals_df=buckets, max_points=max_points)
+        else:
+            stats, daily = compute_stats(df)
+            charts = prepare_charts_data(df, daily, bucket_scheme, max_points=max_points)
+        return {
+            "dataset_id": self.id,
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            "stats": stats,
+            "charts": columnar_charts(charts) if layout == 'columnar' else charts,
+        }
+
+    def analytics(self, start: Optional[date] = None, end: Optional[date] = None,
+                  window: int = DEFAULT_WINDOW, unit: str = 'trades', layout: str = 'rows') -> Dict[str, Any]:
+        return {
+            "dataset_id": self.id,
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            **compute_analytics(self._values(start, end), window, unit, layout),
+        }
+
+    def simulate(self, start: Optional[date] = None, end: Optional[date] = None,
+                 params: SimulationParams = SimulationParams()) -> Dict[str, Any]:
+        return {
+            "dataset_id": self.id,
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            **simulate(self.slice(start, end, ['NetPnL'])['NetPnL'].to_numpy(), params),
+        }
+
+    def _id_index(self) -> pl.Series:
+        with self._lock:
+            if self._ids is None:
+                self._ids = self._data.column('Id').drop_nulls().sort()
+            return self._ids
+
+    def append(self, new: pl.DataFrame, new_id: str) -> Tuple["Dataset", int, int]:
+        """New dataset with the trades of `new` whose Id isn't already present.
+
+        Returns (dataset, rows added, duplicates skipped). Work is proportional
+        to the new rows when they come after the existing ones (by Date and by
+        Id), which is the case for a fresh daily export.
+        """
+        if 'Id' not in self.columns or 'Id' not in new.columns:
+            raise ValueError("Appending requires an 'Id' column in both exports")
+
+        schema = self._data.schema
+        # Align to the stored schema so the frames can share chunks
+        new = new.select([
+            pl.col(name).cast(dtype, strict=False) if name in new.columns else pl.lit(None, dtype).alias(name)
+            for name, dtype in schema.items()
+        ])
+        # Trades without an Id can't be told apart: all of them are kept
+        new = new.filter(pl.col('Id').is_null() | pl.col('Id').is_first_distinct())
+
+        ids = self._id_index()
+        new_ids = new['Id']
+        if len(ids) > 0:
+            # Binary search each new Id in the sorted index: O(k log n)
+            pos = ids.search_sorted(new_ids, side='left').clip(0, len(ids) - 1)
+            duplicate = (ids.gather(pos) == new_ids).fill_null(False)
+        else:
+            duplicate = pl.repeat(False, len(new), eager=True)
+        fresh = new.filter(~duplicate).sort('Date', maintain_order=True)
+        duplicates = len(new) - len(fresh)
+        if len(fresh) == 0:
+            return self, 0, duplicates
+
+        if len(self) == 0 or fresh['Date'][0] >= self.end_date:
+            data = self._data.extend(fresh)
+        else:
+            # Back-filled days: fall back to a full stable re-sort
+            data = CompactFrame.plain(pl.concat([self.df, fresh]).sort('Date', maintain_order=True))
+
+        fresh_ids = fresh['Id'].drop_nulls().sort()
+        if len(ids) == 0 or len(fresh_ids) == 0 or fresh_ids[0] > ids[-1]:
+            # Series.append would mutate the parent's index; concat shares chunks
+            merged_ids = pl.concat([ids, fresh_ids], rechunk=False)
+        else:
+            merged_ids = pl.concat([ids, fresh_ids]).sort()
+
+        aggregates = None
+        if self._aggregates is not None:
+            totals, daily, buckets = self._aggregates
+            new_totals, new_daily = aggregate(fresh)
+            aggregates = (
+                merge_totals(totals, new_totals),
+                merge_daily(daily, new_daily),
+                merge_bucket_totals(buckets, bucket_totals(fresh, PRESETS['default'])),
+            )
+
+        cube = merge_cubes(self._cube, build_cube(fresh)) if self._cube is not None else None
+
+        symbols = None
+        if self._symbols is not None:
+            fresh_symbols = _symbols(fresh['Symbol']) if 'Symbol' in self.columns else []
+            symbols = sorted(set(self._symbols).union(fresh_symbols))
+
+        appended = Dataset(new_id, data, presorted=True, aggregates=aggregates, ids=merged_ids, cube=cube,
+                           symbols=symbols)
+        return appended, len(fresh), duplicates
+
+
+def _symbols(column: pl.Series) -> List[str]:
+    return column.cast(pl.Utf8).drop_nulls().unique().sort().to_list()
+
+
+class DatasetStore:
+    def __init__(self, max_entries: int = 64, max_bytes: int = 1024 * 1024 * 1024, compact: str = "background"):
+        if compact not in ("background", "sync", "off"):
+            raise ValueError(f"Unknown compaction mode '{compact}'")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compact = compact
+        self._compactor: Optional[ThreadPoolExecutor] = None
+        self._datasets: "OrderedDict[str, Dataset]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "DatasetStore":
+        return cls(
+            max_entries=int(os.environ.get("DATASET_STORE_ENTRIES", 64)),
+            max_bytes=int(float(os.environ.get("DATASET_MEMORY_MB", 1024)) * 1024 * 1024),
+            compact=os.environ.get("DATASET_COMPACT", "background").lower(),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(dataset.nbytes for dataset in self._datasets.values())
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    def add(self, dataset_id: str, df: pl.DataFrame, aggregates: Optional[tuple] = None) -> Dataset:
+        """Store an uploaded frame; `aggregates` are the (totals, daily frame,
+        default bucket totals) its results were built from, if at hand."""
+        existing = self._lookup(dataset_id)
+        if existing is not None:
+            return existing
+        return self.put(Dataset(dataset_id, df, aggregates=aggregates))
+
+    def put(self, dataset: Dataset) -> Dataset:
+        if self.compact == "sync":
+            dataset.compact()
+        with self._lock:
+            self._datasets[dataset.id] = dataset
+            self._datasets.move_to_end(dataset.id)
+            size = sum(d.nbytes for d in self._datasets.values())
+            # Least recently used first; the dataset just added always stays
+            while len(self._datasets) > 1 and (len(self._datasets) > self.max_entries or size > self.max_bytes):
+                _, evicted = self._datasets.popitem(last=False)
+                size -= evicted.nbytes
+            if self.compact == "background" and not dataset.compacted:
+                if self._compactor is None:
+                    self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dataset-compactor")
+                self._compactor.submit(dataset.compact)
+        return dataset
+
+    def _lookup(self, dataset_id: str) -> Optional[Dataset]:
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+            return dataset
+
+    def get(self, dataset_id: str) -> Dataset:
+        dataset = self._lookup(dataset_id)
+        if dataset is not None:
+            return dataset
+        # Not in this worker: rehydrate from the result cache. Appended
+        # datasets are recipes: walk up to the closest ancestor at hand, then
+        # replay the appends onto it
+        from core.cache import get_cache
+        from core.processor import load_trades
+
+        cache = get_cache()
+        appends = []
+        key = dataset_id
+        while dataset is None:
+            entry = cache.get(key)
+            if entry is not None:
+                dataset = self.add(key, entry[0])
+                break
+            recipe = cache.get_recipe(key)
+            if recipe is None:
+                raise DatasetNotFoundError(dataset_id)
+            appends.append((key, recipe[1]))
+            key = recipe[0]
+            dataset = self._lookup(key)
+        if not appends:
+            return dataset
+        for key, content in reversed(appends):
+            dataset = dataset.append(load_trades(io.BytesIO(content)), key)[0]
+        return self.put(dataset)
+
+    def discard(self, dataset_id: str) -> None:
+        with self._lock:
+            self._datasets.pop(dataset_id, None)
+
+
+def append_upload(dataset_id: str, content: bytes) -> Dict[str, Any]:
+    """Append an uploaded export to a stored dataset, registering the result."""
+    from core.cache import content_key, get_cache
+    from core.processor import load_trades
+
+    store = get_store()
+    parent = store.get(dataset_id)
+    new = load_trades(io.BytesIO(content))
+    # Built once per parent (uploads come with theirs), then merged: the
+    # response below never scans the whole history
+    parent.aggregates()
+    parent.symbols()
+    dataset, added, duplicates = parent.append(new, derived_id(parent.id, content_key(content)))
+    if dataset is not parent:
+        store.put(dataset)
+        # The recipe rather than the frame, so the new ID survives eviction
+        # and works on every worker sharing RESULT_CACHE_DIR (see DatasetStore.get)
+        get_cache().put_recipe(dataset.id, parent.id, content)
+    totals, daily, buckets = dataset.aggregates()
+    return {
+        "dataset_id": dataset.id,
+        "parent_id": parent.id,
+        "added": added,
+        "duplicates": duplicates,
+        **{k: v for k, v in dataset.info().items() if k != "dataset_id"},
+        "stats": finalize(totals, daily),
+        # The aggregate-backed charts; the trade-level scatter is served by /stats
+        "charts": {
+            "daily_pnl": daily_series(daily),
+            "duration_distribution": bucket_rows(buckets, DEFAULT_LABELS),
+        },
+    }
+
+
+_store: Optional[DatasetStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> DatasetStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore.from_env()
+        return _store
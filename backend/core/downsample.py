@@ -0,0 +1,69 @@
+import math
+from typing import Optional
+
+import polars as pl
+
+# Resolution-aware chart series: with `max_points`, a chart never carries more
+# points than that, whatever the number of trades or days.
+#
+# Line series (equity curve) keep, per bucket of consecutive rows, the rows
+# holding the minimum and maximum of the plotted column, plus the first and
+# last rows, so peaks and drawdown troughs survive decimation and every kept
+# point is a real row. Scatter series are binned on a 2D grid and each
+# non-empty cell becomes one point at the mean of its trades, with a `count`.
+#
+# Both are a single group_by, and apply to whatever slice is requested: a
+# narrower date range keeps more of its rows, which is how zooming refines.
+
+MIN_POINTS = 16
+MAX_POINTS = 100_000
+
+
+def check_max_points(max_points: Optional[int]) -> None:
+    if max_points is not None and not MIN_POINTS <= max_points <= MAX_POINTS:
+        raise ValueError(f"max_points must be between {MIN_POINTS} and {MAX_POINTS}")
+
+
+def decimate(frame: pl.DataFrame, column: str, max_points: Optional[int]) -> pl.DataFrame:
+    """At most `max_points` rows of `frame`, in order, keeping each bucket's
+    min and max of `column`."""
+    n = frame.height
+    if max_points is None or n <= max_points:
+        return frame
+    buckets = (max_points - 2) // 2
+    row = pl.col('_row')
+    picks = (
+        frame.lazy()
+        .select(pl.int_range(n, dtype=pl.UInt32).alias('_row'), column)
+        .filter((row > 0) & (row < n - 1))
+        .group_by(((row - 1) * buckets // (n - 2)).alias('_bucket'))
+        .agg(row.get(pl.col(column).arg_min()).alias('lo'), row.get(pl.col(column).arg_max()).alias('hi'))
+        .collect()
+    )
+    rows = pl.concat([
+        pl.Series([0, n - 1], dtype=pl.UInt32), picks['lo'], picks['hi'],
+    ]).drop_nulls().unique().sort()
+    return frame[rows]
+
+
+def density(frame: pl.DataFrame, x: str, y: str, max_points: Optional[int]) -> pl.DataFrame:
+    """The (x, y) points, or once there are more than `max_points` of them,
+    one point per non-empty cell of a grid with at most `max_points` cells:
+    mean x, mean y and the number of points in the cell."""
+    if max_points is None or frame.height <= max_points:
+        return frame.select(x, y)
+    side = math.isqrt(max_points)
+
+    def cell(name: str) -> pl.Expr:
+        lo, hi = pl.col(name).min(), pl.col(name).max()
+        span = pl.when(hi > lo).then(hi - lo).otherwise(1.0)
+        return ((pl.col(name) - lo) / span * side).floor().clip(0, side - 1).cast(pl.Int32)
+
+    return (
+        frame.lazy()
+        .group_by(cell(x).alias('_x'), cell(y).alias('_y'))
+        .agg(pl.col(x).mean().round(2), pl.col(y).mean().round(2), pl.len().alias('count'))
+        .sort(x, y)
+        .select(x, y, 'count')
+        .collect()
+    )
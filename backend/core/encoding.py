@@ -0,0 +1,121 @@
+import gzip
+import io
+import json
+from datetime import date, datetime, time
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional
+
+from core.metrics import stage
+
+if TYPE_CHECKING:
+    import polars as pl
+
+# Response encoding shared by /upload and the dataset endpoints.
+#
+# Formats (picked from ?format= first, then the Accept header):
+#   rows      default; row-dict JSON, same shape as before
+#   columnar  JSON with one array per column for tabular fields
+#   arrow     Apache Arrow IPC stream of the tabular result
+#
+# JSON is encoded with orjson when it is installed, and bodies above
+# MIN_COMPRESS_SIZE are compressed with brotli (if installed) or gzip,
+# according to the client's Accept-Encoding.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional speedup
+    brotli = None
+
+FORMATS = ('rows', 'columnar', 'arrow')
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_MEDIA_TYPE = 'application/json'
+MIN_COMPRESS_SIZE = 4096
+
+
+class EncodedResponse(NamedTuple):
+    body: bytes
+    media_type: str
+    headers: Dict[str, str]
+    # Stage breakdown of the job that produced it (see core.metrics)
+    profile: Optional[Dict[str, Any]] = None
+    # Trades of an upload processed in a worker process, for the parent to
+    # register as a dataset (see core.executor), with the aggregates its
+    # results were built from (None when served from the result cache)
+    frame: Optional[Any] = None
+    aggregates: Optional[Any] = None
+
+
+def negotiate_format(accept: Optional[str], fmt: Optional[str] = None) -> str:
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+        return fmt
+    if accept and ARROW_MEDIA_TYPE in accept:
+        return 'arrow'
+    return 'rows'
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    offered = {token.split(';')[0].strip().lower() for token in accept_encoding.split(',')}
+    if brotli is not None and 'br' in offered:
+        return 'br'
+    if 'gzip' in offered:
+        return 'gzip'
+    return None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (date, datetime, time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def columnar(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Turn a list of row dicts into one list per column."""
+    if not rows:
+        return {}
+    return {key: [row.get(key) for row in rows] for key in rows[0]}
+
+
+def _finish(body: bytes, media_type: str, content_encoding: Optional[str],
+            headers: Optional[Dict[str, str]] = None) -> EncodedResponse:
+    headers = dict(headers or {})
+    headers['Vary'] = 'Accept, Accept-Encoding'
+    if content_encoding and len(body) >= MIN_COMPRESS_SIZE:
+        with stage("compress", bytes_in=len(body)) as s:
+            if content_encoding == 'br':
+                body = brotli.compress(body, quality=4)
+            else:
+                body = gzip.compress(body, compresslevel=5)
+            s.bytes_out = len(body)
+        headers['Content-Encoding'] = content_encoding
+    return EncodedResponse(body, media_type, headers)
+
+
+def encode_json(payload: Any, content_encoding: Optional[str] = None,
+                headers: Optional[Dict[str, str]] = None) -> EncodedResponse:
+    with stage("serialize") as s:
+        body = dumps(payload)
+        s.bytes_out = len(body)
+    return _finish(body, JSON_MEDIA_TYPE, content_encoding, headers)
+
+
+def encode_arrow(df: "pl.DataFrame", content_encoding: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None) -> EncodedResponse:
+    with stage("serialize", rows=len(df)) as s:
+        buf = io.BytesIO()
+        df.write_ipc_stream(buf)
+        s.bytes_out = buf.tell()
+    return _finish(buf.getvalue(), ARROW_MEDIA_TYPE, content_encoding, headers)
@@ -0,0 +1,259 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from core.encoding import EncodedResponse
+
+# Execution layer for CPU-heavy upload processing.
+# Keeps the event loop free while process_csv runs, bounds how much work can
+# queue up, and gives each job a deadline.
+#
+# Configuration (environment variables):
+#   UPLOAD_EXECUTOR     "thread" (default) or "process"
+#   UPLOAD_WORKERS      max jobs running at once (default: CPU count)
+#   UPLOAD_QUEUE_SIZE   max jobs waiting for a worker (default: 2 * workers)
+#   UPLOAD_TIMEOUT      per-job timeout in seconds (default: 120)
+#   UPLOAD_RETRY_AFTER  Retry-After hint in seconds when saturated (default: 5)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when both the workers and the wait queue are full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Upload queue is full, try again later")
+        self.retry_after = retry_after
+
+
+class JobTimeoutError(Exception):
+    """Raised when a job exceeds its deadline."""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        timeout: float = 120.0,
+        retry_after: int = 5,
+    ):
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.queue_size = self.max_workers * 2 if queue_size is None else queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        # Jobs admitted = running + waiting. The executor itself caps how many
+        # run at once; this counter caps how many may wait behind them.
+        self._admitted = 0
+
+    @classmethod
+    def from_env(cls) -> "WorkerPool":
+        return cls(
+            kind=os.environ.get("UPLOAD_EXECUTOR", "thread").lower(),
+            max_workers=_env_int("UPLOAD_WORKERS", 0) or None,
+            queue_size=_env_int("UPLOAD_QUEUE_SIZE", -1) if os.environ.get("UPLOAD_QUEUE_SIZE") else None,
+            timeout=_env_float("UPLOAD_TIMEOUT", 120.0),
+            retry_after=_env_int("UPLOAD_RETRY_AFTER", 5),
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + max(self.queue_size, 0)
+
+    @property
+    def pending(self) -> int:
+        return self._admitted
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: forking a process with a running Polars thread pool can deadlock
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="upload-worker"
+                )
+        return self._executor
+
+    async def prestart(self) -> None:
+        """Start the worker processes of a process pool ahead of the first
+        upload; each warms up first when APP_WARMUP is set (see core.warmup)."""
+        if self.kind != "process":
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, _ready) for _ in range(self.max_workers)))
+
+    def admit(self) -> None:
+        """Take a slot for a job run outside `run` (e.g. a streamed upload);
+        raises PoolSaturatedError when full. Pair with release()."""
+        with self._lock:
+            if self._admitted >= self.capacity:
+                raise PoolSaturatedError(self.retry_after)
+            self._admitted += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._admitted -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on the pool.
+
+        Raises PoolSaturatedError immediately if the queue is full and
+        JobTimeoutError if the job (including time spent queued) takes longer
+        than the timeout. With a process pool, fn and args must be picklable.
+        """
+        self.admit()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._get_executor(), fn, *args)
+        except Exception:
+            self.release()
+            raise
+        # The slot is held until the job really finishes, so timed-out jobs
+        # that are still burning CPU keep counting against the queue.
+        future.add_done_callback(lambda _: self.release())
+
+        deadline = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=deadline)
+        except asyncio.TimeoutError:
+            raise JobTimeoutError(f"Job exceeded {deadline:g}s timeout")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Set in the processes of a process pool
+_worker_process = False
+
+
+def _init_worker() -> None:
+    global _worker_process
+    from core.warmup import warmup, warmup_enabled
+
+    _worker_process = True
+    if warmup_enabled():
+        warmup()
+
+
+def _ready() -> None:
+    pass
+
+
+def process_bytes(content: bytes, include_data: bool = True, fmt: str = 'rows',
+                  content_encoding: Optional[str] = None, bucket_scheme: Optional[str] = None,
+                  max_points: Optional[int] = None):
+    # Top-level so it can be pickled for process pools. Returns the encoded
+    # body, so serialization and compression also stay off the event loop.
+    from core.cache import content_key
+    from core.processor import load_trades
+
+    return _process(content_key(content), lambda: load_trades(io.BytesIO(content)),
+                    include_data, fmt, content_encoding, bucket_scheme, max_points)
+
+
+def process_path(path: str, key: str, include_data: bool = True, fmt: str = 'rows',
+                 content_encoding: Optional[str] = None, bucket_scheme: Optional[str] = None,
+                 max_points: Optional[int] = None):
+    # Same as process_bytes for an upload spooled to disk (see core.ingest).
+    # Takes ownership of the file.
+    from core.processor import load_trades_path
+
+    try:
+        return _process(key, lambda: load_trades_path(path), include_data, fmt, content_encoding,
+                        bucket_scheme, max_points)
+    finally:
+        os.remove(path)
+
+
+def _process(key: str, load: Callable[[], Any], include_data: bool, fmt: str,
+             content_encoding: Optional[str], bucket_scheme: Optional[str], max_points: Optional[int]):
+    from core.metrics import profiling
+
+    # The stage breakdown travels back with the response (also from worker
+    # processes) for the Server-Timing header and /metrics
+    with profiling(key[:16]) as profile:
+        encoded = _encode(key, load, include_data, fmt, content_encoding, bucket_scheme, max_points)
+    return encoded._replace(profile=profile.to_dict())
+
+
+def _encode(key: str, load: Callable[[], Any], include_data: bool, fmt: str,
+            content_encoding: Optional[str], bucket_scheme: Optional[str], max_points: Optional[int]):
+    from core.cache import get_cache
+    from core.datasets import get_store
+    from core.encoding import encode_arrow, encode_json
+    from core.metrics import annotate, stage
+    from core.processor import make_response, results_and_aggregates, tailor_results
+
+    cache = get_cache()
+    with stage("cache_lookup"):
+        entry = cache.get(key)
+    annotate(cache_hit=entry is not None)
+    aggregates = None
+    if entry is not None:
+        df, results = entry
+        annotate(rows=len(df))
+    else:
+        df = load()
+        results, aggregates = results_and_aggregates(df)
+        with stage("cache_store", rows=len(df)):
+            cache.put(key, df, results)
+    results = tailor_results(df, results, bucket_scheme, max_points)
+    # Keep the frame server-side so range queries don't need a re-upload,
+    # seeded with the aggregates so appends merge into them. A worker process
+    # hands both back instead: its store is not the one that serves /datasets
+    # (see register_dataset)
+    handback = {"frame": df, "aggregates": aggregates} if _worker_process else {}
+    if not _worker_process:
+        get_store().add(key, df, aggregates)
+    headers = {"X-Dataset-Id": key}
+    if fmt == 'arrow':
+        # Tabular only: stats/charts are served by /datasets/{id}/stats
+        return encode_arrow(df, content_encoding, headers)._replace(**handback)
+    with stage("make_response", rows=len(df) if include_data else None):
+        payload = {"dataset_id": key, **make_response(df, results, include_data, fmt)}
+    return encode_json(payload, content_encoding, headers)._replace(**handback)
+
+
+def register_dataset(encoded: EncodedResponse) -> EncodedResponse:
+    """Store the dataset of an upload processed in a worker process, in this
+    process; returns the response without the frame."""
+    from core.datasets import get_store
+
+    get_store().add(encoded.headers["X-Dataset-Id"], encoded.frame, encoded.aggregates)
+    return encoded._replace(frame=None, aggregates=None)
+
+
+_pool: Optional[WorkerPool] = None
+
+
+def get_pool() -> WorkerPool:
+    global _pool
+    if _pool is None:
+        _pool = WorkerPool.from_env()
+    return _pool
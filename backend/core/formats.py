@@ -0,0 +1,161 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+import polars as pl
+
+# Timestamp and duration format detection.
+# Formats are picked once from a sample of a column's raw strings, then the
+# whole column is parsed with one exact, vectorized expression. No format is
+# tried on the full data, and nothing is parsed twice.
+#
+# UTC offsets ("10/01/2025 14:47:55 +01:00") are split off the end of the
+# string and turned into minutes arithmetically: parsing the wall-clock part
+# with a plain format is several times faster than parsing with `%z`.
+
+DATE_FORMATS = ['%m/%d/%Y', '%Y-%m-%d', '%d/%m/%Y', '%d.%m.%Y', '%Y/%m/%d', '%m-%d-%Y', '%d-%m-%Y']
+# Without fractional seconds first: `%.f` disables Polars' fast path
+TIME_FORMATS = ['%H:%M:%S', '%H:%M:%S%.f', '%H:%M', '%I:%M:%S %p', '%I:%M %p']
+DATETIME_FORMATS = DATE_FORMATS + [
+    f"{date}{sep}{time}" for date in DATE_FORMATS for sep in (' ', 'T') for time in TIME_FORMATS
+]
+
+_OFFSET = re.compile(r'( ?)(Z|[+-]\d{2}:?\d{2})$')
+# What precedes an offset: a time ("15-03-2024" ends in "-2024", a year)
+_TIME = re.compile(r'\d:\d{2}')
+# h:mm:ss with unbounded hours, optionally prefixed by days as d:h:mm:ss or d.hh:mm:ss
+_CLOCK = re.compile(r'^(\d+[:.])?\d+:\d{2}:\d{2}(\.\d+)?$')
+_NUMBER = re.compile(r'^-?\d+(\.\d+)?$')
+
+
+class DatetimeFormat(NamedTuple):
+    fmt: str                    # format of the wall-clock part
+    has_time: bool
+    offset_len: int = 0         # characters of " +01:00"-style suffix, 0 when absent
+    zulu: bool = False          # suffix is "Z"
+    colon: bool = True          # "+01:00" rather than "+0100"
+    cache: bool = False         # values repeat (session dates); cache parses
+
+
+class DurationFormat(NamedTuple):
+    kind: str                   # 'seconds' or 'clock'
+
+
+def _values(sample: pl.Series) -> pl.Series:
+    values = sample.drop_nulls().cast(pl.Utf8)
+    return values.filter(values.str.strip_chars() != '')
+
+
+def _offset(values: pl.Series) -> Optional[Tuple[int, bool, bool]]:
+    """(length, zulu, colon) of a UTC offset suffix carried by every value,
+    in the same shape and after a time; None otherwise."""
+    first = _OFFSET.search(values[0])
+    if first is None:
+        return None
+    suffix = first.group(0)
+    suffixes = values.str.extract(f"({_OFFSET.pattern})", 1)
+    if suffixes.is_null().any() or (suffixes.str.len_chars() != len(suffix)).any():
+        return None
+    if (suffixes.str.ends_with('Z') != (first.group(2) == 'Z')).any():
+        return None
+    if not values.str.head(-len(suffix)).str.contains(_TIME.pattern).all():
+        return None
+    return len(suffix), first.group(2) == 'Z', ':' in suffix
+
+
+def _parsed_count(values: pl.Series, fmt: str, has_time: bool) -> int:
+    dtype = pl.Datetime('us') if has_time else pl.Date
+    return values.str.strptime(dtype, fmt, strict=False).is_not_null().sum()
+
+
+def detect_datetime(sample: pl.Series, candidates: Optional[List[str]] = None) -> Optional[DatetimeFormat]:
+    """Best format for a column of date/datetime strings, None if nothing fits.
+
+    The first candidate parsing every sampled value wins; otherwise the one
+    parsing the most values (ties keep candidate order, so month-first beats
+    day-first for ambiguous dates, as before).
+    """
+    values = _values(sample)
+    if len(values) == 0:
+        return None
+
+    offset_len, zulu, colon = _offset(values) or (0, False, True)
+    if offset_len:
+        values = values.str.head(-offset_len)
+    # Polars' parse cache only pays off when values repeat
+    cache = values.n_unique() * 2 <= len(values)
+
+    best, best_count = None, 0
+    for fmt in candidates or DATETIME_FORMATS:
+        has_time = '%H' in fmt or '%I' in fmt
+        count = _parsed_count(values, fmt, has_time)
+        if count > best_count:
+            best, best_count = DatetimeFormat(fmt, has_time, offset_len, zulu, colon, cache), count
+            if count == len(values):
+                break
+    return best
+
+
+def detect_duration(sample: pl.Series) -> Optional[DurationFormat]:
+    values = _values(sample)
+    if len(values) == 0:
+        return None
+    if values.str.contains(_NUMBER.pattern).all():
+        return DurationFormat('seconds')
+    if values.str.contains(_CLOCK.pattern).any():
+        return DurationFormat('clock')
+    return None
+
+
+def matches(sample: pl.Series, fmt: DatetimeFormat) -> bool:
+    """Whether a previously detected format still parses every sampled value."""
+    values = _values(sample)
+    if (_offset(values) or (0, False, True)) != (fmt.offset_len, fmt.zulu, fmt.colon):
+        return False
+    if fmt.offset_len:
+        values = values.str.head(-fmt.offset_len)
+    return _parsed_count(values, fmt.fmt, fmt.has_time) == len(values)
+
+
+# -- expressions ---------------------------------------------------------------
+
+def wall_clock(column: str, fmt: DatetimeFormat) -> pl.Expr:
+    """Local wall-clock datetime (or date) as written, offset ignored."""
+    text = pl.col(column).cast(pl.Utf8)
+    if fmt.offset_len:
+        text = text.str.head(-fmt.offset_len)
+    return text.str.strptime(pl.Datetime('us') if fmt.has_time else pl.Date, fmt.fmt, strict=False, cache=fmt.cache)
+
+
+def offset_minutes(column: str, fmt: DatetimeFormat) -> Optional[pl.Expr]:
+    """UTC offset of each value in minutes, None when the format has none."""
+    if not fmt.offset_len or fmt.zulu:
+        return None
+    # Fixed positions from the end: "+01:00" / "+0100"
+    text = pl.col(column).cast(pl.Utf8)
+    width = 6 if fmt.colon else 5
+    hours = text.str.slice(-width + 1, 2).str.to_integer(strict=False)
+    minutes = text.str.slice(-2, 2).str.to_integer(strict=False)
+    total = hours * 60 + minutes
+    return pl.when(text.str.slice(-width, 1) == '-').then(-total).otherwise(total)
+
+
+def to_utc(wall: pl.Expr, offset: Optional[pl.Expr]) -> pl.Expr:
+    """Naive UTC datetime from a wall-clock datetime and its offset in minutes."""
+    if offset is None:
+        return wall
+    return wall - pl.duration(minutes=offset)
+
+
+def duration_seconds(column: str, fmt: DurationFormat) -> pl.Expr:
+    """Holding time in seconds as Float64 (null where unparseable)."""
+    col = pl.col(column)
+    if fmt.kind == 'seconds':
+        return col.cast(pl.Float64, strict=False)
+    # d:h:mm:ss / d.hh:mm:ss / h:mm:ss, hours may exceed 24
+    parts = col.cast(pl.Utf8).str.replace(r'^(\d+)\.(\d+:\d{2}:\d{2})', '$1:$2').str.split(':')
+    n = parts.list.len()
+    seconds = parts.list.get(-1, null_on_oob=True).cast(pl.Float64, strict=False)
+    minutes = parts.list.get(-2, null_on_oob=True).cast(pl.Float64, strict=False)
+    hours = parts.list.get(-3, null_on_oob=True).cast(pl.Float64, strict=False)
+    days = pl.when(n == 4).then(parts.list.get(0, null_on_oob=True).cast(pl.Float64, strict=False)).otherwise(0.0)
+    return pl.when(n.is_between(3, 4)).then(((days * 24 + hours) * 60 + minutes) * 60 + seconds)
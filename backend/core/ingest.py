@@ -0,0 +1,141 @@
+import codecs
+import os
+import tempfile
+from typing import BinaryIO, Iterable, Optional, Tuple
+
+# Memory-bounded ingestion for large uploads.
+# The upload is copied to a temp file in fixed-size chunks (hashing it on the
+# way for the result cache), transcoded to UTF-8 if needed, and then scanned
+# lazily by core.processor.scan_trades. The encoding is guessed from the
+# first bytes and UTF-8 is confirmed on the rest while copying; a file with
+# a legacy byte anywhere is read as latin-1, as a whole.
+#
+# Configuration (environment variables):
+#   STREAM_INGEST_THRESHOLD_MB  uploads larger than this are spooled (default: 16)
+#   UPLOAD_SPOOL_DIR            directory for spooled uploads (default: system temp)
+
+SAMPLE_BYTES = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+def stream_threshold() -> int:
+    return int(float(os.environ.get("STREAM_INGEST_THRESHOLD_MB", 16)) * 1024 * 1024)
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Best guess from the first bytes of a file: 'utf8', 'utf-16' or 'latin-1'."""
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # Not final: the sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf8'
+    except UnicodeDecodeError:
+        # latin-1 maps every byte, so it never fails (matches the old fallback)
+        return 'latin-1'
+
+
+def is_utf8(chunks: Iterable[bytes]) -> bool:
+    """Whether the concatenated chunks are valid UTF-8."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in chunks:
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _chunks(data: bytes) -> Iterable[memoryview]:
+    view = memoryview(data)
+    return (view[i:i + CHUNK_SIZE] for i in range(0, len(view), CHUNK_SIZE))
+
+
+def _file_chunks(path: str) -> Iterable[bytes]:
+    with open(path, "rb") as f:
+        yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+
+def content_encoding(content: bytes) -> str:
+    """Encoding of a whole file held in memory: detect_encoding, but UTF-8
+    only if every byte decodes (a legacy byte can come after the sample)."""
+    encoding = detect_encoding(content[:SAMPLE_BYTES])
+    if encoding == 'utf8' and not is_utf8(_chunks(content)):
+        return 'latin-1'
+    return encoding
+
+
+def file_encoding(path: str) -> str:
+    """content_encoding for a file on disk, read in chunks."""
+    with open(path, "rb") as f:
+        encoding = detect_encoding(f.read(SAMPLE_BYTES))
+    if encoding == 'utf8' and not is_utf8(_file_chunks(path)):
+        return 'latin-1'
+    return encoding
+
+
+def _check(validator, chunk: bytes, final: bool = False):
+    """Feed `chunk` to a UTF-8 decoder; None once the input is invalid."""
+    if validator is not None:
+        try:
+            validator.decode(chunk, final)
+        except UnicodeDecodeError:
+            return None
+    return validator
+
+
+def _transcode(path: str, encoding: str) -> None:
+    """Rewrite the file at `path` from `encoding` to UTF-8."""
+    fd, tmp = tempfile.mkstemp(suffix=".csv", prefix="upload-", dir=os.path.dirname(path))
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        with os.fdopen(fd, "wb") as out:
+            for chunk in _file_chunks(path):
+                out.write(decoder.decode(chunk).encode('utf-8'))
+            out.write(decoder.decode(b'', final=True).encode('utf-8'))
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def spool_upload(src: BinaryIO, hasher=None, directory: Optional[str] = None) -> Tuple[str, str]:
+    """Copy `src` to a UTF-8 temp file chunk by chunk.
+
+    Returns (path, encoding detected). `hasher` (a hashlib object) is fed the
+    original bytes. The caller owns the file and must remove it.
+    """
+    directory = directory or os.environ.get("UPLOAD_SPOOL_DIR") or None
+    fd, path = tempfile.mkstemp(suffix=".csv", prefix="upload-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            chunk = src.read(SAMPLE_BYTES)
+            encoding = detect_encoding(chunk)
+            decoder = None
+            if encoding != 'utf8':
+                decoder = codecs.getincrementaldecoder(encoding)()
+            # UTF-8 is copied as is, but checked on the way
+            validator = codecs.getincrementaldecoder('utf-8')() if decoder is None else None
+            while chunk:
+                if hasher is not None:
+                    hasher.update(chunk)
+                if decoder is not None:
+                    out.write(decoder.decode(chunk).encode('utf-8'))
+                else:
+                    out.write(chunk)
+                    validator = _check(validator, chunk)
+                chunk = src.read(CHUNK_SIZE)
+            if decoder is not None:
+                out.write(decoder.decode(b'', final=True).encode('utf-8'))
+            else:
+                validator = _check(validator, b'', final=True)
+        if decoder is None and validator is None:
+            # A legacy byte after the sample: the copy holds the original
+            # bytes, so the whole file is transcoded as latin-1
+            encoding = 'latin-1'
+            _transcode(path, encoding)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, encoding
@@ -0,0 +1,339 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Per-stage instrumentation of the upload pipeline and a Prometheus registry.
+#
+# Code on the processing path wraps its steps in `stage(name)`. The stages are
+# recorded only while a Profile is active (see `profiling`), so library use of
+# core.processor pays nothing beyond a context variable lookup. Jobs build
+# their profile where they run (thread or process) and return it as a plain
+# dict; the web process turns it into a Server-Timing header and metrics.
+#
+# Memory figures are process-wide RSS readings, so with several uploads in
+# flight they are approximate.
+#
+# Configuration (environment variables):
+#   UPLOAD_PROFILE      "1" to dump a cProfile + stage breakdown of every upload (default: off)
+#   UPLOAD_PROFILE_DIR  where profiles are written (default: <system temp>/upload-profiles)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):  # pragma: no cover - Windows
+    _PAGE_SIZE = None
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, None where unsupported."""
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss() -> Optional[int]:
+    """High-water mark of this process' RSS in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# -- per-request profile -----------------------------------------------------
+
+class Stage:
+    __slots__ = ('name', 'seconds', 'rows', 'bytes_in', 'bytes_out', 'rss_delta')
+
+    def __init__(self, name: str, rows: Optional[int] = None, bytes_in: Optional[int] = None,
+                 bytes_out: Optional[int] = None):
+        self.name = name
+        self.seconds = 0.0
+        self.rows = rows
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.rss_delta: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__ if getattr(self, key) is not None}
+
+
+class Profile:
+    def __init__(self):
+        self.stages: List[Stage] = []
+        self.info: Dict[str, Any] = {}
+        self.started = time.perf_counter()
+        self.seconds: Optional[float] = None
+
+    def finish(self) -> None:
+        self.seconds = time.perf_counter() - self.started
+        self.info.setdefault('peak_rss', peak_rss())
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.seconds is None:
+            self.finish()
+        return {
+            "seconds": self.seconds,
+            "stages": [s.to_dict() for s in self.stages],
+            "info": self.info,
+        }
+
+
+_current: ContextVar[Optional[Profile]] = ContextVar('upload_profile', default=None)
+
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None, bytes_in: Optional[int] = None) -> Iterator[Stage]:
+    """Time a step of the active profile. Set `.rows` / `.bytes_out` on the
+    yielded Stage when they are only known afterwards."""
+    record = Stage(name, rows, bytes_in)
+    profile = _current.get()
+    if profile is None:
+        yield record
+        return
+    rss = current_rss()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        if rss is not None:
+            record.rss_delta = current_rss() - rss
+        profile.stages.append(record)
+
+
+def annotate(**info: Any) -> None:
+    """Attach details (encoding, cache hit, ...) to the active profile."""
+    profile = _current.get()
+    if profile is not None:
+        profile.info.update(info)
+
+
+def profile_enabled() -> bool:
+    return os.environ.get('UPLOAD_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+@contextmanager
+def profiling(label: str = 'upload') -> Iterator[Profile]:
+    """Record stages for the duration of the block (one job)."""
+    profile = Profile()
+    profiler = cProfile.Profile() if profile_enabled() else None
+    token = _current.set(profile)
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield profile
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _current.reset(token)
+        profile.finish()
+        if profiler is not None:
+            dump_profile(label, profile, profiler)
+
+
+def dump_profile(label: str, profile: Profile, profiler: cProfile.Profile) -> str:
+    """Write <dir>/<time>-<label>.prof (cProfile, e.g. for snakeviz) and a
+    .json with the stage breakdown and the top functions. Returns the base path."""
+    directory = os.environ.get('UPLOAD_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'upload-profiles')
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{label}")
+    profiler.dump_stats(base + '.prof')
+
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    top = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in list(stats.stats.items()):
+        top.append({"function": f"{filename}:{line}({function})", "calls": calls,
+                    "own_seconds": own, "cumulative_seconds": cumulative})
+    top.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump({**profile.to_dict(), "top_functions": top[:50]}, f, indent=2, default=str)
+    return base
+
+
+def server_timing(stages: Sequence[Dict[str, Any]], total: Optional[float] = None) -> str:
+    """Server-Timing header value (durations in ms) for a list of stage dicts."""
+    parts = [f"{s['name']};dur={s['seconds'] * 1000:.2f}" for s in stages]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+# -- Prometheus registry -----------------------------------------------------
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, Any] = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels: Any) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(float(bound))))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """The application's metrics, rendered in the Prometheus text format."""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self.request_seconds = Histogram(
+            'http_request_duration_seconds', 'HTTP request latency by route and status.')
+        self.upload_seconds = Histogram(
+            'upload_duration_seconds', 'End-to-end /upload latency, including queueing.')
+        self.stage_seconds = Histogram(
+            'upload_stage_duration_seconds', 'Time spent per processing stage.')
+        self.rows = Counter('upload_rows_total', 'Trades processed by uploads.')
+        self.bytes_in = Counter('upload_bytes_in_total', 'Bytes of CSV received by uploads.')
+        self.bytes_out = Counter('upload_bytes_out_total', 'Response bytes sent by uploads.')
+        self.cache = Counter('upload_cache_requests_total', 'Result cache lookups by result (hit/miss).')
+        self.peak_rss = Gauge('process_peak_resident_memory_bytes', 'High-water mark of the RSS of this process.')
+        self.rss = Gauge('process_resident_memory_bytes', 'Resident memory of this process.')
+        self.pending = Gauge('upload_pool_pending_jobs', 'Uploads running or queued on the worker pool.')
+        self.worker_peak_rss = Gauge('upload_worker_peak_resident_memory_bytes',
+                                     'Peak RSS reported by the worker of the latest upload.')
+        self.warmup_seconds = Gauge('app_warmup_duration_seconds', 'Time spent per warmup step at startup.')
+
+    def all(self) -> List[_Metric]:
+        return [m for m in vars(self).values() if isinstance(m, _Metric)]
+
+    def observe_upload(self, profile: Dict[str, Any], seconds: float, bytes_in: int, bytes_out: int) -> None:
+        self.upload_seconds.observe(seconds)
+        self.bytes_in.inc(bytes_in)
+        self.bytes_out.inc(bytes_out)
+        for s in profile.get('stages', []):
+            self.stage_seconds.observe(s['seconds'], stage=s['name'])
+        info = profile.get('info', {})
+        if 'rows' in info:
+            self.rows.inc(info['rows'])
+        if 'cache_hit' in info:
+            self.cache.inc(result='hit' if info['cache_hit'] else 'miss')
+        if info.get('peak_rss') is not None:
+            self.worker_peak_rss.set(info['peak_rss'])
+
+    def render(self) -> str:
+        for gauge, value in ((self.rss, current_rss()), (self.peak_rss, peak_rss())):
+            if value is not None:
+                gauge.set(value)
+        lines = []
+        for metric in self.all():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
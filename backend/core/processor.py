@@ -1,375 +1,411 @@
 import polars as pl
-from typing import Dict, Any, BinaryIO
+from typing import Dict, Any, BinaryIO, List, NamedTuple, Optional, Tuple
+from collections import OrderedDict
 import io
+import os
+import threading
+from core.encoding import columnar
+from core.metrics import annotate, stage
+from core.ingest import content_encoding
+from core.profiles import BrokerProfile, match_profile
+from core.formats import (DATE_FORMATS, DatetimeFormat, DurationFormat, detect_datetime, detect_duration,
+                          duration_seconds, matches as format_matches, offset_minutes, to_utc, wall_clock)
+from core.stats import aggregate, compute_stats, daily_aggregate, finalize
+from core.buckets import parse_scheme, bucket_rows, bucket_stats, bucket_totals
+from core.downsample import decimate, density
+
+# Bump whenever normalization or stats output changes so cached results
+# computed by an older processor are never served.
+PROCESSOR_VERSION = "6"
+
+# Rows read eagerly to make per-file parsing decisions
+SAMPLE_ROWS = 1000
 
 def process_csv(file: BinaryIO) -> Dict[str, Any]:
+    df = load_trades(file)
+    results = build_results(df)
+    with stage("make_response", rows=len(df)):
+        return make_response(df, results)
+
+def make_response(df: pl.DataFrame, results: Dict[str, Any], include_data: bool = True,
+                  layout: str = 'rows') -> Dict[str, Any]:
+    # layout='columnar' returns one array per column for data and chart series
+    response = {**results, "message": "File processed successfully"}
+    if layout == 'columnar':
+        response["charts"] = columnar_charts(results["charts"])
+    if include_data:
+        response["data"] = df.to_dict(as_series=False) if layout == 'columnar' else df.to_dicts() # Return raw data rows
+    return response
+
+def columnar_charts(charts: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: columnar(rows) for name, rows in charts.items()}
+
+def build_results(df: pl.DataFrame) -> Dict[str, Any]:
+    return results_and_aggregates(df)[0]
+
+def results_and_aggregates(df: pl.DataFrame) -> Tuple[Dict[str, Any], tuple]:
+    """Upload results, plus the (totals, daily frame, default bucket totals)
+    they were built from, for seeding the dataset (see core.datasets)."""
+    # The daily aggregate is computed once and shared by stats and charts
+    with stage("calculate_stats", rows=len(df)):
+        totals, daily = aggregate(df)
+        stats = finalize(totals, daily)
+    with stage("prepare_charts_data", rows=len(df)):
+        buckets = bucket_totals(df, parse_scheme(None)[0])
+        charts = prepare_charts_data(df, daily, bucket_totals_df=buckets)
+    return {
+        "stats": stats,
+        "charts": charts,
+    }, (totals, daily, buckets)
+
+def load_trades(file: BinaryIO) -> pl.DataFrame:
+    """Read a trades CSV held in memory and normalize it to the standard columns
+    (Date, Symbol, PnL, Fees, NetPnL, Duration, Direction)."""
     try:
         # Read the file content into bytes
         content = file.read()
-        
-        # Try different encodings
-        try:
-            df = pl.read_csv(io.BytesIO(content), try_parse_dates=True)
-        except:
-            # Fallback for common encoding issues
-            df = pl.read_csv(io.BytesIO(content), encoding='latin-1', try_parse_dates=True)
-
-        # 1. Normalize Columns (Best Effort Mapping)
-        # We need standard columns: Date, Symbol, PnL, Duration (optional), Direction (optional)
-        # Map common names to standardized names
-        # Logic: Look for specific keywords in columns and rename
-        column_map = {}
-        cols_lower = {c.lower(): c for c in df.columns}
-        
-        # Map PnL
-        pnl_candidates = ['pnl', 'profit', 'net profit', 'net_profit', 'pl', 'amount']
-        for c in pnl_candidates:
-            if c in cols_lower:
-                column_map[cols_lower[c]] = 'PnL'
-                break
-        
-        # Map Date (Exit Date usually for PnL attribution)
-        date_candidates = ['date', 'exit date', 'close date', 'time', 'close time', 'exitedat', 'trade day', 'tradeday', 'enteredat']
-        for c in date_candidates:
-            if c in cols_lower:
-                column_map[cols_lower[c]] = 'Date'
-                break
-        
-        # Map Symbol
-        symbol_candidates = ['symbol', 'ticker', 'instrument', 'asset', 'contractname', 'contract']
-        for c in symbol_candidates:
-            if c in cols_lower:
-                column_map[cols_lower[c]] = 'Symbol'
-                break
-                
-        # Map Duration (if exists)
-        dur_candidates = ['duration', 'holding time', 'tradeduration', 'trade duration']
-        for c in dur_candidates:
-            if c in cols_lower:
-                column_map[cols_lower[c]] = 'Duration'
-                break
-                
-        # Map Direction (Long/Short)
-        dir_candidates = ['direction', 'type', 'side']
-        for c in dir_candidates:
-            if c in cols_lower:
-                column_map[cols_lower[c]] = 'Direction'
-                break
-        
-        # Map Fees
-        fees_candidates = ['fees', 'fee', 'commission', 'commissions', 'cost']
-        for c in fees_candidates:
-            if c in cols_lower:
-                column_map[cols_lower[c]] = 'Fees'
-                break
-      # Identify Entry/Exit columns for Duration calculation before renaming/casting
-        entered_candidates = ['enteredat', 'entered at', 'entry time', 'open time', 'formatted_entry_time']
-        exited_candidates = ['exitedat', 'exited at', 'exit time', 'close time', 'formatted_exit_time']
-        
-        entered_col_raw = None
-        exited_col_raw = None
-        
-        for c in entered_candidates:
-            if c in cols_lower:
-                entered_col_raw = cols_lower[c]
-                break
-                
-        for c in exited_candidates:
-            if c in cols_lower:
-                exited_col_raw = cols_lower[c]
-                break
-
-        # Preserve raw columns for duration calc
-        if entered_col_raw:
-            df = df.with_columns(pl.col(entered_col_raw).alias('_EnteredRaw'))
-        if exited_col_raw:
-            df = df.with_columns(pl.col(exited_col_raw).alias('_ExitedRaw'))
-
-        # Rename columns based on map
-        if column_map:
-            df = df.rename(column_map)
-        
-        if 'PnL' not in df.columns or 'Date' not in df.columns:
-            # Fallback/Error if critical cols missing
-             raise ValueError("CSV must contain at least 'Date' & 'Profit/PnL' columns.")
-
-        # Ensure types
-        # Handle formatting like "11/04/2025 16:47:10 +01:00"
-        # Strategy: Split by space to get date part, then parse
-        try:
-             # Try custom parsing for known format "MM/DD/YYYY ..."
-             df = df.with_columns(
-                 pl.col('Date').str.split(" ").list.get(0).str.strptime(pl.Date, "%m/%d/%Y", strict=False).alias('Date_Parsed')
-             )
-             # If successful (not all null), use it. if all null, fallback to standard cast
-             if df['Date_Parsed'].null_count() < len(df):
-                 df = df.with_columns(pl.col('Date_Parsed').alias('Date')).drop('Date_Parsed')
-             else:
-                 # Fallback to direct cast (e.g. if it was already YYYY-MM-DD)
-                 df = df.drop('Date_Parsed').with_columns(pl.col('Date').cast(pl.Date, strict=False))
-        except:
-             # Fallback
-             df = df.with_columns(pl.col('Date').cast(pl.Date, strict=False))
-
-        # Handle Fees column
-        if 'Fees' in df.columns:
-            df = df.with_columns([
-                pl.col('Fees').cast(pl.Float64, strict=False).fill_null(0.0)
-            ])
-        else:
-            df = df.with_columns(pl.lit(0.0).alias('Fees'))
-        
-        df = df.with_columns([
-            pl.col('PnL').cast(pl.Float64, strict=False).fill_null(0.0)
-        ]).drop_nulls(['Date']) # Drop rows where Date is invalid/null
-        
-        # Handle Duration - Calculate from timestamps if available
-        if '_EnteredRaw' in df.columns and '_ExitedRaw' in df.columns:
-            try:
-                df_temp = df.with_columns([
-                    pl.col('_EnteredRaw').str.strptime(pl.Datetime, '%m/%d/%Y %H:%M:%S %z', strict=False).alias('EnteredTime'),
-                    pl.col('_ExitedRaw').str.strptime(pl.Datetime, '%m/%d/%Y %H:%M:%S %z', strict=False).alias('ExitedTime')
-                ])
-                df = df_temp.with_columns(
-                    ((pl.col('ExitedTime') - pl.col('EnteredTime')).dt.total_seconds()).fill_null(0.0).alias('Duration')
-                ).drop(['EnteredTime', 'ExitedTime'])
-            except:
-                pass
-            
-            # Remove raw columns
-            df = df.drop(['_EnteredRaw', '_ExitedRaw'])
-            
-        if 'Duration' in df.columns and df.schema['Duration'] != pl.Float64:
-            # If it's Time type (common from CSV imports of duration strings like HH:MM:SS)
-            if df.schema['Duration'] == pl.Time:
-                df = df.with_columns(
-                    (pl.col("Duration").dt.hour() * 3600 + 
-                     pl.col("Duration").dt.minute() * 60 + 
-                     pl.col("Duration").dt.second() + 
-                     pl.col("Duration").dt.nanosecond() / 1e9).cast(pl.Float64).alias("Duration")
-                )
-            # If it's String, try to parse to Time first then convert
-            elif df.schema['Duration'] == pl.Utf8:
-                try:
-                    df = df.with_columns(
-                        pl.col("Duration").str.strptime(pl.Time, "%H:%M:%S%.f", strict=False).alias("Duration_Time")
-                    )
-                    df = df.with_columns(
-                         (pl.col("Duration_Time").dt.hour() * 3600 + 
-                          pl.col("Duration_Time").dt.minute() * 60 + 
-                          pl.col("Duration_Time").dt.second() + 
-                          pl.col("Duration_Time").dt.nanosecond() / 1e9).fill_null(0.0).alias("Duration")
-                    ).drop("Duration_Time")
-                except:
-                   df = df.with_columns(pl.lit(0.0).alias('Duration'))
-            else:
-                 # Ensure Float
-                 df = df.with_columns(pl.col('Duration').cast(pl.Float64, strict=False).fill_null(0.0))
-        elif 'Duration' not in df.columns:
-            # If Duration missing entirely, default to 0
-            df = df.with_columns(pl.lit(0.0).alias('Duration'))
-        
-        # Calculate Net PnL (PnL - Fees) for accurate total
-        df = df.with_columns(
-            (pl.col('PnL') - pl.col('Fees')).alias('NetPnL')
-        )
-        
-        # If Direction missing, try to infer (Optional, simplified)
-        if 'Direction' not in df.columns:
-             df = df.with_columns(pl.lit('Unknown').alias('Direction'))
-
-        # Calculate statistics
-        stats = calculate_stats(df)
-        
-        # Prepare charts data
-        charts = prepare_charts_data(df)
-        
-        return {
-            "stats": stats,
-            "charts": charts,
-            "data": df.to_dicts(), # Return raw data rows
-            "message": "File processed successfully"
-        }
+        encoding = content_encoding(content)
+        annotate(encoding=encoding)
+        with stage("detect_formats"):
+            sample = pl.read_csv(io.BytesIO(content), n_rows=SAMPLE_ROWS, encoding=encoding, infer_schema=False)
+            plan = plan_trades(sample)
+        annotate(profile=plan.profile.name if plan.profile else None)
+        with stage("read_csv", bytes_in=len(content)) as s:
+            df = pl.read_csv(io.BytesIO(content), encoding=encoding, columns=plan.projection,
+                             schema_overrides=plan.overrides)
+            s.rows = len(df)
+        with stage("normalize", rows=len(df)):
+            df = normalize_trades(df.lazy(), plan).collect()
+        annotate(rows=len(df))
+        return df
     except Exception as e:
         raise ValueError(f"Error processing CSV: {str(e)}")
 
-def calculate_stats(df: pl.DataFrame) -> Dict[str, Any]:
-    # General
-    total_trades = len(df)
-    total_pnl = df['NetPnL'].sum()  # Use NetPnL (PnL - Fees)
-    total_fees = df['Fees'].sum()
-    gross_pnl = df['PnL'].sum()
-    
-    # Win/Loss (based on PnL before fees for trade classification)
-    wins = df.filter(pl.col('PnL') > 0)
-    losses = df.filter(pl.col('PnL') <= 0)
-    
-    win_count = len(wins)
-    loss_count = len(losses)
-    win_rate = (win_count / total_trades * 100) if total_trades > 0 else 0.0
+def scan_trades(path: str) -> pl.LazyFrame:
+    """Lazily scan a UTF-8 trades CSV on disk (see core.ingest) and normalize it.
+    Nothing is read beyond a small sample until the result is collected."""
+    plan = plan_trades(pl.read_csv(path, n_rows=SAMPLE_ROWS, infer_schema=False))
+    df = pl.scan_csv(path, schema_overrides=plan.overrides)
+    if plan.projection:
+        df = df.select(plan.projection)
+    return normalize_trades(df, plan)
+
+def load_trades_path(path: str) -> pl.DataFrame:
+    try:
+        # Streaming engine: the raw file is processed in batches, only the
+        # normalized columns are materialized. Parsing and normalization are
+        # fused, so they are one stage.
+        with stage("scan_normalize", bytes_in=os.path.getsize(path)) as s:
+            df = scan_trades(path).collect(engine='streaming')
+            s.rows = len(df)
+        annotate(rows=len(df))
+        return df
+    except Exception as e:
+        raise ValueError(f"Error processing CSV: {str(e)}")
+
+class ParsePlan(NamedTuple):
+    """How to normalize one export layout: column roles and parse formats."""
+    columns: Tuple[str, ...]                # header signature
+    column_map: Dict[str, str]              # raw name -> standard name
+    date: str                               # raw column holding the trade date
+    entered: Optional[str]
+    exited: Optional[str]
+    trade_day: Optional[str]
+    formats: Dict[str, DatetimeFormat]      # raw date/timestamp column -> format
+    duration: Optional[DurationFormat]      # of the column mapped to Duration
+    profile: Optional[BrokerProfile] = None # known broker layout, None for best-effort mapping
+
+    @property
+    def duration_column(self) -> Optional[str]:
+        return next((raw for raw, std in self.column_map.items() if std == 'Duration'), None)
+
+    @property
+    def timestamps(self) -> bool:
+        """Durations come from entry/exit timestamps."""
+        return all(c in self.formats and self.formats[c].has_time for c in (self.entered, self.exited))
+
+    @property
+    def projection(self) -> Optional[List[str]]:
+        """Columns to read, None for all."""
+        return list(self.profile.columns) if self.profile else None
+
+    @property
+    def overrides(self) -> Dict[str, pl.DataType]:
+        """Explicit dtypes from the profile; date/timestamp columns as text,
+        the plan parses them exactly once."""
+        overrides = {name: dtype for name, dtype in self.profile.dtypes.items() if dtype is not None} if self.profile else {}
+        overrides.update({name: pl.Utf8 for name in self.formats})
+        if self.duration_column and (self.timestamps or (self.duration and self.duration.kind == 'clock')):
+            overrides[self.duration_column] = pl.Utf8
+        return overrides
+
+    def matches(self, sample: pl.DataFrame) -> bool:
+        return (tuple(sample.columns) == self.columns
+                and all(format_matches(sample[name], f) for name, f in self.formats.items())
+                and (self.duration_column is None or detect_duration(sample[self.duration_column]) == self.duration))
+
+# Plans cached per header signature, so repeated exports of the same layout
+# skip format detection (the cached formats are still checked on the sample)
+MAX_CACHED_PLANS = 64
+_plans: "OrderedDict[Tuple[str, ...], ParsePlan]" = OrderedDict()
+_plans_lock = threading.Lock()
+
+def plan_trades(sample: pl.DataFrame) -> ParsePlan:
+    """Parse plan for an export, given its first rows read as text
+    (`infer_schema=False`)."""
+    key = tuple(sample.columns)
+    with _plans_lock:
+        plan = _plans.get(key)
+    if plan is not None and plan.matches(sample):
+        return plan
+    plan = build_plan(sample)
+    with _plans_lock:
+        _plans[key] = plan
+        _plans.move_to_end(key)
+        while len(_plans) > MAX_CACHED_PLANS:
+            _plans.popitem(last=False)
+    return plan
+
+def build_plan(sample: pl.DataFrame) -> ParsePlan:
+    columns = sample.columns
+    profile = match_profile(tuple(columns))
+    if profile is not None:
+        column_map = dict(profile.column_map)
+        entered_col_raw, exited_col_raw, trade_day_raw = profile.entered, profile.exited, profile.trade_day
+    else:
+        column_map, entered_col_raw, exited_col_raw, trade_day_raw = map_columns(columns)
+
+    if 'PnL' not in column_map.values() or 'Date' not in column_map.values():
+        # Fallback/Error if critical cols missing
+        raise ValueError("CSV must contain at least 'Date' & 'Profit/PnL' columns.")
+    date_col_raw = next(raw for raw, std in column_map.items() if std == 'Date')
+
+    # Pick one exact format per date/timestamp column from the sample
+    formats = {}
+    for name in dict.fromkeys([date_col_raw, entered_col_raw, exited_col_raw, trade_day_raw]):
+        if name is None:
+            continue
+        fmt = detect_datetime(sample[name])
+        if fmt is not None:
+            formats[name] = fmt
+    if date_col_raw not in formats:
+        if sample[date_col_raw].drop_nulls().len() > 0:
+            raise ValueError(f"Could not recognize the date format of column '{date_col_raw}'")
+        # No rows to decide on; any format yields an empty result
+        formats[date_col_raw] = DatetimeFormat(DATE_FORMATS[0], has_time=False)
+
+    duration_raw = next((raw for raw, std in column_map.items() if std == 'Duration'), None)
+    duration = detect_duration(sample[duration_raw]) if duration_raw else None
+
+    return ParsePlan(tuple(columns), column_map, date_col_raw, entered_col_raw, exited_col_raw,
+                     trade_day_raw, formats, duration, profile)
+
+def map_columns(columns: List[str]) -> Tuple[Dict[str, str], Optional[str], Optional[str], Optional[str]]:
+    """Best-effort mapping of an unknown layout: raw -> standard names, and
+    the entry, exit and trade-day columns."""
+    # Normalize Columns (Best Effort Mapping)
+    # We need standard columns: Date, Symbol, PnL, Duration (optional), Direction (optional)
+    # Map common names to standardized names
+    # Logic: Look for specific keywords in columns and rename
+    column_map = {}
+    cols_lower = {c.lower(): c for c in columns}
     
-    avg_win = wins['PnL'].mean() if win_count > 0 else 0.0
-    avg_loss = losses['PnL'].mean() if loss_count > 0 else 0.0
+    # Map PnL
+    pnl_candidates = ['pnl', 'profit', 'net profit', 'net_profit', 'pl', 'amount']
+    for c in pnl_candidates:
+        if c in cols_lower:
+            column_map[cols_lower[c]] = 'PnL'
+            break
     
-    gross_profit = wins['PnL'].sum()
-    gross_loss = abs(losses['PnL'].sum())
-    profit_factor = (gross_profit / gross_loss) if gross_loss > 0 else 0.0 # Avoid inf for JSON safety
+    # Map Date (Exit Date usually for PnL attribution)
+    date_candidates = ['date', 'exit date', 'close date', 'time', 'close time', 'exitedat', 'trade day', 'tradeday', 'enteredat']
+    for c in date_candidates:
+        if c in cols_lower:
+            column_map[cols_lower[c]] = 'Date'
+            break
     
-    # Expected Value: (Win% * AvgWin) + (Loss% * AvgLoss) -> Avg PnL per trade
-    expected_value = df['PnL'].mean() if total_trades > 0 else 0.0
-
-    # Trade Info
-    best_trade = df['PnL'].max()
-    worst_trade = df['PnL'].min()
-    best_trade_net = df['NetPnL'].max()
-    worst_trade_net = df['NetPnL'].min()
+    # Map Symbol
+    symbol_candidates = ['symbol', 'ticker', 'instrument', 'asset', 'contractname', 'contract']
+    for c in symbol_candidates:
+        if c in cols_lower:
+            column_map[cols_lower[c]] = 'Symbol'
+            break
+            
+    # Map Duration (if exists)
+    dur_candidates = ['duration', 'holding time', 'tradeduration', 'trade duration']
+    for c in dur_candidates:
+        if c in cols_lower:
+            column_map[cols_lower[c]] = 'Duration'
+            break
+            
+    # Map Direction (Long/Short)
+    dir_candidates = ['direction', 'type', 'side']
+    for c in dir_candidates:
+        if c in cols_lower:
+            column_map[cols_lower[c]] = 'Direction'
+            break
     
-    # Averages Duration (Assuming 'Duration' column might be seconds or minutes)
-    # If duration is 0, these will be 0
-    avg_duration = df['Duration'].mean()
-    avg_win_duration = wins['Duration'].mean() if win_count > 0 else 0.0
-    avg_loss_duration = losses['Duration'].mean() if loss_count > 0 else 0.0
+    # Map Fees
+    fees_candidates = ['fees', 'fee', 'commission', 'commissions', 'cost']
+    for c in fees_candidates:
+        if c in cols_lower:
+            column_map[cols_lower[c]] = 'Fees'
+            break
+    # Identify Entry/Exit columns for Duration calculation
+    entered_candidates = ['enteredat', 'entered at', 'entry time', 'open time', 'formatted_entry_time']
+    exited_candidates = ['exitedat', 'exited at', 'exit time', 'close time', 'formatted_exit_time']
+    entered_col_raw = next((cols_lower[c] for c in entered_candidates if c in cols_lower), None)
+    exited_col_raw = next((cols_lower[c] for c in exited_candidates if c in cols_lower), None)
+    # Session date of the broker (e.g. TopStepX "09/30/2025 19:00:00 -05:00" for Oct 1)
+    trade_day_raw = next((cols_lower[c] for c in ('tradeday', 'trade day') if c in cols_lower), None)
+    return column_map, entered_col_raw, exited_col_raw, trade_day_raw
+
+def normalize_trades(df: pl.LazyFrame, plan: ParsePlan) -> pl.LazyFrame:
+    """Apply a parse plan to a raw export read with `schema_overrides=plan.overrides`."""
+    # Parse every date/timestamp column once, before renaming: the Date column
+    # can be the same raw column as the exit timestamp
+    wall = {name: f'_{name}_wall' for name in plan.formats}
+    offset = {}
+    parsed = []
+    for name, fmt in plan.formats.items():
+        parsed.append(wall_clock(name, fmt).alias(wall[name]))
+        minutes = offset_minutes(name, fmt)
+        if minutes is not None:
+            offset[name] = f'_{name}_offset'
+            parsed.append(minutes.alias(offset[name]))
+    df = df.with_columns(parsed)
+
+    def utc(name: str) -> pl.Expr:
+        return to_utc(pl.col(wall[name]), pl.col(offset[name]) if name in offset else None)
+
+    def day(name: str) -> pl.Expr:
+        if not plan.formats[name].has_time:
+            return pl.col(wall[name])
+        if name == plan.trade_day:
+            # The session date is the UTC date of the session start, e.g.
+            # "09/30/2025 19:00:00 -05:00" -> 2025-10-01
+            return utc(name).dt.date()
+        # Otherwise the local calendar date, as written in the export
+        return pl.col(wall[name]).dt.date()
+
+    derived = [day(plan.date).alias('_Date')]
+    if plan.timestamps:
+        derived.append((utc(plan.exited) - utc(plan.entered)).dt.total_seconds().alias('_TimestampDuration'))
+    if plan.trade_day in plan.formats and plan.trade_day != plan.date:
+        derived.append(day(plan.trade_day).alias(plan.trade_day))
+    # Hour of entry on the export's own clock, else of the Date column
+    hour_source = next((name for name in (plan.entered, plan.date)
+                        if name in plan.formats and plan.formats[name].has_time), None)
+    hour = pl.col(wall[hour_source]).dt.hour() if hour_source else pl.lit(None)
+    derived.append(hour.cast(pl.Int8).alias('_EntryHour'))
+    df = df.with_columns(derived).drop(list(wall.values()) + list(offset.values()))
+
+    # Rename columns based on map
+    if plan.column_map:
+        df = df.rename(plan.column_map)
+    df = df.with_columns(pl.col('_Date').alias('Date')).drop('_Date')
+
+    schema = df.collect_schema()
+
+    # Handle Fees column
+    if 'Fees' in schema:
+        df = df.with_columns([
+            pl.col('Fees').cast(pl.Float64, strict=False).fill_null(0.0)
+        ])
+    else:
+        df = df.with_columns(pl.lit(0.0).alias('Fees'))
     
-    # Daily Aggregation (use NetPnL for accurate daily totals)
-    daily_df = df.group_by('Date').agg([
-        pl.col('NetPnL').sum().alias('DailyPnL'),
-        pl.col('PnL').count().alias('TradeCount'),
-        (pl.col('PnL') > 0).sum().alias('WinCount')
-    ]).sort('Date')
+    df = df.with_columns([
+        pl.col('PnL').cast(pl.Float64, strict=False).fill_null(0.0)
+    ]).drop_nulls(['Date']) # Drop rows where Date is invalid/null
     
-    # Daily Stats
-    daily_pnl = daily_df['DailyPnL']
+    # Handle Duration - Calculate from timestamps if available
+    if plan.timestamps:
+        df = df.with_columns(
+            pl.col('_TimestampDuration').cast(pl.Float64).fill_null(0.0).alias('Duration')
+        ).drop('_TimestampDuration')
+    elif 'Duration' in schema:
+        if plan.duration is not None and plan.duration.kind == 'clock':
+            # h:mm:ss text, hours may go past 24 (d:h:mm:ss for multi-day holds)
+            df = df.with_columns(duration_seconds('Duration', plan.duration).fill_null(0.0).alias('Duration'))
+        elif schema['Duration'] != pl.Float64:
+            # Ensure Float
+            df = df.with_columns(pl.col('Duration').cast(pl.Float64, strict=False).fill_null(0.0))
+    else:
+        # If Duration missing entirely, default to 0
+        df = df.with_columns(pl.lit(0.0).alias('Duration'))
     
-    # Cumulative Sum for Balance Curve
-    # Assuming starting balance is 0 or request input, for chart we just show PnL curve
-    # But for stats like "Daily Account Balance" we ideally need starting balance. 
-    # For now we'll do Cumulative PnL.
-    daily_df = daily_df.with_columns(
-        pl.col('DailyPnL').cum_sum().alias('CumulativePnL')
+    # Calculate Net PnL (PnL - Fees) for accurate total
+    df = df.with_columns(
+        (pl.col('PnL') - pl.col('Fees')).alias('NetPnL')
     )
     
-    if len(daily_df) > 0:
-        best_day = daily_pnl.max()
-        worst_day = daily_pnl.min()
-        most_active_day = daily_df['TradeCount'].max()
-        
-        # Day Win %
-        winning_days = daily_df.filter(pl.col('DailyPnL') > 0)
-        day_win_rate = (len(winning_days) / len(daily_df) * 100)
-        
-        # Best Day % of Total Profit
-        best_day_pct = (best_day / total_pnl * 100) if total_pnl > 0 else 0.0
-    else:
-        best_day = 0.0
-        worst_day = 0.0
-        most_active_day = 0
-        day_win_rate = 0.0
-        best_day_pct = 0.0
-
-    # Direction (Long/Short %)
-    # Simple count if column exists
-    direction_counts = df.group_by("Direction").len()
-    longs = direction_counts.filter(pl.col("Direction").str.to_lowercase().str.contains("long|buy"))
-    shorts = direction_counts.filter(pl.col("Direction").str.to_lowercase().str.contains("short|sell"))
-    
-    # Fallback to simple generic logic if standard names not found
-    long_count = longs['len'].sum() if len(longs) > 0 else 0
-    short_count = shorts['len'].sum() if len(shorts) > 0 else 0
+    # If Direction missing, try to infer (Optional, simplified)
+    if 'Direction' not in schema:
+         df = df.with_columns(pl.lit('Unknown').alias('Direction'))
+
+    return df.with_columns(pl.col('_EntryHour').alias('EntryHour')).drop('_EntryHour')
+
+def calculate_stats(df: pl.DataFrame) -> Dict[str, Any]:
+    with stage("calculate_stats", rows=len(df)):
+        return compute_stats(df)[0]
+
+def prepare_charts_data(df: pl.DataFrame, daily_agg: Optional[pl.DataFrame] = None,
+                        bucket_scheme: Optional[str] = None,
+                        bucket_totals_df: Optional[pl.DataFrame] = None,
+                        max_points: Optional[int] = None) -> Dict[str, Any]:
+    # max_points bounds the daily and scatter series (see core.downsample)
+    # 1. Daily/Cumulative PnL (Line & Bar) - Use NetPnL
+    if daily_agg is None:
+        daily_agg = daily_aggregate(df).collect()
     
-    long_pct = (long_count / total_trades * 100) if total_trades > 0 else 0
-    short_pct = (short_count / total_trades * 100) if total_trades > 0 else 0
+    daily_pnl_data = daily_series(daily_agg, max_points)
+
+    # 2. Trade Duration Distribution & Win Rate Analysis (single pass, see core.buckets)
+    edges, labels = parse_scheme(bucket_scheme)
+    if bucket_totals_df is None:
+        bucket_totals_df = bucket_totals(df, edges)
+    distribution_data = bucket_rows(bucket_totals_df, labels)
 
     return {
-        "summary": {
-            "total_pnl": round(total_pnl or 0.0, 2),
-            "gross_pnl": round(gross_pnl or 0.0, 2),
-            "total_fees": round(total_fees or 0.0, 2),
-            "win_rate": round(win_rate or 0.0, 2),
-            "total_trades": total_trades,
-            "profit_factor": round(profit_factor or 0.0, 2),
-            "expected_value": round(expected_value or 0.0, 2),
-            "avg_win": round(avg_win or 0.0, 2),
-            "avg_loss": round(avg_loss or 0.0, 2),
-            "best_trade": round(best_trade or 0.0, 2),
-            "worst_trade": round(worst_trade or 0.0, 2),
-            "best_trade_net": round(best_trade_net or 0.0, 2),
-            "worst_trade_net": round(worst_trade_net or 0.0, 2),
-        },
-        "duration": {
-            "avg_duration": round(avg_duration or 0.0, 2),
-            "avg_win_duration": round(avg_win_duration or 0.0, 2),
-            "avg_loss_duration": round(avg_loss_duration or 0.0, 2),
-        },
-        "daily": {
-            "day_win_rate": round(day_win_rate or 0.0, 2),
-            "best_day": round(best_day or 0.0, 2),
-            "worst_day": round(worst_day or 0.0, 2),
-            "most_active_day_trades": most_active_day,
-            "best_day_pct_total": round(best_day_pct or 0.0, 2)
-        },
-        "direction": {
-            "long_pct": round(long_pct or 0.0, 2),
-            "short_pct": round(short_pct or 0.0, 2)
-        }
+        "daily_pnl": daily_pnl_data,
+        "duration_scatter": duration_scatter(df, max_points),
+        "duration_distribution": distribution_data
     }
 
-def prepare_charts_data(df: pl.DataFrame) -> Dict[str, Any]:
-    # 1. Daily/Cumulative PnL (Line & Bar) - Use NetPnL
-    daily_agg = df.group_by('Date').agg([
-        pl.col('NetPnL').sum().alias('DailyPnL'),
-        pl.col('PnL').count().alias('TradeCount')
-    ]).sort('Date')
-    daily_agg = daily_agg.with_columns(pl.col('DailyPnL').cum_sum().alias('CumulativePnL'))
-    
+def daily_series(daily_agg: pl.DataFrame, max_points: Optional[int] = None) -> List[Dict[str, Any]]:
     # Convert dates to string for JSON serialization
-    daily_pnl_data = daily_agg.select([
+    return decimate(daily_agg, 'CumulativePnL', max_points).select([
         pl.col('Date').dt.to_string("%Y-%m-%d").alias('Date'), 
         'DailyPnL', 
         'CumulativePnL',
         'TradeCount'
     ]).to_dicts()
-    
-    # 2. Trade Duration Distribution & Win Rate Analysis
-    duration_buckets = [
-        (0, 15, "Under 15 sec"),
-        (15, 45, "15-45 sec"),
-        (45, 60, "45 sec - 1 min"),
-        (60, 120, "1 min - 2 min"),
-        (120, 300, "2 min - 5 min"),
-        (300, 600, "5 min - 10 min"),
-        (600, 1800, "10 min - 30 min"),
-        (1800, 3600, "30 min - 1 hour"),
-        (3600, 7200, "1 hour - 2 hours"),
-        (7200, 14400, "2 hours - 4 hours"),
-        (14400, float('inf'), "4 hours and up")
-    ]
-    
-    distribution_data = []
-    for min_sec, max_sec, label in duration_buckets:
-        subset = df.filter(
-            (pl.col('Duration') >= min_sec) & 
-            (pl.col('Duration') < max_sec)
-        )
-        count = len(subset)
-        if count > 0:
-            wins = len(subset.filter(pl.col('NetPnL') > 0))
-            win_rate = (wins / count) * 100
-        else:
-            win_rate = 0.0
-            
-        distribution_data.append({
-            "range": label,
-            "count": count,
-            "win_rate": round(win_rate, 1)
-        })
 
+def duration_scatter(df: pl.DataFrame, max_points: Optional[int] = None) -> List[Dict[str, Any]]:
     # Legacy scatter data for completeness
-    duration_scatter = df.filter(
+    points = df.filter(
         (pl.col('Duration') > 0) & (pl.col('Duration') < 86400)
-    ).select(['Duration', 'NetPnL']).to_dicts()
+    ).select(['Duration', 'NetPnL'])
+    return density(points, 'Duration', 'NetPnL', max_points).to_dicts()
 
-    return {
-        "daily_pnl": daily_pnl_data,
-        "duration_scatter": duration_scatter,
-        "duration_distribution": distribution_data
-    }
+def tailor_results(df: pl.DataFrame, results: Dict[str, Any], bucket_scheme: Optional[str] = None,
+                   max_points: Optional[int] = None) -> Dict[str, Any]:
+    """Apply per-request chart options to results built with the defaults."""
+    if bucket_scheme and bucket_scheme != 'default':
+        # Cached results use the default buckets; re-bucketing is one cheap pass
+        with stage("rebucket", rows=len(df)):
+            charts = {**results["charts"], "duration_distribution": bucket_stats(df, *parse_scheme(bucket_scheme))}
+        results = {**results, "charts": charts}
+    if max_points:
+        # Cached results hold every point; bound the series per request
+        with stage("downsample", rows=len(df)):
+            results = {**results, "charts": downsample_charts(df, results["charts"], max_points)}
+    return results
+
+def downsample_charts(df: pl.DataFrame, charts: Dict[str, Any], max_points: int) -> Dict[str, Any]:
+    """Bound already prepared (e.g. cached) charts to `max_points` per series."""
+    daily = charts["daily_pnl"]
+    if len(daily) > max_points:
+        daily = decimate(pl.DataFrame(daily), 'CumulativePnL', max_points).to_dicts()
+    return {**charts, "daily_pnl": daily, "duration_scatter": duration_scatter(df, max_points)}
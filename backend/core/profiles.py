@@ -0,0 +1,62 @@
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import polars as pl
+
+# Named broker export layouts.
+# A profile is picked when every column it reads is in the header. It then
+# replaces the best-effort candidate mapping in core.processor: raw headers
+# map straight to the standard names, the CSV reader gets explicit dtypes (no
+# schema inference) and only the listed columns are read at all, so extra
+# columns of wide exports are never parsed.
+#
+# Date/timestamp columns are left out of `dtypes`: they are read as text and
+# parsed once with the format detected on the sample (see core.formats).
+
+
+class BrokerProfile(NamedTuple):
+    name: str
+    dtypes: Dict[str, Optional[pl.DataType]]  # columns to read, in export order; None = date/timestamp
+    column_map: Dict[str, str]                # raw name -> standard name
+    entered: Optional[str] = None
+    exited: Optional[str] = None
+    trade_day: Optional[str] = None
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(self.dtypes)
+
+
+TOPSTEPX = BrokerProfile(
+    name='topstepx',
+    dtypes={
+        'Id': pl.Int64,
+        'ContractName': pl.Utf8,
+        'EnteredAt': None,
+        'ExitedAt': None,
+        'EntryPrice': pl.Float64,
+        'ExitPrice': pl.Float64,
+        'Fees': pl.Float64,
+        'PnL': pl.Float64,
+        'Size': pl.Int64,
+        'Type': pl.Utf8,
+        'TradeDay': None,
+        # Not read: TradeDuration (durations come from the timestamps) and
+        # Commissions (unused, fees come from Fees)
+    },
+    column_map={'ContractName': 'Symbol', 'ExitedAt': 'Date', 'Fees': 'Fees', 'PnL': 'PnL', 'Type': 'Direction'},
+    entered='EnteredAt',
+    exited='ExitedAt',
+    trade_day='TradeDay',
+)
+
+# Most specific first
+PROFILES = [TOPSTEPX]
+
+
+@lru_cache(maxsize=256)
+def match_profile(header: Tuple[str, ...]) -> Optional[BrokerProfile]:
+    """Profile for a header row, None for unknown layouts."""
+    present = set(header)
+    return next((p for p in PROFILES if present.issuperset(p.dtypes)), None)
+
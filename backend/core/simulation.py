@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Monte Carlo stress test of an equity curve.
+# Every path is a bootstrap (resampling with replacement) of the trades'
+# NetPnL. A chunk of paths is one matrix: index draws, gather, cumulative sum
+# and running peak are each a single NumPy call over the whole chunk, and
+# chunks are sized so a handful of those matrices stay in cache-friendly,
+# bounded memory whatever the number of paths.
+#
+# Ruin follows TopStepX-style combine rules: the account fails as soon as
+# its balance touches the trailing drawdown floor (highest balance so far
+# minus the limit, and with `lock_at_start` never above the starting
+# balance), or zero. A failed path stops there.
+#
+# Chunks get independent streams spawned from the seed, so results only
+# depend on the seed, never on how chunks are spread over workers.
+#
+# Configuration (environment variables):
+#   SIMULATION_WORKERS  processes to spread chunks over (default: 1, in-process)
+
+MAX_PATHS = 100_000
+MAX_TRADES = 100_000
+MAX_CELLS = 200_000_000          # paths x trades per request
+CHUNK_CELLS = 2_000_000          # paths x trades per chunk (~16 MB per float matrix)
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 30
+
+
+class SimulationParams(NamedTuple):
+    paths: int = 1000
+    trades: Optional[int] = None            # per path, default: as many as resampled
+    seed: int = 0
+    account_size: float = 50_000.0
+    trailing_drawdown: Optional[float] = 2_000.0
+    lock_at_start: bool = True
+
+    def validate(self, available: int) -> "SimulationParams":
+        if available == 0:
+            raise ValueError("No trades to resample")
+        trades = self.trades or available
+        if not 1 <= self.paths <= MAX_PATHS:
+            raise ValueError(f"paths must be between 1 and {MAX_PATHS}")
+        if not 1 <= trades <= MAX_TRADES:
+            raise ValueError(f"trades must be between 1 and {MAX_TRADES}")
+        if self.paths * trades > MAX_CELLS:
+            raise ValueError(f"paths x trades must not exceed {MAX_CELLS:,}")
+        if self.account_size <= 0:
+            raise ValueError("account_size must be positive")
+        if self.trailing_drawdown is not None and self.trailing_drawdown <= 0:
+            raise ValueError("trailing_drawdown must be positive")
+        return self._replace(trades=trades)
+
+
+def simulation_workers() -> int:
+    return max(1, int(os.environ.get("SIMULATION_WORKERS", 1)))
+
+
+def simulate_chunk(pnl: np.ndarray, paths: int, params: SimulationParams,
+                   seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(final PnL, max drawdown, trade index of ruin or -1) per path."""
+    rng = np.random.default_rng(seed)
+    index_type = np.int32 if len(pnl) < 2 ** 31 else np.int64
+    equity = np.take(pnl, rng.integers(0, len(pnl), size=(paths, params.trades), dtype=index_type))
+    np.cumsum(equity, axis=1, out=equity)
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 0.0, out=peak)                 # the starting balance is a high too
+    drawdown = equity - peak
+
+    # Balance floor relative to the start, reusing the peak buffer
+    floor = peak
+    if params.trailing_drawdown is not None:
+        floor -= params.trailing_drawdown
+        if params.lock_at_start:
+            np.minimum(floor, 0.0, out=floor)
+        np.maximum(floor, -params.account_size, out=floor)
+    else:
+        floor.fill(-params.account_size)
+    breached = equity <= floor
+    ruined = breached.any(axis=1)
+    ruin_at = np.where(ruined, breached.argmax(axis=1), -1)
+
+    # A failed account stops trading: read results at the breach
+    stop = np.where(ruined, ruin_at, params.trades - 1)
+    final = equity[np.arange(paths), stop]
+    max_drawdown = drawdown.min(axis=1)
+    if ruined.any():
+        before = np.arange(params.trades) <= ruin_at[ruined, None]
+        max_drawdown[ruined] = np.where(before, drawdown[ruined], 0.0).min(axis=1)
+    return final, max_drawdown, ruin_at
+
+
+def simulate_chunks(pnl: np.ndarray, sizes: List[int], params: SimulationParams,
+                    seeds: List[np.random.SeedSequence]) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    return [simulate_chunk(pnl, size, params, seed) for size, seed in zip(sizes, seeds)]
+
+
+def _chunks(params: SimulationParams) -> List[int]:
+    per_chunk = max(1, CHUNK_CELLS // params.trades)
+    full, rest = divmod(params.paths, per_chunk)
+    return [per_chunk] * full + ([rest] if rest else [])
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server process runs Polars and Uvicorn threads
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def run_paths(pnl: np.ndarray, params: SimulationParams,
+              workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-path (final PnL, max drawdown, ruin index) for validated params."""
+    pnl = np.ascontiguousarray(pnl, dtype=np.float64)
+    sizes = _chunks(params)
+    seeds = np.random.SeedSequence(params.seed).spawn(len(sizes))
+    workers = simulation_workers() if workers is None else workers
+    if workers > 1 and len(sizes) > 1:
+        # One task per worker, so the NetPnL series is sent `workers` times,
+        # not once per chunk
+        groups = [(sizes[i::workers], seeds[i::workers]) for i in range(min(workers, len(sizes)))]
+        pool = get_pool(workers)
+        futures = [pool.submit(simulate_chunks, pnl, group_sizes, params, group_seeds)
+                   for group_sizes, group_seeds in groups]
+        # Back in chunk order, so the output does not depend on `workers`
+        parts = [f.result() for f in futures]
+        results = [parts[i % len(groups)][i // len(groups)] for i in range(len(sizes))]
+    else:
+        results = simulate_chunks(pnl, sizes, params, seeds)
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+def _distribution(values: np.ndarray) -> Dict[str, float]:
+    points = np.percentile(values, PERCENTILES)
+    return {
+        "mean": round(float(values.mean()), 2),
+        "std": round(float(values.std()), 2),
+        **{f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, points)},
+    }
+
+
+def _histogram(values: np.ndarray) -> List[Dict[str, Any]]:
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    return [
+        {"bin_start": round(float(lo), 2), "bin_end": round(float(hi), 2), "count": int(n)}
+        for lo, hi, n in zip(edges[:-1], edges[1:], counts)
+    ]
+
+
+def simulate(pnl: np.ndarray, params: SimulationParams = SimulationParams(),
+             workers: Optional[int] = None) -> Dict[str, Any]:
+    """Bootstrap `params.paths` equity curves from a NetPnL series."""
+    params = params.validate(len(pnl))
+    final, max_drawdown, ruin_at = run_paths(pnl, params, workers)
+    ruined = ruin_at >= 0
+    return {
+        "params": params._asdict(),
+        "final_pnl": {**_distribution(final), "prob_profit": round(float((final > 0).mean() * 100), 2)},
+        "final_balance_p50": round(float(params.account_size + np.median(final)), 2),
+        "max_drawdown": _distribution(max_drawdown),
+        "risk_of_ruin": round(float(ruined.mean() * 100), 2),
+        "median_trades_to_ruin": int(np.median(ruin_at[ruined]) + 1) if ruined.any() else None,
+        "histogram": _histogram(final),
+    }
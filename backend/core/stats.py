@@ -0,0 +1,194 @@
+import polars as pl
+from typing import Any, Dict, Sequence, Tuple, Union
+
+# Single-pass stats engine.
+# Every summary, duration and direction metric is a conditional aggregation
+# in one `select`, and the daily aggregate is a single `group_by('Date')`.
+# Both are collected together from one lazy plan, and the daily frame is
+# shared with prepare_charts_data instead of being recomputed.
+#
+# Totals are kept as sums/counts/extremes (never means), so they can be
+# merged across chunks of trades and finalized afterwards.
+
+Frame = Union[pl.DataFrame, pl.LazyFrame]
+
+_is_win = pl.col('PnL') > 0
+_is_loss = pl.col('PnL') <= 0
+_direction = pl.col('Direction').cast(pl.Utf8).str.to_lowercase()
+
+
+def totals_exprs():
+    return [
+        pl.len().alias('count'),
+        pl.col('NetPnL').sum().alias('net_pnl'),
+        pl.col('PnL').sum().alias('gross_pnl'),
+        pl.col('Fees').sum().alias('fees'),
+        _is_win.sum().alias('win_count'),
+        _is_loss.sum().alias('loss_count'),
+        pl.col('PnL').filter(_is_win).sum().alias('win_pnl'),
+        pl.col('PnL').filter(_is_loss).sum().alias('loss_pnl'),
+        pl.col('PnL').max().alias('best_trade'),
+        pl.col('PnL').min().alias('worst_trade'),
+        pl.col('NetPnL').max().alias('best_trade_net'),
+        pl.col('NetPnL').min().alias('worst_trade_net'),
+        pl.col('Duration').sum().alias('duration'),
+        pl.col('Duration').count().alias('duration_count'),
+        pl.col('Duration').filter(_is_win).sum().alias('win_duration'),
+        pl.col('Duration').filter(_is_win).count().alias('win_duration_count'),
+        pl.col('Duration').filter(_is_loss).sum().alias('loss_duration'),
+        pl.col('Duration').filter(_is_loss).count().alias('loss_duration_count'),
+        _direction.str.contains('long|buy').sum().alias('long_count'),
+        _direction.str.contains('short|sell').sum().alias('short_count'),
+    ]
+
+
+def daily_aggregate(df: Frame) -> pl.LazyFrame:
+    """Per-day NetPnL, trade and win counts plus the running cumulative PnL."""
+    return df.lazy().group_by('Date').agg([
+        pl.col('NetPnL').sum().alias('DailyPnL'),
+        pl.col('PnL').count().alias('TradeCount'),
+        _is_win.sum().alias('WinCount'),
+    ]).sort('Date').with_columns(
+        pl.col('DailyPnL').cum_sum().alias('CumulativePnL')
+    )
+
+
+def aggregate(df: Frame) -> Tuple[Dict[str, Any], pl.DataFrame]:
+    """(totals, daily frame) computed from one lazy plan."""
+    lf = df.lazy()
+    totals, daily = pl.collect_all([lf.select(totals_exprs()), daily_aggregate(lf)])
+    return totals.row(0, named=True), daily
+
+
+_MAX_FIELDS = ('best_trade', 'best_trade_net')
+_MIN_FIELDS = ('worst_trade', 'worst_trade_net')
+
+
+def merge_totals(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the totals of two disjoint sets of trades."""
+    merged = {}
+    for key, value in a.items():
+        other = b[key]
+        if key in _MAX_FIELDS or key in _MIN_FIELDS:
+            pick = max if key in _MAX_FIELDS else min
+            present = [v for v in (value, other) if v is not None]
+            merged[key] = pick(present) if present else None
+        else:
+            merged[key] = (value or 0) + (other or 0)
+    return merged
+
+
+def merge_daily(a: pl.DataFrame, b: pl.DataFrame) -> pl.DataFrame:
+    """Combine two daily aggregates, keeping CumulativePnL consistent.
+
+    When `b` only has days after the last day of `a` (the usual case for a
+    new export) this costs O(days in b); otherwise days are re-aggregated,
+    which is O(days), never O(trades).
+    """
+    if len(a) == 0:
+        return b
+    if len(b) == 0:
+        return a
+    if b['Date'].min() > a['Date'][-1]:
+        offset = a['CumulativePnL'][-1]
+        return pl.concat([a, b.with_columns(pl.col('CumulativePnL') + offset)], how='vertical_relaxed')
+    return (
+        pl.concat([a, b], how='vertical_relaxed')
+        .group_by('Date')
+        .agg(pl.col('DailyPnL', 'TradeCount', 'WinCount').sum())
+        .sort('Date')
+        .with_columns(pl.col('DailyPnL').cum_sum().alias('CumulativePnL'))
+    )
+
+
+def combine_daily(frames: Sequence[pl.DataFrame]) -> pl.DataFrame:
+    """Sum the daily aggregates of any number of trade sets (e.g. accounts)
+    into one, with CumulativePnL recomputed as the combined equity curve."""
+    frames = [f for f in frames if len(f) > 0]
+    if len(frames) <= 1:
+        return frames[0] if frames else pl.DataFrame(
+            schema={'Date': pl.Date, 'DailyPnL': pl.Float64, 'TradeCount': pl.UInt32,
+                    'WinCount': pl.UInt32, 'CumulativePnL': pl.Float64})
+    return (
+        pl.concat([f.select('Date', 'DailyPnL', 'TradeCount', 'WinCount') for f in frames], how='vertical_relaxed')
+        .group_by('Date')
+        .agg(pl.col('DailyPnL', 'TradeCount', 'WinCount').sum())
+        .sort('Date')
+        .with_columns(pl.col('DailyPnL').cum_sum().alias('CumulativePnL'))
+    )
+
+
+def _ratio(num, den) -> float:
+    return (num / den) if den else 0.0
+
+
+def finalize(totals: Dict[str, Any], daily: pl.DataFrame) -> Dict[str, Any]:
+    """Turn totals and the daily frame into the calculate_stats payload."""
+    total_trades = totals['count']
+    win_count = totals['win_count']
+    loss_count = totals['loss_count']
+    total_pnl = totals['net_pnl']
+
+    gross_loss = abs(totals['loss_pnl'] or 0.0)
+    profit_factor = _ratio(totals['win_pnl'], gross_loss) # Avoid inf for JSON safety
+
+    if len(daily) > 0:
+        day_totals = daily.select([
+            pl.col('DailyPnL').max().alias('best'),
+            pl.col('DailyPnL').min().alias('worst'),
+            pl.col('TradeCount').max().alias('most_active'),
+            (pl.col('DailyPnL') > 0).sum().alias('winning'),
+        ]).row(0, named=True)
+        best_day = day_totals['best']
+        worst_day = day_totals['worst']
+        most_active_day = day_totals['most_active']
+        day_win_rate = day_totals['winning'] / len(daily) * 100
+        # Best Day % of Total Profit
+        best_day_pct = (best_day / total_pnl * 100) if total_pnl > 0 else 0.0
+    else:
+        best_day = 0.0
+        worst_day = 0.0
+        most_active_day = 0
+        day_win_rate = 0.0
+        best_day_pct = 0.0
+
+    return {
+        "summary": {
+            "total_pnl": round(total_pnl or 0.0, 2),
+            "gross_pnl": round(totals['gross_pnl'] or 0.0, 2),
+            "total_fees": round(totals['fees'] or 0.0, 2),
+            "win_rate": round(_ratio(win_count, total_trades) * 100, 2),
+            "total_trades": total_trades,
+            "profit_factor": round(profit_factor or 0.0, 2),
+            # Avg PnL per trade
+            "expected_value": round(_ratio(totals['gross_pnl'], total_trades) or 0.0, 2),
+            "avg_win": round(_ratio(totals['win_pnl'], win_count) or 0.0, 2),
+            "avg_loss": round(_ratio(totals['loss_pnl'], loss_count) or 0.0, 2),
+            "best_trade": round(totals['best_trade'] or 0.0, 2),
+            "worst_trade": round(totals['worst_trade'] or 0.0, 2),
+            "best_trade_net": round(totals['best_trade_net'] or 0.0, 2),
+            "worst_trade_net": round(totals['worst_trade_net'] or 0.0, 2),
+        },
+        "duration": {
+            "avg_duration": round(_ratio(totals['duration'], totals['duration_count']) or 0.0, 2),
+            "avg_win_duration": round(_ratio(totals['win_duration'], totals['win_duration_count']) or 0.0, 2),
+            "avg_loss_duration": round(_ratio(totals['loss_duration'], totals['loss_duration_count']) or 0.0, 2),
+        },
+        "daily": {
+            "day_win_rate": round(day_win_rate or 0.0, 2),
+            "best_day": round(best_day or 0.0, 2),
+            "worst_day": round(worst_day or 0.0, 2),
+            "most_active_day_trades": most_active_day,
+            "best_day_pct_total": round(best_day_pct or 0.0, 2)
+        },
+        "direction": {
+            "long_pct": round(_ratio(totals['long_count'], total_trades) * 100, 2),
+            "short_pct": round(_ratio(totals['short_count'], total_trades) * 100, 2)
+        }
+    }
+
+
+def compute_stats(df: Frame) -> Tuple[Dict[str, Any], pl.DataFrame]:
+    """(stats payload, daily frame) for a normalized trades frame."""
+    totals, daily = aggregate(df)
+    return finalize(totals, daily), daily
@@ -0,0 +1,156 @@
+import io
+import os
+from typing import Any, Iterator, Optional, Tuple
+
+import polars as pl
+
+from core.buckets import bucket_totals, parse_scheme
+from core.cache import get_cache
+from core.datasets import get_store
+from core.encoding import columnar, dumps
+from core.processor import (SAMPLE_ROWS, columnar_charts, daily_series, load_trades_path, make_response,
+                            normalize_trades, plan_trades, prepare_charts_data, tailor_results)
+from core.stats import aggregate, finalize, merge_daily, merge_totals
+
+# Streamed uploads (POST /upload/stream), for large exports where waiting for
+# the whole result feels slow.
+# The spooled UTF-8 file (see core.ingest) is parsed in chunks of whole CSV
+# records, each normalized with the same parse plan a one-shot upload uses
+# and folded into the mergeable totals and daily aggregate of core.stats, so
+# running stats can be pushed after every chunk. Once the file is read, the
+# final stats, the daily series, the charts and then the full /upload body
+# follow, in the order the dashboard renders them. The final result is the
+# one /upload returns (and is cached and stored the same way).
+#
+# Events (Server-Sent Events, JSON data):
+#   progress  {"bytes_parsed", "bytes_total", "rows"} after every chunk
+#   partial   {"rows", "stats"}: stats of the rows read so far
+#   stats     final stats
+#   daily     the daily_pnl chart series
+#   charts    every chart series
+#   result    the /upload response body
+#   error     {"detail"}; nothing follows
+#
+# Configuration (environment variables):
+#   STREAM_CHUNK_MB  CSV bytes parsed per chunk (default: 4)
+
+MEDIA_TYPE = "text/event-stream"
+
+
+def chunk_size() -> int:
+    return max(1, int(float(os.environ.get("STREAM_CHUNK_MB", 4)) * 1024 * 1024))
+
+
+def format_event(event: str, data: Any) -> bytes:
+    # JSON is encoded on one line, so it fits a single `data:` field
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def _record_end(data: bytes) -> int:
+    """Offset just past the last complete record in `data` (0 if none).
+    `data` starts on a record boundary."""
+    cut = data.rfind(b"\n") + 1
+    # A newline inside a quoted field doesn't end a record
+    while cut > 0 and data.count(b'"', 0, cut) % 2:
+        cut = data.rfind(b"\n", 0, cut - 1) + 1
+    return cut
+
+
+def read_records(path: str, size: int) -> Iterator[Tuple[bytes, bytes, int]]:
+    """(header line, chunk of whole records, bytes consumed so far) for a CSV file."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        consumed = len(header)
+        pending = b""
+        while True:
+            block = f.read(size)
+            data = pending + block
+            cut = _record_end(data) if block else len(data)
+            if cut:
+                consumed += cut
+                yield header, data[:cut], consumed
+            pending = data[cut:]
+            if not block:
+                return
+
+
+def _parse_chunks(path: str) -> Iterator[Tuple[str, Any]]:
+    """Progress and partial-stats events; returns the normalized frame."""
+    total = os.path.getsize(path)
+    plan, schema = None, None
+    chunks, totals, daily, rows = [], None, None, 0
+    for header, records, consumed in read_records(path, chunk_size()):
+        if not records.strip():
+            continue
+        if plan is None:
+            sample = pl.read_csv(io.BytesIO(header + records), n_rows=SAMPLE_ROWS, infer_schema=False)
+            plan = plan_trades(sample)
+        raw = pl.read_csv(io.BytesIO(header + records), columns=plan.projection,
+                          schema_overrides=schema or plan.overrides)
+        # Types are inferred on the first rows only, as for a one-shot read
+        schema = schema or dict(raw.schema)
+        chunk = normalize_trades(raw.lazy(), plan).collect()
+        chunks.append(chunk)
+        rows += len(chunk)
+
+        chunk_totals, chunk_daily = aggregate(chunk)
+        totals = merge_totals(totals, chunk_totals) if totals else chunk_totals
+        daily = merge_daily(daily, chunk_daily) if daily is not None else chunk_daily
+        yield "progress", {"bytes_parsed": consumed, "bytes_total": total, "rows": rows}
+        yield "partial", {"rows": rows, "stats": finalize(totals, daily)}
+
+    if not chunks:
+        # No records: same outcome (empty frame or error) as a one-shot upload
+        return load_trades_path(path)
+    return pl.concat(chunks)
+
+
+def stream_upload(path: str, key: str, include_data: bool = True, fmt: str = 'rows',
+                  bucket_scheme: Optional[str] = None, max_points: Optional[int] = None) -> Iterator[bytes]:
+    """SSE byte chunks for a spooled upload. Takes ownership of the file."""
+    try:
+        for event, data in _stream_events(path, key, include_data, fmt, bucket_scheme, max_points):
+            yield format_event(event, data)
+    except Exception as e:
+        detail = str(e) if isinstance(e, ValueError) else f"Error processing CSV: {str(e)}"
+        yield format_event("error", {"detail": detail})
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _stream_events(path: str, key: str, include_data: bool, fmt: str,
+                   bucket_scheme: Optional[str], max_points: Optional[int]) -> Iterator[Tuple[str, Any]]:
+    def layout(rows):
+        return columnar(rows) if fmt == 'columnar' else rows
+
+    cache = get_cache()
+    entry = cache.get(key)
+    aggregates = None
+    if entry is not None:
+        df, results = entry
+        size = os.path.getsize(path)
+        yield "progress", {"bytes_parsed": size, "bytes_total": size, "rows": len(df)}
+        results = tailor_results(df, results, bucket_scheme, max_points)
+        yield "stats", results["stats"]
+        yield "daily", layout(results["charts"]["daily_pnl"])
+    else:
+        df = yield from _parse_chunks(path)
+        # Final stats from the whole frame, so they match /upload exactly
+        totals, daily = aggregate(df)
+        stats = finalize(totals, daily)
+        yield "stats", stats
+        yield "daily", layout(daily_series(daily, max_points))
+        buckets = bucket_totals(df, parse_scheme(None)[0])
+        full = {"stats": stats, "charts": prepare_charts_data(df, daily, bucket_totals_df=buckets)}
+        # Seeds the dataset, as for an upload (see core.executor)
+        aggregates = (totals, daily, buckets)
+        results = tailor_results(df, full, bucket_scheme, max_points)
+
+    charts = results["charts"]
+    yield "charts", columnar_charts(charts) if fmt == 'columnar' else charts
+    if entry is None:
+        # After the charts went out: storing a large frame takes a while
+        cache.put(key, df, full)
+    get_store().add(key, df, aggregates)
+    yield "result", {"dataset_id": key, **make_response(df, results, include_data, fmt)}
@@ -0,0 +1,112 @@
+import io
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import polars as pl
+
+# Seeded generator of synthetic TopStepX trade exports, for benchmarks and
+# tests. Same columns and text formats as a real export:
+#
+#   Id,ContractName,EnteredAt,ExitedAt,EntryPrice,ExitPrice,Fees,PnL,Size,
+#   Type,TradeDay,TradeDuration,Commissions
+#
+# Timestamps are written in a local time zone with its UTC offset
+# ("10/01/2025 14:47:55 +02:00"), so DST changes appear in longer exports.
+# The same (rows, seed, start) always produces the same bytes.
+
+# name: (price, daily volatility in points, point value, fee per contract)
+CONTRACTS = {
+    "MNQZ5": (25000.0, 250.0, 2.0, 0.74),
+    "MESZ5": (6500.0, 60.0, 5.0, 0.74),
+    "NQZ5": (25000.0, 250.0, 20.0, 2.80),
+    "ESZ5": (6500.0, 60.0, 50.0, 2.80),
+    "MGCZ5": (4000.0, 40.0, 10.0, 1.24),
+}
+
+FIRST_ID = 1897851835
+TIME_ZONE = "Europe/Warsaw"
+
+# Longest holding time generated, in seconds. A few trades in larger exports
+# are held overnight or longer, as in real multi-day swings.
+MAX_DURATION = 3 * 86400
+
+# Trades per (business) day before the export starts to span more days,
+# and the span cap, so 10M rows still cover a realistic ~3 years.
+TRADES_PER_DAY = 40
+MAX_DAYS = 750
+
+
+def generate_trades(rows: int, seed: int = 0, start: date = date(2025, 1, 2),
+                    time_zone: str = TIME_ZONE, max_duration: int = MAX_DURATION) -> pl.DataFrame:
+    """A raw export (all columns as they appear in the CSV) with `rows` trades."""
+    rng = np.random.default_rng(seed)
+    names = list(CONTRACTS)
+    price, volatility, point_value, fee = (np.array(v) for v in zip(*CONTRACTS.values()))
+
+    days = int(np.clip(rows // TRADES_PER_DAY, 1, MAX_DAYS))
+    contract = rng.integers(0, len(names), rows)
+    day = np.sort(rng.integers(0, days, rows))
+    size = rng.choice([1, 1, 1, 2, 2, 3, 5], rows)
+    is_long = rng.random(rows) < 0.55
+    # Mostly minutes, with a long tail of swing trades
+    duration = np.clip(rng.lognormal(np.log(300), 1.6, rows), 1, max_duration).astype(np.int64)
+    # Entries during the US session, 13:30-21:00 UTC
+    entry_second = rng.integers(13 * 3600 + 1800, 21 * 3600, rows)
+
+    # Per-contract random walk of the daily price level
+    drift = rng.normal(0, 1, (days, len(names))).cumsum(axis=0) * volatility
+    entry_price = price[contract] + drift[day, contract] + rng.normal(0, 0.2, rows) * volatility[contract]
+    move = rng.normal(0.02, 0.1, rows) * volatility[contract] * np.sqrt(duration / 3600)
+    exit_price = entry_price + move
+    direction = np.where(is_long, 1.0, -1.0)
+    pnl = (exit_price - entry_price) * direction * point_value[contract] * size
+
+    # Business days only
+    trade_day = np.busday_offset(np.datetime64(start, 'D'), day, roll='forward')
+    entered = trade_day.astype('datetime64[s]') + entry_second
+    exited = entered + duration
+
+    def local(values) -> pl.Expr:
+        return (pl.lit(pl.Series(values.astype('datetime64[us]')))
+                .dt.replace_time_zone("UTC").dt.convert_time_zone(time_zone)
+                .dt.to_string("%m/%d/%Y %H:%M:%S %:z"))
+
+    # TimeSpan "g" format: h:mm:ss, or d:h:mm:ss from one day up
+    days_held = duration // 86400
+    hours = (duration // 3600) % 24
+    minutes = pl.Series((duration // 60) % 60).cast(pl.Utf8).str.zfill(2)
+    seconds = pl.Series(duration % 60).cast(pl.Utf8).str.zfill(2)
+    trade_duration = pl.format("{}:{}:{}", pl.Series(hours), minutes, seconds)
+    trade_duration = pl.when(pl.lit(pl.Series(days_held)) > 0).then(
+        pl.format("{}:", pl.Series(days_held)) + trade_duration).otherwise(trade_duration)
+
+    return pl.DataFrame({
+        "Id": np.arange(FIRST_ID, FIRST_ID + rows),
+        "ContractName": pl.Series(names)[contract].to_numpy(),
+    }).with_columns(
+        local(entered).alias("EnteredAt"),
+        local(exited).alias("ExitedAt"),
+        pl.Series("EntryPrice", entry_price).round(2),
+        pl.Series("ExitPrice", exit_price).round(2),
+        pl.Series("Fees", fee[contract] * size).round(2),
+        pl.Series("PnL", pnl).round(1),
+        pl.Series("Size", size),
+        pl.Series("Type", np.where(is_long, "Long", "Short")),
+        # The trading day starts at 19:00 New York time on the previous day
+        (pl.lit(pl.Series(trade_day)).dt.offset_by("-1d").dt.strftime("%m/%d/%Y") + " 19:00:00 -05:00")
+        .alias("TradeDay"),
+        trade_duration.alias("TradeDuration"),
+        pl.lit(None, dtype=pl.Float64).alias("Commissions"),
+    )
+
+
+def export_csv(rows: int, seed: int = 0, path: Optional[str] = None, **kwargs) -> Optional[bytes]:
+    """Write a synthetic export to `path`, or return the CSV bytes."""
+    df = generate_trades(rows, seed, **kwargs)
+    if path is not None:
+        df.write_csv(path)
+        return None
+    buffer = io.BytesIO()
+    df.write_csv(buffer)
+    return buffer.getvalue()
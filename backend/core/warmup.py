@@ -0,0 +1,70 @@
+import io
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Worker warmup, run at startup before a worker accepts requests.
+# main imports the processing modules lazily, so a worker starts quickly but
+# its first request would import Polars and NumPy, build the parse plan for
+# the export's header and take every first-call path (format detection,
+# expression setup, JSON and Arrow encoders, dataset views). Warming up runs
+# all of that once on a tiny synthetic export instead. Nothing it builds is
+# put in the result cache or the dataset store.
+#
+# Configuration (environment variables):
+#   APP_WARMUP       "1" to warm up at startup (default: off; on with serve.py)
+#   APP_WARMUP_ROWS  rows of the synthetic export (default: 500)
+
+
+def warmup_enabled() -> bool:
+    return os.environ.get("APP_WARMUP", "0").lower() in ("1", "true", "yes")
+
+
+def warmup_rows() -> int:
+    return max(50, int(os.environ.get("APP_WARMUP_ROWS", 500)))
+
+
+@contextmanager
+def _step(timings: Dict[str, float], name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - started
+
+
+def warmup(rows: Optional[int] = None) -> Dict[str, float]:
+    """Exercise imports, the upload pipeline and the dataset endpoints once.
+    Returns the seconds spent per step."""
+    timings: Dict[str, float] = {}
+    with _step(timings, "import"):
+        from core.datasets import Dataset
+        from core.downsample import MIN_POINTS
+        from core.encoding import encode_arrow, encode_json
+        from core.processor import build_results, load_trades, make_response, tailor_results
+        from core.simulation import SimulationParams
+        from core.synthetic import export_csv
+        import core.streaming  # noqa: F401  (imported by /upload/stream)
+
+    with _step(timings, "upload"):
+        content = export_csv(rows or warmup_rows(), seed=0)
+        df = load_trades(io.BytesIO(content))
+        results = build_results(df)
+        tailored = tailor_results(df, results, 'scalper', MIN_POINTS)
+        for layout in ('rows', 'columnar'):
+            encode_json(make_response(df, tailored, layout=layout), 'gzip')
+        encode_arrow(df, 'gzip')
+
+    with _step(timings, "dataset"):
+        dataset = Dataset("warmup", df).compact()
+        symbol = dataset.symbols()[0]
+        for payload in (
+            dataset.stats(layout='columnar', max_points=MIN_POINTS),
+            dataset.stats(start=dataset.start_date),
+            dataset.analytics(),
+            dataset.breakdown(['Symbol', 'Hour'], symbol=symbol),
+            dataset.calendar(),
+            dataset.trades(sort='PnL', symbol=symbol, direction='long'),
+            dataset.simulate(params=SimulationParams(paths=100)),
+        ):
+            encode_json(payload)
+    return timings
@@ -1,9 +1,36 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import TYPE_CHECKING, Literal, Optional, Tuple
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from core.processor import process_csv
-import uvicorn
+from starlette.concurrency import run_in_threadpool
+from core.executor import get_pool, process_bytes, process_path, register_dataset, PoolSaturatedError, JobTimeoutError
+from core.ingest import spool_upload, stream_threshold
+from core.encoding import EncodedResponse, encode_arrow, encode_json, negotiate_encoding, negotiate_format
+from core.metrics import get_metrics, server_timing
+from core.warmup import warmup, warmup_enabled
 
-app = FastAPI(title="Trading Dashboard API")
+# Modules that import Polars or NumPy are imported where they are used, so
+# the app module (and a new worker) loads quickly; see core.warmup
+if TYPE_CHECKING:
+    from core.datasets import Dataset
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if warmup_enabled():
+        # Before the worker accepts requests, so the first one is not slower
+        for step, seconds in (await run_in_threadpool(warmup)).items():
+            get_metrics().warmup_seconds.set(seconds, step=step)
+        await get_pool().prestart()
+    yield
+    get_pool().shutdown()
+    from core.simulation import shutdown_pool
+    shutdown_pool()
+
+app = FastAPI(title="Trading Dashboard API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -12,24 +39,314 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Dataset-Id", "X-Total-Count", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Route template, not the raw path, to keep label cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    get_metrics().request_seconds.observe(time.perf_counter() - started, method=request.method,
+                                          route=route, status=response.status_code)
+    return response
+
+def negotiate(request: Request, fmt: Optional[str], allow_arrow: bool = True) -> Tuple[str, Optional[str]]:
+    """Pick (format, content encoding) from ?format= and the Accept headers."""
+    try:
+        fmt = negotiate_format(request.headers.get("accept"), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if fmt == 'arrow' and not allow_arrow:
+        raise HTTPException(status_code=406, detail="Arrow format is only available for tabular results")
+    return fmt, negotiate_encoding(request.headers.get("accept-encoding"))
+
+def check_buckets(buckets: Optional[str]):
+    from core.buckets import parse_scheme
+    try:
+        parse_scheme(buckets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def check_points(max_points: Optional[int]):
+    from core.downsample import check_max_points
+    try:
+        check_max_points(max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def send(encoded: EncodedResponse) -> Response:
+    return Response(content=encoded.body, media_type=encoded.media_type, headers=encoded.headers)
+
 @app.get("/")
 async def root():
     return {"message": "Trading Dashboard API is running"}
 
+@app.get("/metrics")
+def metrics():
+    registry = get_metrics()
+    registry.pending.set(get_pool().pending)
+    return Response(content=registry.render(), media_type=registry.CONTENT_TYPE)
+
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    request: Request,
+    file: UploadFile = File(...),
+    include_data: bool = True,
+    fmt: Optional[str] = Query(None, alias="format"),
+    buckets: Optional[str] = None,
+    max_points: Optional[int] = None,
+):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
-    
+    fmt, content_encoding = negotiate(request, fmt)
+    check_buckets(buckets)
+    check_points(max_points)
+
+    started = time.perf_counter()
+    stages = []
+    path = None
+    if file.size is not None and file.size > stream_threshold():
+        from core.cache import content_hasher
+        # Large export: spool to disk and scan lazily instead of holding it in memory
+        hasher = content_hasher()
+        path, _ = await run_in_threadpool(spool_upload, file.file, hasher)
+        stages.append({"name": "spool", "seconds": time.perf_counter() - started, "bytes_in": file.size})
+        job = (process_path, path, hasher.hexdigest())
+        bytes_in = file.size
+    else:
+        content = await file.read()
+        job = (process_bytes, content)
+        bytes_in = len(content)
+
     try:
-        results = process_csv(file.file)
-        return results
+        # CPU-heavy: run on the worker pool so the event loop stays responsive
+        submitted = time.perf_counter()
+        encoded = await get_pool().run(*job, include_data, fmt, content_encoding, buckets, max_points)
+        if encoded.frame is not None:
+            # Processed in a worker process: keep the dataset in this one
+            encoded = await run_in_threadpool(register_dataset, encoded)
+        profile = encoded.profile or {"seconds": 0.0, "stages": []}
+        # Whatever the job itself didn't account for was spent waiting for a worker
+        stages.append({"name": "queue", "seconds": max(0.0, time.perf_counter() - submitted - profile["seconds"])})
+        stages.extend(profile["stages"])
+        elapsed = time.perf_counter() - started
+        get_metrics().observe_upload({**profile, "stages": stages}, elapsed, bytes_in, len(encoded.body))
+        return send(encoded._replace(headers={**encoded.headers, "Server-Timing": server_timing(stages, elapsed)}))
+    except PoolSaturatedError as e:
+        if path:
+            # Rejected before the job could take ownership of the file
+            os.remove(path)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other uploads, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except JobTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Processing timed out: {str(e)}")
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
 
+@app.post("/upload/stream")
+async def upload_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    include_data: bool = True,
+    fmt: Optional[str] = Query(None, alias="format"),
+    buckets: Optional[str] = None,
+    max_points: Optional[int] = None,
+):
+    # Same result as /upload, preceded by progress and partial-result events
+    # (see core.streaming)
+    from core.cache import content_hasher
+    from core.streaming import MEDIA_TYPE as EVENT_STREAM, stream_upload
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+    fmt, _ = negotiate(request, fmt, allow_arrow=False)
+    check_buckets(buckets)
+    check_points(max_points)
+
+    # Counts against the upload pool's capacity, but runs on the response's
+    # own thread so events can be sent as they are produced
+    pool = get_pool()
+    try:
+        pool.admit()
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other uploads, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    try:
+        hasher = content_hasher()
+        path, _ = await run_in_threadpool(spool_upload, file.file, hasher)
+    except BaseException:
+        pool.release()
+        raise
+
+    def events():
+        try:
+            yield from stream_upload(path, hasher.hexdigest(), include_data, fmt, buckets, max_points)
+        finally:
+            pool.release()
+
+    return StreamingResponse(events(), media_type=EVENT_STREAM,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def load_dataset(dataset_id: str) -> "Dataset":
+    from core.datasets import get_store, DatasetNotFoundError
+    try:
+        return get_store().get(dataset_id)
+    except DatasetNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found. Please upload the file again.")
+
+def check_range(start: Optional[date], end: Optional[date]):
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'start' must not be after 'end'")
+
+# Dataset endpoints are plain `def` so FastAPI runs them in its threadpool
+@app.get("/datasets/{dataset_id}")
+def dataset_info(dataset_id: str):
+    return load_dataset(dataset_id).info()
+
+@app.get("/datasets/{dataset_id}/stats")
+def dataset_stats(
+    request: Request,
+    dataset_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
+    buckets: Optional[str] = None,
+    max_points: Optional[int] = None,
+):
+    check_range(start, end)
+    check_buckets(buckets)
+    check_points(max_points)
+    fmt, content_encoding = negotiate(request, fmt, allow_arrow=False)
+    result = load_dataset(dataset_id).stats(start, end, fmt, buckets, max_points)
+    return send(encode_json(result, content_encoding))
+
+@app.get("/datasets/{dataset_id}/analytics")
+def dataset_analytics(
+    request: Request,
+    dataset_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    window: Optional[int] = Query(None, description="Rolling window, default 50"),
+    unit: Literal['trades', 'days'] = 'trades',
+    fmt: Optional[str] = Query(None, alias="format"),
+):
+    from core.analytics import DEFAULT_WINDOW
+    check_range(start, end)
+    fmt, content_encoding = negotiate(request, fmt, allow_arrow=False)
+    try:
+        result = load_dataset(dataset_id).analytics(start, end, DEFAULT_WINDOW if window is None else window, unit, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return send(encode_json(result, content_encoding))
+
+@app.get("/datasets/{dataset_id}/breakdown")
+def dataset_breakdown(
+    request: Request,
+    dataset_id: str,
+    by: str = Query('Symbol', description="Comma-separated: Symbol, Weekday, Hour, Direction"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    symbol: Optional[str] = None,
+    direction: Optional[Literal['long', 'short']] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
+):
+    from core.cube import parse_dimensions
+    check_range(start, end)
+    fmt, content_encoding = negotiate(request, fmt, allow_arrow=False)
+    try:
+        result = load_dataset(dataset_id).breakdown(parse_dimensions(by), start, end, symbol, direction, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return send(encode_json(result, content_encoding))
+
+@app.get("/datasets/{dataset_id}/calendar")
+def dataset_calendar(
+    request: Request,
+    dataset_id: str,
+    month: Optional[str] = Query(None, description="YYYY-MM"),
+    year: Optional[int] = None,
+):
+    if month and year:
+        raise HTTPException(status_code=400, detail="Pass either 'month' or 'year', not both")
+    _, content_encoding = negotiate(request, None, allow_arrow=False)
+    try:
+        result = load_dataset(dataset_id).calendar(month, year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return send(encode_json(result, content_encoding))
+
+@app.get("/datasets/{dataset_id}/simulate")
+def dataset_simulate(
+    request: Request,
+    dataset_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    paths: int = 1000,
+    trades: Optional[int] = None,
+    seed: int = 0,
+    account_size: float = 50_000.0,
+    trailing_drawdown: float = Query(2_000.0, description="0 disables the trailing drawdown rule"),
+    lock_at_start: bool = True,
+):
+    from core.simulation import SimulationParams
+    check_range(start, end)
+    _, content_encoding = negotiate(request, None, allow_arrow=False)
+    params = SimulationParams(paths, trades, seed, account_size, trailing_drawdown or None, lock_at_start)
+    try:
+        result = load_dataset(dataset_id).simulate(start, end, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return send(encode_json(result, content_encoding))
+
+@app.post("/datasets/{dataset_id}/append")
+def dataset_append(dataset_id: str, file: UploadFile = File(...)):
+    from core.datasets import append_upload, DatasetNotFoundError
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+    load_dataset(dataset_id)
+    try:
+        return append_upload(dataset_id, file.file.read())
+    except DatasetNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found. Please upload the file again.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/datasets/{dataset_id}/trades")
+def dataset_trades(
+    request: Request,
+    dataset_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    sort: str = 'Date',
+    order: Literal['asc', 'desc'] = 'desc',
+    symbol: Optional[str] = None,
+    direction: Optional[Literal['long', 'short']] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
+):
+    check_range(start, end)
+    fmt, content_encoding = negotiate(request, fmt)
+    dataset = load_dataset(dataset_id)
+    try:
+        if fmt == 'arrow':
+            total, page = dataset.page(offset, limit, sort, order, symbol, direction, start, end)
+            return send(encode_arrow(page, content_encoding, {"X-Dataset-Id": dataset.id, "X-Total-Count": str(total)}))
+        result = dataset.trades(offset, limit, sort, order, symbol, direction, start, end, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return send(encode_json(result, content_encoding))
+
 if __name__ == "__main__":
+    # Development server; use serve.py in production
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import tempfile
+from typing import Optional, Sequence
+
+# Production launcher.
+#
+#   cd backend
+#   python serve.py                       # one worker per CPU on 0.0.0.0:8000
+#   python serve.py --workers 4 --port 9000
+#
+# Every worker warms up (see core.warmup) before it accepts requests: uvicorn
+# runs the app's startup, which imports the processing modules and runs the
+# upload pipeline once on a tiny synthetic export, so the first upload a
+# worker gets is as fast as the next ones. Uvicorn spawns its workers rather
+# than forking them, so nothing is shared by preloading the app in the
+# supervisor; with a single worker the app is imported here and served
+# in-process. Use `python main.py` for development (auto-reload, no warmup).
+#
+# Each worker has its own dataset store, and a follow-up request can land on
+# another worker than the upload. With several workers, the result cache's
+# disk tier (shared by all of them) is therefore always on: datasets missing
+# from a worker's store are rehydrated from it.
+#
+# Configuration (environment variables, overridden by the options):
+#   HOST              bind address (default: 0.0.0.0)
+#   PORT              port (default: 8000)
+#   WEB_CONCURRENCY   worker processes (default: CPU count)
+#   APP_WARMUP        set to 0 to skip the warmup (default here: 1)
+#   RESULT_CACHE_DIR  shared result cache (default with several workers:
+#                     <temp>/trading-result-cache), bounded by
+#                     RESULT_CACHE_DISK_MB (default: 2048, see core.cache)
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8000
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "trading-result-cache")
+
+
+def default_workers() -> int:
+    return max(1, int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python serve.py", description="Run the API in production.")
+    parser.add_argument("--host", default=os.environ.get("HOST", DEFAULT_HOST),
+                        help=f"bind address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", DEFAULT_PORT)),
+                        help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="worker processes (default: WEB_CONCURRENCY or the CPU count)")
+    parser.add_argument("--no-warmup", action="store_true", help="start serving without warming up")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # Inherited by the spawned workers
+    if args.no_warmup:
+        os.environ["APP_WARMUP"] = "0"
+    else:
+        os.environ.setdefault("APP_WARMUP", "1")
+    if args.workers > 1 and not os.environ.get("RESULT_CACHE_DIR"):
+        os.environ["RESULT_CACHE_DIR"] = DEFAULT_CACHE_DIR
+
+    import uvicorn
+
+    options = dict(host=args.host, port=args.port, log_level=args.log_level, reload=False)
+    if args.workers > 1:
+        uvicorn.run("main:app", workers=args.workers, **options)
+    else:
+        from main import app
+        uvicorn.run(app, **options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import io
+import unittest
+from datetime import date
+
+import polars as pl
+
+from core.analytics import compute_analytics, drawdown, rolling, streaks
+from core.datasets import DatasetStore
+from core.processor import load_trades
+
+# Equity: 100, 50, -10, 20, 120, 110
+CSV = b"""Date,Symbol,Direction,Duration,PnL
+2024-01-01,ES,Long,60,100.0
+2024-01-02,ES,Long,60,-50.0
+2024-01-02,ES,Short,60,-60.0
+2024-01-05,ES,Long,60,30.0
+2024-01-08,ES,Long,60,100.0
+2024-01-09,ES,Short,60,-10.0
+"""
+
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.df = load_trades(io.BytesIO(CSV))
+
+    def test_drawdown(self):
+        dd = drawdown(self.df)
+        self.assertEqual(dd["max_drawdown"], -110.0)
+        self.assertEqual(dd["max_drawdown_pct"], -110.0)
+        self.assertEqual((dd["peak_date"], dd["trough_date"], dd["recovery_date"]),
+                         ("2024-01-01", "2024-01-02", "2024-01-08"))
+        self.assertEqual((dd["trades_to_trough"], dd["trades_to_recovery"]), (2, 2))
+        self.assertEqual((dd["days_to_trough"], dd["days_to_recovery"]), (1, 6))
+        self.assertEqual(dd["current_drawdown"], -10.0)
+        self.assertEqual((dd["longest_underwater_trades"], dd["longest_underwater_days"]), (3, 7))
+
+    def test_drawdown_from_start(self):
+        df = pl.DataFrame({"Date": [date(2024, 1, 1), date(2024, 1, 2)], "NetPnL": [-5.0, 2.0]})
+        dd = drawdown(df)
+        self.assertEqual(dd["max_drawdown"], -5.0)
+        self.assertIsNone(dd["max_drawdown_pct"])
+        self.assertEqual(dd["trades_to_trough"], 1)
+        self.assertIsNone(dd["recovery_date"])
+
+    def test_drawdown_without_percentage(self):
+        # No trades, no drawdown and a drawdown from the start all give None
+        frames = [self.df.head(0), self.df.head(1),
+                  pl.DataFrame({"Date": [date(2024, 1, 1)], "NetPnL": [-5.0]})]
+        self.assertEqual([drawdown(df)["max_drawdown_pct"] for df in frames], [None, None, None])
+        self.assertEqual(drawdown(self.df.head(0))["max_drawdown"], 0.0)
+
+    def test_streaks(self):
+        self.assertEqual(streaks(self.df), {"max_win_streak": 2, "max_loss_streak": 2,
+                                            "current_streak": 1, "current_streak_type": "loss"})
+
+    def test_rolling_trades(self):
+        series = rolling(self.df, window=3)
+        self.assertEqual(series["Trade"].to_list(), [3, 4, 5, 6])
+        self.assertEqual(series["WinRate"].to_list(), [33.33, 33.33, 66.67, 66.67])
+        self.assertEqual(series["Expectancy"].to_list(), [-3.33, -26.67, 23.33, 40.0])
+        pnl = pl.Series([-60.0, 30.0, 100.0])
+        self.assertAlmostEqual(series["Sharpe"][-2], round(pnl.mean() / pnl.std(), 3))
+        downside = (pnl.clip(upper_bound=0) ** 2).mean() ** 0.5
+        self.assertAlmostEqual(series["Sortino"][-2], round(pnl.mean() / downside, 3))
+
+    def test_rolling_days(self):
+        series = rolling(self.df, window=5, unit="days")
+        # Windows of 5 calendar days ending on each trading day from Jan 5
+        self.assertEqual(series["Date"].to_list(), [date(2024, 1, 5), date(2024, 1, 8), date(2024, 1, 9)])
+        self.assertEqual(series["WinRate"].to_list(), [50.0, 100.0, 66.67])
+        self.assertEqual(series["Expectancy"].to_list(), [5.0, 65.0, 40.0])
+
+    def test_undefined_ratios_are_null(self):
+        # No losing trade in the first window: no Sortino
+        series = rolling(self.df.tail(3), window=2)
+        self.assertEqual(series["Sortino"].to_list()[0], None)
+        self.assertIsNotNone(series["Sortino"].to_list()[1])
+
+    def test_rejects_bad_window(self):
+        with self.assertRaises(ValueError):
+            rolling(self.df, window=1)
+        with self.assertRaises(ValueError):
+            rolling(self.df, unit="weeks")
+
+    def test_dataset_range(self):
+        dataset = DatasetStore().add("ds", self.df)
+        result = dataset.analytics(start=date(2024, 1, 5), window=2, layout="columnar")
+        self.assertEqual(result["drawdown"]["max_drawdown"], -10.0)
+        self.assertEqual(result["rolling"]["series"]["Date"], ["2024-01-08", "2024-01-09"])
+        self.assertEqual(result["underwater"]["Drawdown"], [0.0, 0.0, -10.0])
+        self.assertEqual(compute_analytics(self.df.head(0))["streaks"]["current_streak"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
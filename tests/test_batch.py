@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import polars as pl
+
+from core import batch
+from core.batch import expand_inputs, load_file, main, run_batch, write_report
+from core.processor import calculate_stats, load_trades
+
+ACCOUNT_A = b"""Date,Symbol,Direction,Duration,PnL
+2023-01-01,AAPL,Long,60,100.0
+2023-01-02,GOOG,Short,120,-50.0
+"""
+
+ACCOUNT_B = b"""Date,Symbol,Direction,Duration,PnL
+2023-01-02,AAPL,Long,30,20.0
+2023-01-03,AAPL,Short,90,30.0
+"""
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        for name, content in (("acct-a.csv", ACCOUNT_A), ("acct-b.csv", ACCOUNT_B), ("broken.csv", b"foo,bar\n1,2\n")):
+            with open(os.path.join(self.dir, name), "wb") as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_expand_inputs(self):
+        paths = expand_inputs([self.dir, os.path.join(self.dir, "acct-*.csv")])
+        self.assertEqual([os.path.basename(p) for p in paths], ["acct-a.csv", "acct-b.csv", "broken.csv"])
+
+    def test_accounts_and_portfolio(self):
+        report = run_batch(expand_inputs([self.dir]), workers=2)
+
+        self.assertEqual(set(report["accounts"]), {"acct-a", "acct-b"})
+        self.assertIn("broken", report["errors"])
+        self.assertEqual(report["accounts"]["acct-a"]["stats"], calculate_stats(load_trades(io.BytesIO(ACCOUNT_A))))
+
+        combined = load_trades(io.BytesIO(ACCOUNT_A + ACCOUNT_B.split(b"\n", 1)[1]))
+        self.assertEqual(report["portfolio"]["stats"], calculate_stats(combined))
+        daily = report["portfolio"]["daily"]
+        self.assertEqual(daily["DailyPnL"].to_list(), [100.0, -30.0, 30.0])
+        self.assertEqual(daily["CumulativePnL"].to_list(), [100.0, 70.0, 100.0])
+        self.assertEqual(report["timing"]["rows"], 4)
+
+    def test_write_report_formats(self):
+        report = run_batch(expand_inputs([os.path.join(self.dir, "acct-*.csv")]), workers=1)
+        out = os.path.join(self.dir, "out")
+
+        write_report(report, out, "parquet")
+        self.assertEqual(pl.read_parquet(os.path.join(out, "accounts.parquet"))["summary_total_pnl"].to_list(), [50.0, 50.0])
+        self.assertEqual(len(pl.read_parquet(os.path.join(out, "daily.parquet"))), 4)
+
+        write_report(report, out, "json")
+        with open(os.path.join(out, "report.json")) as f:
+            written = json.load(f)
+        self.assertEqual(written["portfolio"]["daily"][-1], {
+            "Date": "2023-01-03", "DailyPnL": 30.0, "TradeCount": 1, "WinCount": 1, "CumulativePnL": 100.0,
+        })
+
+    def test_cli_exit_code(self):
+        out = os.path.join(self.dir, "out")
+        env = {k: v for k, v in os.environ.items() if k != "POLARS_MAX_THREADS"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertEqual(main([os.path.join(self.dir, "acct-*.csv"), "-o", out, "-w", "1", "-q"]), 0)
+            # The CLI caps the workers' Polars threads
+            self.assertIn("POLARS_MAX_THREADS", os.environ)
+        self.assertEqual(main([self.dir, "-o", out, "-w", "1", "-q"]), 1)
+
+    def test_library_leaves_environment(self):
+        env = {k: v for k, v in os.environ.items() if k != "POLARS_MAX_THREADS"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            run_batch(expand_inputs([self.dir]), workers=1)
+            self.assertNotIn("POLARS_MAX_THREADS", os.environ)
+
+    def test_file_read_once(self):
+        # The encoding comes from the first bytes; the whole file is only
+        # checked again when parsing fails
+        with mock.patch.object(batch, "file_encoding", wraps=batch.file_encoding) as check:
+            self.assertEqual(len(load_file(os.path.join(self.dir, "acct-a.csv"))), 2)
+            check.assert_not_called()
+            with self.assertRaises(ValueError):
+                load_file(os.path.join(self.dir, "broken.csv"))
+            check.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
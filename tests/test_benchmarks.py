@@ -0,0 +1,70 @@
+import io
+import unittest
+
+from benchmarks.run import compare, parse_size, size_label
+from core.processor import load_trades, process_csv
+from core.synthetic import export_csv, generate_trades
+
+TOPSTEPX_COLUMNS = [
+    "Id", "ContractName", "EnteredAt", "ExitedAt", "EntryPrice", "ExitPrice", "Fees", "PnL",
+    "Size", "Type", "TradeDay", "TradeDuration", "Commissions",
+]
+
+
+def timespan_seconds(value):
+    # h:mm:ss or d:h:mm:ss
+    parts = [int(p) for p in value.split(":")]
+    days = parts.pop(0) if len(parts) == 4 else 0
+    hours, minutes, seconds = parts
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+class TestSynthetic(unittest.TestCase):
+    def test_schema_and_formats(self):
+        df = generate_trades(500, seed=3)
+        self.assertEqual(df.columns, TOPSTEPX_COLUMNS)
+        self.assertEqual(len(df), 500)
+        self.assertRegex(df["EnteredAt"][0], r"^\d\d/\d\d/\d{4} \d\d:\d\d:\d\d [+-]\d\d:\d\d$")
+        self.assertRegex(df["TradeDay"][0], r"^\d\d/\d\d/\d{4} 19:00:00 -05:00$")
+        self.assertEqual(set(df["Type"]), {"Long", "Short"})
+
+    def test_seeded(self):
+        self.assertEqual(export_csv(200, seed=1), export_csv(200, seed=1))
+        self.assertNotEqual(export_csv(200, seed=1), export_csv(200, seed=2))
+
+    def test_processes_like_an_export(self):
+        raw = generate_trades(1000, seed=0)
+        df = load_trades(io.BytesIO(export_csv(1000, seed=0)))
+        self.assertEqual(len(df), 1000)
+        # Durations computed from the timestamps agree with TradeDuration
+        self.assertEqual(df["Duration"].sum(), sum(timespan_seconds(v) for v in raw["TradeDuration"]))
+        self.assertAlmostEqual(df["NetPnL"].sum(), (raw["PnL"] - raw["Fees"]).sum(), places=6)
+
+        result = process_csv(io.BytesIO(export_csv(1000, seed=0)))
+        self.assertEqual(result["stats"]["summary"]["total_trades"], 1000)
+
+    def test_multi_day_durations(self):
+        raw = generate_trades(2000, seed=5, max_duration=3 * 86400)
+        self.assertTrue(raw["TradeDuration"].str.count_matches(":").eq(3).any())
+
+
+class TestBenchmarkRunner(unittest.TestCase):
+    def test_sizes(self):
+        self.assertEqual([parse_size(s) for s in ("1k", "10m", "2500")], [1000, 10_000_000, 2500])
+        self.assertEqual([size_label(n) for n in (1000, 10_000_000, 2500)], ["1k", "10m", "2500"])
+
+    def test_compare_flags_regressions(self):
+        def case(load, stats):
+            return {"stages": {"load_trades": {"median": load}, "calculate_stats": {"median": stats}}}
+
+        baseline = {"results": {"100k": case(0.100, 0.002)}}
+        results = {"100k": case(0.150, 0.004)}
+        regressions = compare(results, baseline, tolerance=0.25)
+
+        # calculate_stats doubled but stays under the noise floor
+        self.assertEqual([r["stage"] for r in regressions], ["load_trades"])
+        self.assertEqual(results["100k"]["stages"]["load_trades"]["change"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
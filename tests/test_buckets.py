@@ -0,0 +1,45 @@
+import unittest
+import polars as pl
+from core.buckets import parse_scheme, bucket_stats, make_labels, DEFAULT_LABELS, PRESETS
+
+
+class TestBuckets(unittest.TestCase):
+    def setUp(self):
+        self.df = pl.DataFrame({
+            'Duration': [-5.0, 0.0, 10.0, 20.0, 40.0, 100.0, 100000.0],
+            'NetPnL': [1.0, 10.0, -5.0, 20.0, -10.0, 30.0, 5.0],
+        })
+
+    def test_parse_presets_and_custom(self):
+        self.assertEqual(parse_scheme(None), (PRESETS['default'], DEFAULT_LABELS))
+        edges, labels = parse_scheme('60,0,30')
+        self.assertEqual(edges, [0.0, 30.0, 60.0, float('inf')])
+        self.assertEqual(labels, ['Under 30 sec', '30 sec - 1 min', '1 min and up'])
+        for bad in ('abc', '10,10', '-1,5', 'inf'):
+            with self.assertRaises(ValueError):
+                parse_scheme(bad)
+
+    def test_labels(self):
+        self.assertEqual(make_labels([0, 3600, 7200, 86400, float('inf')]),
+                         ['Under 1 hour', '1 hour - 2 hours', '2 hours - 1 day', '1 day and up'])
+
+    def test_bucket_stats(self):
+        rows = bucket_stats(self.df, *parse_scheme('0,15,60'))
+        self.assertEqual([r['count'] for r in rows], [2, 2, 2])
+        first, second, third = rows
+        self.assertEqual(first['win_rate'], 50.0)
+        self.assertEqual(first['profit_factor'], 2.0)
+        self.assertEqual(first['avg_pnl'], 2.5)
+        self.assertEqual(second['net_pnl'], 10.0)
+        self.assertEqual(third['profit_factor'], 0.0)  # no losing trades
+
+    def test_matches_per_bucket_filters(self):
+        edges, labels = parse_scheme('default')
+        rows = bucket_stats(self.df, edges, labels)
+        for (lo, hi), row in zip(zip(edges[:-1], edges[1:]), rows):
+            subset = self.df.filter((pl.col('Duration') >= lo) & (pl.col('Duration') < hi))
+            self.assertEqual(row['count'], len(subset))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from core import cache as cache_module
+from core.cache import ResultCache, content_key
+from core.processor import load_trades, build_results
+
+CSV = b"""Date,Symbol,Direction,Duration,PnL
+2023-01-01,AAPL,Long,60,100.0
+2023-01-02,GOOG,Short,120,-50.0
+"""
+
+
+def entry(csv=CSV):
+    df = load_trades(io.BytesIO(csv))
+    return df, build_results(df)
+
+
+class TestResultCache(unittest.TestCase):
+    def test_key_depends_on_content_and_version(self):
+        self.assertEqual(content_key(CSV), content_key(CSV))
+        self.assertNotEqual(content_key(CSV), content_key(CSV + b"\n"))
+        key = content_key(CSV)
+        with mock.patch.object(cache_module, "PROCESSOR_VERSION", "test"):
+            self.assertNotEqual(content_key(CSV), key)
+
+    def test_memory_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+        df, results = entry()
+        cache.put("a", df, results)
+        cache.put("b", df, results)
+        cache.get("a")  # refresh "a", so "b" is least recently used
+        cache.put("c", df, results)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_disk_tier_survives_new_instance(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            df, results = entry()
+            ResultCache(directory=tmp).put("k", df, results)
+
+            cached = ResultCache(directory=tmp).get("k")
+            self.assertIsNotNone(cached)
+            cached_df, cached_results = cached
+            self.assertTrue(cached_df.equals(df))
+            self.assertEqual(cached_results, results)
+
+    def test_disk_tier_budget(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            df, results = entry()
+            ResultCache(directory=tmp).put("size", df, results)
+            size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+            os.remove(os.path.join(tmp, "size.json"))
+
+            cache = ResultCache(max_entries=0, directory=tmp, max_disk_bytes=int(size * 2.5))
+            for age, key in enumerate(("a", "b"), start=1):
+                cache.put(key, df, results)
+                os.utime(os.path.join(tmp, f"{key}.json"), (age, age))
+            self.assertIsNotNone(cache.get("a"))  # read: now the most recent
+            cache.put("c", df, results)
+            # The orphaned frame and "b" are removed, "a" and "c" fit
+            self.assertEqual(sorted(os.listdir(tmp)), ["a.json", "a.parquet", "c.json", "c.parquet"])
+            self.assertIsNone(cache.get("b"))
+
+    def test_recipes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            df, results = entry()
+            cache = ResultCache(max_entries=2, directory=tmp)
+            cache.put("a", df, results)
+            cache.put_recipe("b", "a", CSV)
+            self.assertIsNone(cache.get_recipe("a"))
+            self.assertEqual(cache.get_recipe("b"), ("a", CSV))
+            self.assertIsNone(cache.get_memory("b"))
+            cache.put_recipe("c", "b", CSV)  # entries and recipes share the LRU order
+            self.assertIsNone(cache.get_memory("a"))
+            self.assertEqual(ResultCache(directory=tmp).get_recipe("c"), ("b", CSV))
+
+            ResultCache(directory=tmp, max_disk_bytes=0).put_recipe("d", "c", CSV)
+            self.assertEqual(sorted(os.listdir(tmp)), ["d.csv", "d.parent"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import unittest
+from datetime import date, timedelta
+
+import polars as pl
+
+from core.calendar import build_calendar, lookup
+from core.datasets import DatasetStore
+from core.processor import load_trades
+from core.stats import aggregate
+
+
+def trades_over(days: int) -> pl.DataFrame:
+    """One or two trades a day from 2024-12-20, skipping weekends."""
+    rows = []
+    for i in range(days):
+        day = date(2024, 12, 20) + timedelta(days=i)
+        if day.weekday() < 5:
+            rows.append(f"{day.isoformat()},ES,{(i % 7) * 10 - 25}")
+            if i % 3 == 0:
+                rows.append(f"{day.isoformat()},NQ,15")
+    csv = "Date,Symbol,PnL\n" + "\n".join(rows) + "\n"
+    return load_trades(io.BytesIO(csv.encode()))
+
+
+class TestCalendar(unittest.TestCase):
+    def setUp(self):
+        self.df = trades_over(120)
+        self.index = build_calendar(aggregate(self.df)[1])
+
+    def test_month_totals_and_days(self):
+        month = lookup(self.index, '2025-01')['months'][0]
+        trades = self.df.filter(pl.col('Date').dt.strftime('%Y-%m') == '2025-01')
+        self.assertEqual(month['trade_count'], len(trades))
+        self.assertEqual(month['win_count'], (trades['PnL'] > 0).sum())
+        self.assertAlmostEqual(month['pnl'], trades['NetPnL'].sum())
+        self.assertEqual(month['trading_days'], trades['Date'].n_unique())
+        self.assertEqual([d['Date'] for d in month['days']][:2], ['2025-01-01', '2025-01-02'])
+        self.assertEqual(sum(d['TradeCount'] for d in month['days']), len(trades))
+
+    def test_iso_weeks(self):
+        weeks = lookup(self.index, '2025-01')['months'][0]['weeks']
+        # 2025-01-01 is a Wednesday in ISO week 1, which starts on 2024-12-30
+        self.assertEqual(weeks[0]['week'], '2025-W01')
+        self.assertEqual((weeks[0]['start'], weeks[0]['end']), ('2024-12-30', '2025-01-05'))
+        first = self.df.filter(pl.col('Date').is_between(date(2024, 12, 30), date(2025, 1, 5)))
+        self.assertEqual(weeks[0]['trade_count'], len(first))
+        # The same week object is shared with December
+        self.assertIs(lookup(self.index, '2024-12')['months'][0]['weeks'][-1], weeks[0])
+
+    def test_years_and_empty(self):
+        years = lookup(self.index, year=2025)
+        self.assertEqual([m['month'] for m in years['months']], ['2025-01', '2025-02', '2025-03', '2025-04'])
+        self.assertEqual(years['trade_count'] + lookup(self.index, year=2024)['trade_count'], len(self.df))
+        self.assertEqual(lookup(self.index, '2030-1')['months'][0]['month'], '2030-01')
+        self.assertEqual(lookup(self.index, year=1999)['months'], [])
+        self.assertEqual(len(lookup(self.index)['months']), 5)
+        with self.assertRaises(ValueError):
+            lookup(self.index, '2025-13')
+
+    def test_dataset_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        dataset = DatasetStore().add("ds", self.df)
+        february = dataset.calendar('2025-02')['months'][0]
+        self.assertEqual(february, self.index.months['2025-02'])
+        # Built once, then served from the index
+        self.assertIs(dataset.calendar('2025-02')['months'][0], february)
+
+        csv = b"Date,Symbol,PnL\n2025-03-03,ES,10\n2025-03-04,ES,-5\n"
+        with TestClient(app) as client:
+            dataset_id = client.post("/upload", files={"file": ("t.csv", csv, "text/csv")}).json()["dataset_id"]
+            r = client.get(f"/datasets/{dataset_id}/calendar?month=2025-03")
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.json()["months"][0]["win_count"], 1)
+            self.assertEqual(client.get(f"/datasets/{dataset_id}/calendar?year=2025").json()["trade_count"], 2)
+            self.assertEqual(client.get(f"/datasets/{dataset_id}/calendar?month=March").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import polars as pl
+
+from core.compact import CompactFrame, plan_codec
+from core.datasets import DatasetStore
+from core.processor import build_results, normalize_trades, plan_trades
+from core.synthetic import generate_trades
+
+
+def trades(n: int, seed: int) -> pl.DataFrame:
+    raw = generate_trades(n, seed=seed)
+    return normalize_trades(raw.lazy(), plan_trades(raw)).collect().sort('Date', maintain_order=True)
+
+
+class TestCompact(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        patcher = mock.patch.dict(os.environ, {"DATASET_SPILL_DIR": self.dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.df = trades(4000, seed=8)
+
+    def test_round_trip_is_exact(self):
+        compact = CompactFrame.encode(self.df)
+        self.assertTrue(compact.mapped)
+        self.assertTrue(compact.decode().equals(self.df))
+        self.assertEqual(compact.decode().schema, self.df.schema)
+        self.assertLess(compact.nbytes, self.df.estimated_size() / 1.5)
+
+        stored = compact.codec.stored
+        self.assertIsInstance(stored['Symbol'], pl.Enum)
+        self.assertEqual(stored['EntryPrice'], pl.Int32)
+        self.assertIn(stored['EnteredAt'], (pl.Int32, pl.Int64))
+        self.assertIn('NetPnL', compact.codec.derived)
+        self.assertNotIn('NetPnL', stored)
+        self.assertTrue(compact.slice(100, 5).equals(self.df.slice(100, 5)))
+        rows = pl.Series([7, 3, 3000])
+        self.assertTrue(compact.decode(rows, ['NetPnL', 'Symbol']).equals(self.df[rows].select('NetPnL', 'Symbol')))
+
+    def test_lossy_values_keep_their_type(self):
+        df = pl.DataFrame({
+            'PnL': [1.25, 2.5, 0.1 + 0.2, float('nan')],
+            'Fees': [0.0, -0.0, 1.5, None],
+            'Duration': [60.0, 30.0, 1e12, 2.5],
+            'EnteredAt': ['2025-01-02 09:30:00', '2025-1-2 09:31:00', '2025-01-02T09:32:00', None],
+        })
+        codec = plan_codec(df)
+        self.assertEqual(codec.stored, dict(df.schema))
+        self.assertTrue(CompactFrame.encode(df, mmap=False).decode().equals(df))
+
+        cents = plan_codec(pl.DataFrame({'PnL': [1.25, -2.5, None, 3.0] * 2}))
+        self.assertEqual((cents.stored['PnL'], cents.cents), (pl.Int16, ('PnL',)))
+
+    def test_extend_shares_or_reencodes(self):
+        head, tail = self.df.head(3000), self.df.slice(3000)
+        compact = CompactFrame.encode(head)
+        extended = compact.extend(tail)
+        self.assertIs(extended.codec, compact.codec)
+        self.assertTrue(extended.decode().equals(self.df))
+
+        wider = tail.with_columns(pl.lit('NEW').alias('Symbol'), (pl.col('PnL') * 1000).alias('PnL'))
+        reencoded = compact.extend(wider)
+        self.assertIsNot(reencoded.codec, compact.codec)
+        self.assertTrue(reencoded.decode().equals(pl.concat([head, wider])))
+
+    def test_file_removed_with_frame(self):
+        compact = CompactFrame.encode(self.df)
+        self.assertEqual(len(os.listdir(self.dir)), 1)
+        del compact
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_dataset_results_unchanged(self):
+        dataset = DatasetStore(compact="sync").add("ds", self.df)
+        self.assertTrue(dataset.compacted)
+        # The date index reads the mapped Date column, not a heap copy
+        self.assertEqual(dataset._dates.to_arrow().buffers()[1].address,
+                         dataset._data.stored('Date').to_arrow().buffers()[1].address)
+        self.assertEqual(dataset.stats()["stats"], build_results(self.df)["stats"])
+        self.assertEqual(dataset.symbols(), self.df['Symbol'].unique().sort().to_list())
+        page = dataset.trades(limit=5, sort='NetPnL', symbol=dataset.symbols()[0], direction='long')
+        expected = self.df.filter((pl.col('Symbol') == dataset.symbols()[0])
+                                  & pl.col('Direction').str.to_lowercase().str.contains('long|buy'))
+        self.assertEqual(page["total"], len(expected))
+        self.assertEqual([t["NetPnL"] for t in page["trades"]],
+                         expected['NetPnL'].sort(descending=True).head(5).to_list())
+        self.assertEqual(dataset.trades(symbol='UNKNOWN')["total"], 0)
+
+    def test_store_memory_budget(self):
+        first = DatasetStore(compact="sync").add("a", self.df)
+        store = DatasetStore(max_entries=10, max_bytes=int(first.nbytes * 2.5), compact="sync")
+        for key in "abc":
+            store.add(key, self.df)
+        self.assertEqual(list(store._datasets), ["b", "c"])
+        store.get("b")      # now the most recently used
+        store.add("d", self.df)
+        self.assertEqual(list(store._datasets), ["b", "d"])
+        self.assertLessEqual(store.nbytes, store.max_bytes)
+
+        # A dataset over the budget on its own is still kept
+        tiny = DatasetStore(max_bytes=1, compact="off")
+        tiny.add("a", self.df)
+        tiny.add("b", self.df)
+        self.assertEqual(list(tiny._datasets), ["b"])
+        self.assertFalse(tiny.get("b").compacted)
+
+    def test_appends_to_compacted_dataset(self):
+        store = DatasetStore(compact="sync")
+        parent = store.add("ds", self.df.head(3000))
+        appended, added, _ = parent.append(self.df.slice(3000), "child")
+        self.assertEqual(added, 1000)
+        # The new rows fit the parent's encoding: no re-encode
+        self.assertTrue(appended.compacted)
+        self.assertIs(appended._data.codec, parent._data.codec)
+        self.assertTrue(appended.df.equals(self.df))
+
+
+if __name__ == '__main__':
+    unittest.main()
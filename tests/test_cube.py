@@ -0,0 +1,105 @@
+import io
+import unittest
+from datetime import date
+
+import polars as pl
+
+from core.cube import KEYS, build_cube, merge_cubes, parse_dimensions, rollup
+from core.datasets import DatasetStore
+from core.processor import load_trades
+from core.synthetic import generate_trades
+
+
+def trades(n: int, seed: int = 0) -> pl.DataFrame:
+    return load_trades(io.BytesIO(generate_trades(n, seed=seed).write_csv().encode()))
+
+
+class TestCube(unittest.TestCase):
+    def setUp(self):
+        self.df = trades(3000, seed=4)
+        self.cube = build_cube(self.df)
+
+    def test_rollup_matches_trades(self):
+        rows = rollup(self.cube, ['Symbol'])
+        expected = self.df.group_by('Symbol').agg(
+            pl.len().alias('count'),
+            (pl.col('PnL') > 0).sum().alias('wins'),
+            pl.col('NetPnL').sum().round(2).alias('net_pnl'),
+            pl.col('Fees').sum().round(2).alias('fees'),
+        ).sort('Symbol')
+        self.assertEqual(rows['Symbol'].to_list(), expected['Symbol'].to_list())
+        self.assertEqual(rows['count'].to_list(), expected['count'].to_list())
+        self.assertEqual(rows['wins'].to_list(), expected['wins'].to_list())
+        for got, want in zip(rows['net_pnl'].to_list(), expected['net_pnl'].to_list()):
+            self.assertAlmostEqual(got, want, places=6)
+
+        heatmap = rollup(self.cube, ['Weekday', 'Hour'])
+        hours = self.df.group_by(pl.col('Date').dt.weekday().alias('Weekday'), 'EntryHour').len()
+        self.assertEqual(len(heatmap), len(hours))
+        self.assertEqual(heatmap['count'].sum(), len(self.df))
+
+    def test_totals_filters_and_range(self):
+        total = rollup(self.cube).row(0, named=True)
+        self.assertEqual(total['count'], len(self.df))
+        self.assertAlmostEqual(total['net_pnl'], round(self.df['NetPnL'].sum(), 2), places=6)
+        self.assertAlmostEqual(total['avg_duration'], round(self.df['Duration'].mean(), 2), places=6)
+
+        start, end = date(2025, 1, 10), date(2025, 1, 20)
+        in_range = self.df.filter(pl.col('Date').is_between(start, end))
+        longs = in_range.filter(pl.col('Direction').str.to_lowercase() == 'long')
+        rows = rollup(self.cube, ['Direction'], start, end, {'Direction': 'long'})
+        self.assertEqual(rows['Direction'].to_list(), ['long'])
+        self.assertEqual(rows['count'][0], len(longs))
+        self.assertEqual(rollup(self.cube, start=date(2030, 1, 1))['count'][0], 0)
+
+    def test_merge(self):
+        a, b = self.df.head(1000), self.df.slice(1000)
+        merged = merge_cubes(build_cube(a), build_cube(b))
+        self.assertEqual(merged.height, self.cube.height)
+        # Cells in key order, so cubes compare equal run to run
+        keys = self.cube.select(KEYS)
+        self.assertTrue(keys.equals(keys.sort(list(KEYS), nulls_last=True)))
+        self.assertTrue(merged.select(KEYS).equals(keys))
+        self.assertTrue(rollup(merged, ['Symbol', 'Hour']).equals(rollup(self.cube, ['Symbol', 'Hour'])))
+
+    def test_without_entry_time(self):
+        df = load_trades(io.BytesIO(b"Date,Symbol,PnL\n2024-01-01,ES,10\n2024-01-02,NQ,-5\n"))
+        rows = rollup(build_cube(df), ['Hour', 'Direction'])
+        self.assertEqual(rows.row(0, named=True)['Hour'], None)
+        self.assertEqual(rows['Direction'].to_list(), ['unknown'])
+        self.assertEqual(rows['count'].to_list(), [2])
+
+    def test_parse_dimensions(self):
+        self.assertEqual(parse_dimensions('symbol, Hour,hour'), ['Symbol', 'Hour'])
+        self.assertEqual(parse_dimensions(''), [])
+        with self.assertRaises(ValueError):
+            parse_dimensions('Account')
+
+    def test_dataset_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        store = DatasetStore()
+        dataset = store.add("ds", trades(200, seed=1))
+        newer = trades(300, seed=1).slice(200)
+        # No cube yet: the appended dataset builds its own on first use
+        self.assertIsNone(dataset.append(newer, "ds2")[0]._cube)
+        dataset.cube()
+        appended, added, _ = dataset.append(newer, "ds2")
+        self.assertEqual(added, 100)
+        self.assertTrue(appended.cube().equals(merge_cubes(dataset.cube(), build_cube(appended.df.slice(200)))))
+        self.assertEqual(appended.breakdown(['Symbol'])['rows'],
+                         rollup(build_cube(appended.df), ['Symbol']).to_dicts())
+
+        csv = generate_trades(50, seed=3).write_csv().encode()
+        with TestClient(app) as client:
+            dataset_id = client.post("/upload", files={"file": ("t.csv", csv, "text/csv")}).json()["dataset_id"]
+            r = client.get(f"/datasets/{dataset_id}/breakdown?by=Weekday,Hour&direction=short&format=columnar")
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.json()["by"], ["Weekday", "Hour"])
+            self.assertIn("win_rate", r.json()["rows"])
+            self.assertEqual(client.get(f"/datasets/{dataset_id}/breakdown?by=Account").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import io
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+from core import cache, datasets, executor
+from core.cache import ResultCache
+from core.datasets import DatasetStore, DatasetNotFoundError, append_upload
+from core.processor import load_trades, calculate_stats
+
+CSV = b"""Date,Symbol,Direction,Duration,PnL
+2023-01-03,AAPL,Long,60,30.0
+2023-01-01,AAPL,Long,60,100.0
+2023-01-02,GOOG,Short,120,-50.0
+2023-01-02,GOOG,Long,30,20.0
+"""
+
+
+class TestDatasets(unittest.TestCase):
+    def setUp(self):
+        self.df = load_trades(io.BytesIO(CSV))
+        self.store = DatasetStore(max_entries=2)
+        self.dataset = self.store.add("ds", self.df)
+
+    def test_full_range_matches_upload_stats(self):
+        self.assertEqual(self.dataset.stats()["stats"], calculate_stats(self.df))
+
+    def test_date_range_slice(self):
+        self.assertEqual(self.dataset.bounds(date(2023, 1, 2), date(2023, 1, 2)), (1, 3))
+        result = self.dataset.stats(start=date(2023, 1, 2))
+        self.assertEqual(result["stats"]["summary"]["total_trades"], 3)
+        self.assertEqual(result["stats"]["summary"]["total_pnl"], 0.0)
+        self.assertEqual([d["Date"] for d in result["charts"]["daily_pnl"]], ["2023-01-02", "2023-01-03"])
+
+    def test_empty_range(self):
+        result = self.dataset.stats(start=date(2024, 1, 1))
+        self.assertEqual(result["stats"]["summary"]["total_trades"], 0)
+
+    def test_trades_sorted_page(self):
+        page = self.dataset.trades(offset=0, limit=2, sort='PnL', order='desc')
+        self.assertEqual(page["total"], 4)
+        self.assertEqual([t["PnL"] for t in page["trades"]], [100.0, 30.0])
+        page = self.dataset.trades(offset=2, limit=2, sort='PnL', order='asc')
+        self.assertEqual([t["PnL"] for t in page["trades"]], [30.0, 100.0])
+
+    def test_trades_filters(self):
+        page = self.dataset.trades(sort='Date', order='asc', direction='long', symbol='AAPL')
+        self.assertEqual(page["total"], 2)
+        self.assertEqual([t["Date"] for t in page["trades"]], [date(2023, 1, 1), date(2023, 1, 3)])
+        page = self.dataset.trades(start=date(2023, 1, 2), end=date(2023, 1, 2))
+        self.assertEqual(page["total"], 2)
+
+    def test_trades_rejects_unknown_sort_key(self):
+        with self.assertRaises(ValueError):
+            self.dataset.trades(sort='Symbol')
+
+    def test_append_dedupes_and_matches_full_upload(self):
+        csv = b"Id,Date,Symbol,Type,PnL,Fees\n1,2023-01-01,ES,Long,10,1\n2,2023-01-02,ES,Short,-5,1\n"
+        more = b"Id,Date,Symbol,Type,PnL,Fees\n2,2023-01-02,ES,Short,-5,1\n3,2023-01-03,NQ,Long,7,1\n"
+        full = b"Id,Date,Symbol,Type,PnL,Fees\n1,2023-01-01,ES,Long,10,1\n2,2023-01-02,ES,Short,-5,1\n3,2023-01-03,NQ,Long,7,1\n"
+        base = self.store.add("base", load_trades(io.BytesIO(csv)))
+        base.aggregates()  # appends merge existing aggregates incrementally
+
+        appended, added, duplicates = base.append(load_trades(io.BytesIO(more)), "appended")
+        self.assertEqual((added, duplicates), (1, 1))
+        self.assertEqual(len(appended), 3)
+        self.assertEqual(len(base), 2)
+
+        expected = self.store.add("full", load_trades(io.BytesIO(full)))
+        self.assertEqual(appended.summary(), calculate_stats(expected.df))
+        self.assertEqual(appended.stats()["charts"], expected.stats()["charts"])
+
+        again, added, duplicates = appended.append(load_trades(io.BytesIO(more)), "again")
+        self.assertIs(again, appended)
+        self.assertEqual((added, duplicates), (0, 2))
+
+    def test_append_backfilled_days(self):
+        csv = b"Id,Date,PnL\n5,2023-01-05,10\n"
+        older = b"Id,Date,PnL\n1,2023-01-01,-4\n"
+        base = self.store.add("base", load_trades(io.BytesIO(csv)))
+        base.aggregates()
+        appended, added, _ = base.append(load_trades(io.BytesIO(older)), "appended")
+        self.assertEqual(added, 1)
+        self.assertEqual(appended.df['Date'].to_list(), [date(2023, 1, 1), date(2023, 1, 5)])
+        daily = appended.stats()["charts"]["daily_pnl"]
+        self.assertEqual([d["CumulativePnL"] for d in daily], [-4.0, 6.0])
+
+    def test_append_keeps_trades_without_id(self):
+        csv = b"Id,Date,PnL\n1,2023-01-01,10\n,2023-01-01,5\n"
+        more = b"Id,Date,PnL\n1,2023-01-01,10\n,2023-01-02,-3\n,2023-01-02,-3\n2,2023-01-03,4\n2,2023-01-03,4\n"
+        base = self.store.add("base", load_trades(io.BytesIO(csv)))
+        appended, added, duplicates = base.append(load_trades(io.BytesIO(more)), "appended")
+        self.assertEqual((added, duplicates), (3, 1))
+        self.assertEqual(appended.df['PnL'].to_list(), [10.0, 5.0, -3.0, -3.0, 4.0])
+
+    def test_append_upload_merges_seeded_aggregates(self):
+        csv = b"Id,Date,Symbol,Duration,PnL\n1,2023-01-01,ES,30,10\n2,2023-01-02,NQ,400,-5\n"
+        more = b"Id,Date,Symbol,Duration,PnL\n2,2023-01-02,NQ,400,-5\n3,2023-01-03,CL,90,7\n"
+        full = b"Id,Date,Symbol,Duration,PnL\n1,2023-01-01,ES,30,10\n2,2023-01-02,NQ,400,-5\n3,2023-01-03,CL,90,7\n"
+        with mock.patch.object(datasets, "_store", DatasetStore()), \
+                mock.patch.object(cache, "_cache", ResultCache()):
+            base_id = executor.process_bytes(csv, include_data=False).headers["X-Dataset-Id"]
+            # The upload seeds the aggregates: the append never rescans the history
+            with mock.patch.object(datasets.Dataset, "_values", side_effect=AssertionError("full scan")):
+                result = append_upload(base_id, more)
+        self.assertEqual((result["added"], result["duplicates"], result["rows"]), (1, 1, 3))
+        self.assertEqual(result["symbols"], ["CL", "ES", "NQ"])
+
+        expected = self.store.add("full", load_trades(io.BytesIO(full))).stats()
+        self.assertEqual(result["stats"], expected["stats"])
+        self.assertEqual(result["charts"], {name: expected["charts"][name]
+                                            for name in ("daily_pnl", "duration_distribution")})
+
+    def test_appended_dataset_outlives_the_store(self):
+        csv = b"Id,Date,PnL\n1,2023-01-01,10\n"
+        more = b"Id,Date,PnL\n2,2023-01-02,-4\n"
+        latest = b"Id,Date,PnL\n3,2023-01-03,6\n"
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch.object(datasets, "_store", DatasetStore()), \
+                    mock.patch.object(cache, "_cache", ResultCache(directory=tmp)):
+                cache.get_cache().put("base", load_trades(io.BytesIO(csv)), {})
+                first = append_upload("base", more)
+                self.assertEqual(first["stats"]["summary"]["total_trades"], 2)
+                second = append_upload(first["dataset_id"], latest)
+                # Evicted
+                datasets.get_store().discard(second["dataset_id"])
+                rehydrated = datasets.get_store().get(second["dataset_id"])
+                self.assertEqual(rehydrated.df['PnL'].to_list(), [10.0, -4.0, 6.0])
+                # Recorded as recipes, not frames
+                self.assertIsNone(cache.get_cache().get(second["dataset_id"]))
+
+            # Asked of another worker: the appends are replayed onto the upload
+            with mock.patch.object(datasets, "_store", DatasetStore()), \
+                    mock.patch.object(cache, "_cache", ResultCache(directory=tmp)):
+                rehydrated = datasets.get_store().get(second["dataset_id"])
+                self.assertEqual(rehydrated.df['PnL'].to_list(), [10.0, -4.0, 6.0])
+                self.assertEqual(rehydrated.summary(), second["stats"])
+
+    def test_append_requires_id(self):
+        with self.assertRaises(ValueError):
+            self.dataset.append(self.df, "other")
+
+    def test_unknown_dataset(self):
+        with self.assertRaises(DatasetNotFoundError):
+            self.store.get("missing-" + "0" * 56)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import io
+import unittest
+
+import numpy as np
+import polars as pl
+
+from core.datasets import DatasetStore
+from core.downsample import check_max_points, decimate, density
+from core.processor import load_trades, prepare_charts_data
+from core.synthetic import generate_trades
+
+
+class TestDownsample(unittest.TestCase):
+    def setUp(self):
+        walk = np.random.default_rng(3).normal(0, 1, 5000).cumsum()
+        self.curve = pl.DataFrame({'Day': np.arange(5000), 'CumulativePnL': walk})
+
+    def test_decimate_keeps_extremes(self):
+        out = decimate(self.curve, 'CumulativePnL', 200)
+        self.assertLessEqual(out.height, 200)
+        self.assertEqual(out['Day'].to_list(), sorted(out['Day'].to_list()))
+        self.assertEqual(out['Day'][0], 0)
+        self.assertEqual(out['Day'][-1], 4999)
+        self.assertEqual(out['CumulativePnL'].min(), self.curve['CumulativePnL'].min())
+        self.assertEqual(out['CumulativePnL'].max(), self.curve['CumulativePnL'].max())
+        # Every kept point is a real row
+        self.assertEqual(out.join(self.curve, on=['Day', 'CumulativePnL']).height, out.height)
+        self.assertTrue(decimate(self.curve, 'CumulativePnL', None).equals(self.curve))
+        self.assertTrue(decimate(self.curve.head(100), 'CumulativePnL', 200).equals(self.curve.head(100)))
+
+    def test_density(self):
+        rng = np.random.default_rng(1)
+        points = pl.DataFrame({'Duration': rng.uniform(1, 3600, 20000), 'NetPnL': rng.normal(0, 50, 20000)})
+        out = density(points, 'Duration', 'NetPnL', 400)
+        self.assertLessEqual(out.height, 400)
+        self.assertEqual(out['count'].sum(), 20000)
+        self.assertAlmostEqual((out['NetPnL'] * out['count']).sum() / 20000, points['NetPnL'].mean(), places=1)
+        self.assertEqual(density(points.head(10), 'Duration', 'NetPnL', 400).columns, ['Duration', 'NetPnL'])
+        # Degenerate axis: all points in one column of cells
+        flat = points.with_columns(pl.lit(60.0).alias('Duration'))
+        self.assertEqual(density(flat, 'Duration', 'NetPnL', 400)['Duration'].unique().to_list(), [60.0])
+
+    def test_charts_bounded(self):
+        df = load_trades(io.BytesIO(generate_trades(5000, seed=2).write_csv().encode()))
+        full = prepare_charts_data(df)
+        charts = prepare_charts_data(df, max_points=64)
+        self.assertLessEqual(len(charts["daily_pnl"]), 64)
+        self.assertLessEqual(len(charts["duration_scatter"]), 64)
+        self.assertEqual(charts["daily_pnl"][-1], full["daily_pnl"][-1])
+        self.assertEqual(sum(p["count"] for p in charts["duration_scatter"]), len(full["duration_scatter"]))
+        self.assertEqual(charts["duration_distribution"], full["duration_distribution"])
+        with self.assertRaises(ValueError):
+            check_max_points(1)
+
+    def test_zoom_refines(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        df = load_trades(io.BytesIO(generate_trades(5000, seed=2).write_csv().encode()))
+        dataset = DatasetStore().add("ds", df)
+        whole = dataset.stats(max_points=32)["charts"]["daily_pnl"]
+        end = df['Date'].min().replace(day=28)
+        zoomed = dataset.stats(df['Date'].min(), end, max_points=32)["charts"]["daily_pnl"]
+        self.assertLessEqual(len(whole), 32)
+        self.assertEqual(len(zoomed), df.filter(pl.col('Date') <= end)['Date'].n_unique())
+
+        csv = generate_trades(2000, seed=5).write_csv().encode()
+        with TestClient(app) as client:
+            r = client.post("/upload?include_data=false&max_points=50", files={"file": ("t.csv", csv, "text/csv")})
+            self.assertEqual(r.status_code, 200)
+            self.assertLessEqual(len(r.json()["charts"]["duration_scatter"]), 50)
+            dataset_id = r.json()["dataset_id"]
+            r = client.get(f"/datasets/{dataset_id}/stats?max_points=50&start=2025-01-01&format=columnar")
+            self.assertLessEqual(len(r.json()["charts"]["duration_scatter"]["count"]), 50)
+            self.assertEqual(client.get(f"/datasets/{dataset_id}/stats?max_points=2").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
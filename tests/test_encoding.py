@@ -0,0 +1,47 @@
+import gzip
+import io
+import json
+import unittest
+from datetime import date
+import polars as pl
+from core import encoding
+from core.encoding import negotiate_format, negotiate_encoding, encode_json, encode_arrow, columnar
+
+
+class TestEncoding(unittest.TestCase):
+    def test_negotiate_format(self):
+        self.assertEqual(negotiate_format(None), 'rows')
+        self.assertEqual(negotiate_format('application/json'), 'rows')
+        self.assertEqual(negotiate_format('application/vnd.apache.arrow.stream'), 'arrow')
+        self.assertEqual(negotiate_format('application/vnd.apache.arrow.stream', 'columnar'), 'columnar')
+        with self.assertRaises(ValueError):
+            negotiate_format(None, 'xml')
+
+    def test_negotiate_encoding(self):
+        self.assertIsNone(negotiate_encoding(None))
+        self.assertIsNone(negotiate_encoding('identity'))
+        self.assertEqual(negotiate_encoding('gzip;q=1.0, deflate'), 'gzip')
+
+    def test_json_roundtrip_with_compression(self):
+        payload = {"Date": date(2024, 1, 2), "rows": [{"PnL": 1.5}] * 1000}
+        small = encode_json({"a": 1}, 'gzip')
+        self.assertNotIn('Content-Encoding', small.headers)
+        big = encode_json(payload, 'gzip')
+        self.assertEqual(big.headers['Content-Encoding'], 'gzip')
+        decoded = json.loads(gzip.decompress(big.body))
+        self.assertEqual(decoded["Date"], "2024-01-02")
+        self.assertEqual(len(decoded["rows"]), 1000)
+
+    def test_arrow_stream(self):
+        df = pl.DataFrame({"Date": [date(2024, 1, 1)], "PnL": [10.0]})
+        encoded = encode_arrow(df)
+        self.assertEqual(encoded.media_type, encoding.ARROW_MEDIA_TYPE)
+        self.assertTrue(pl.read_ipc_stream(io.BytesIO(encoded.body)).equals(df))
+
+    def test_columnar(self):
+        self.assertEqual(columnar([{"a": 1, "b": 2}, {"a": 3, "b": 4}]), {"a": [1, 3], "b": [2, 4]})
+        self.assertEqual(columnar([]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from core import executor
+from core.executor import WorkerPool, PoolSaturatedError, JobTimeoutError
+from core.synthetic import export_csv
+
+
+def slow_add(a, b, delay=0.2):
+    time.sleep(delay)
+    return a + b
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_runs_job(self):
+        pool = WorkerPool(max_workers=2, queue_size=0)
+
+        async def main():
+            return await pool.run(slow_add, 1, 2, 0.0)
+
+        self.assertEqual(asyncio.run(main()), 3)
+        pool.shutdown()
+
+    def test_rejects_when_queue_full(self):
+        pool = WorkerPool(max_workers=1, queue_size=1, retry_after=7)
+
+        async def main():
+            jobs = [asyncio.ensure_future(pool.run(slow_add, i, i)) for i in range(3)]
+            return await asyncio.gather(*jobs, return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertEqual(results[:2], [0, 2])
+        self.assertIsInstance(results[2], PoolSaturatedError)
+        self.assertEqual(results[2].retry_after, 7)
+        self.assertEqual(pool.pending, 0)
+        pool.shutdown()
+
+    def test_timeout(self):
+        pool = WorkerPool(max_workers=1, queue_size=0, timeout=0.05)
+
+        async def main():
+            await pool.run(slow_add, 1, 1)
+
+        with self.assertRaises(JobTimeoutError):
+            asyncio.run(main())
+        pool.shutdown()
+
+    def test_process_pool_upload_keeps_dataset(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        pool = WorkerPool(kind="process", max_workers=1)
+        with mock.patch.object(executor, "_pool", pool), TestClient(app) as client:
+            r = client.post("/upload?include_data=false",
+                            files={"file": ("t.csv", export_csv(200, seed=9), "text/csv")})
+            self.assertEqual(r.status_code, 200)
+            # Registered in this process, not in the worker that processed it
+            info = client.get(f"/datasets/{r.json()['dataset_id']}")
+            self.assertEqual(info.status_code, 200)
+            self.assertEqual(info.json()["rows"], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
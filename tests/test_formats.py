@@ -0,0 +1,88 @@
+import io
+import unittest
+from datetime import date
+
+import polars as pl
+
+from core import processor
+from core.formats import DatetimeFormat, detect_datetime, detect_duration, duration_seconds
+from core.processor import load_trades, plan_trades
+from core.synthetic import export_csv
+
+TOPSTEPX = b"""Id,ContractName,EnteredAt,ExitedAt,Fees,PnL,Size,Type,TradeDay,TradeDuration
+1,MNQZ5,09/30/2025 23:50:00 -05:00,10/01/2025 01:05:30 -05:00,1.5,20.0,1,Long,09/30/2025 19:00:00 -05:00,1:15:30
+2,MNQZ5,10/01/2025 14:47:55 +01:00,10/01/2025 14:48:31 +01:00,1.5,-10.0,1,Short,09/30/2025 19:00:00 -05:00,0:00:36
+"""
+
+
+class TestDetection(unittest.TestCase):
+    def test_datetime_formats(self):
+        fmt = detect_datetime(pl.Series(['10/01/2025 14:47:55 +01:00']))
+        self.assertEqual(fmt[:3], ('%m/%d/%Y %H:%M:%S', True, 7))
+        fmt = detect_datetime(pl.Series(['2025-10-01T14:47:55.250Z']))
+        self.assertEqual(fmt[:4], ('%Y-%m-%dT%H:%M:%S%.f', True, 1, True))
+        # Month-first unless a value rules it out
+        self.assertEqual(detect_datetime(pl.Series(['01/02/2024'])).fmt, '%m/%d/%Y')
+        self.assertEqual(detect_datetime(pl.Series(['01/02/2024', '25/02/2024'])).fmt, '%d/%m/%Y')
+        self.assertIsNone(detect_datetime(pl.Series(['n/a'])))
+
+    def test_durations(self):
+        self.assertEqual(detect_duration(pl.Series(['60', '1.5'])).kind, 'seconds')
+        clock = pl.Series('d', ['0:00:36', '27:08:56', '1:3:08:56', '1.03:08:56', '0:00:01.5', 'x'])
+        fmt = detect_duration(clock)
+        self.assertEqual(fmt.kind, 'clock')
+        seconds = pl.DataFrame([clock]).select(duration_seconds('d', fmt)).to_series()
+        self.assertEqual(seconds.to_list(), [36.0, 97736.0, 97736.0, 97736.0, 1.5, None])
+
+
+class TestParsePlan(unittest.TestCase):
+    def test_topstepx_timestamps(self):
+        df = load_trades(io.BytesIO(TOPSTEPX))
+        # Offsets are honoured, durations span midnight
+        self.assertEqual(df['Duration'].to_list(), [4530.0, 36.0])
+        # Date is the local exit date; TradeDay is the session's trading date
+        self.assertEqual(df['Date'].to_list(), [date(2025, 10, 1)] * 2)
+        self.assertEqual(df['TradeDay'].to_list(), [date(2025, 10, 1)] * 2)
+
+    def test_durations_past_24h(self):
+        content = export_csv(20000, seed=1)
+        df = load_trades(io.BytesIO(content.replace(b'EnteredAt', b'OpenedAt').replace(b'ExitedAt', b'ClosedAt')))
+        raw = pl.read_csv(io.BytesIO(content), infer_schema=False)
+        self.assertGreater(df['Duration'].max(), 86400)
+        self.assertEqual(df['Duration'].null_count(), 0)
+        # Clock text agrees with the timestamps it was derived from
+        from_timestamps = load_trades(io.BytesIO(content))['Duration']
+        self.assertEqual(df['Duration'].to_list(), from_timestamps.to_list())
+        self.assertEqual(len(df), len(raw))
+
+    def test_plan_cached_per_header(self):
+        sample = pl.read_csv(io.BytesIO(TOPSTEPX), infer_schema=False)
+        plan = plan_trades(sample)
+        self.assertIs(plan_trades(sample), plan)
+        self.assertEqual(plan.formats['EnteredAt'], DatetimeFormat('%m/%d/%Y %H:%M:%S', True, 7, cache=False))
+        self.assertEqual(plan.overrides['TradeDuration'], pl.Utf8)
+
+        # Same header, different date layout: the plan is rebuilt
+        iso = sample.with_columns(pl.col('ExitedAt').str.replace(r'^(\d\d)/(\d\d)/(\d{4})', '$3-$1-$2'))
+        self.assertEqual(plan_trades(iso).formats['ExitedAt'].fmt, '%Y-%m-%d %H:%M:%S')
+        self.assertIn(tuple(sample.columns), processor._plans)
+
+    def test_dash_separated_dates(self):
+        # The year after the last dash is not a UTC offset
+        day_first = detect_datetime(pl.Series(['15-03-2024', '01-04-2024']))
+        self.assertEqual(day_first, DatetimeFormat('%d-%m-%Y', False))
+        self.assertEqual(detect_datetime(pl.Series(['03-15-2024', '04-01-2024'])), DatetimeFormat('%m-%d-%Y', False))
+        df = load_trades(io.BytesIO(b"Date,PnL\n15-03-2024,1.0\n16-03-2024,2.0\n"))
+        self.assertEqual(df['Date'].to_list(), [date(2024, 3, 15), date(2024, 3, 16)])
+        df = load_trades(io.BytesIO(b"Date,PnL\n03-15-2024,1.0\n03-16-2024,2.0\n"))
+        self.assertEqual(df['Date'].to_list(), [date(2024, 3, 15), date(2024, 3, 16)])
+        # Offsets need the same shape on every value
+        self.assertEqual(detect_datetime(pl.Series(['2025-10-01 14:47 +0100', '2025-10-01 15:00 -0500'])).offset_len, 6)
+
+    def test_unrecognized_date(self):
+        with self.assertRaises(ValueError):
+            load_trades(io.BytesIO(b"Date,PnL\nsoon,1.0\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
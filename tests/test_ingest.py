@@ -0,0 +1,76 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from core.batch import load_file
+from core.ingest import SAMPLE_BYTES, content_encoding, detect_encoding, spool_upload
+from core.processor import load_trades, load_trades_path
+
+CSV = """Date,Symbol,Direction,Duration,PnL,Fees
+01/05/2023 10:00,CAFÉ,Long,00:01:30,100.0,1
+01/06/2023 11:00,ES,Short,00:00:30,-40.0,1
+"""
+
+
+class TestIngest(unittest.TestCase):
+    def test_detect_encoding(self):
+        self.assertEqual(detect_encoding(CSV.encode('utf-8')), 'utf8')
+        self.assertEqual(detect_encoding(CSV.encode('latin-1')), 'latin-1')
+        # A sample cut inside a multi-byte character is still UTF-8
+        self.assertEqual(detect_encoding("É".encode('utf-8')[:1]), 'utf8')
+
+    def test_spool_transcodes_and_hashes_original_bytes(self):
+        raw = CSV.encode('latin-1')
+        hasher = hashlib.sha256()
+        path, encoding = spool_upload(io.BytesIO(raw), hasher)
+        try:
+            self.assertEqual(encoding, 'latin-1')
+            self.assertEqual(hasher.hexdigest(), hashlib.sha256(raw).hexdigest())
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read().decode('utf-8'), CSV)
+        finally:
+            os.remove(path)
+
+    def test_streaming_load_matches_in_memory(self):
+        raw = CSV.encode('latin-1')
+        path, _ = spool_upload(io.BytesIO(raw))
+        try:
+            streamed = load_trades_path(path)
+        finally:
+            os.remove(path)
+        in_memory = load_trades(io.BytesIO(raw))
+        self.assertTrue(streamed.equals(in_memory))
+        self.assertEqual(streamed['Symbol'].to_list(), ['CAFÉ', 'ES'])
+        self.assertEqual(streamed['Duration'].to_list(), [90.0, 30.0])
+
+    def test_legacy_byte_after_the_sample(self):
+        header, rows = CSV.split("\n", 1)
+        ascii_row = "01/06/2023 11:00,ES,Short,00:00:30,-40.0,1\n"
+        count = SAMPLE_BYTES // len(ascii_row) + 100
+        raw = (header + "\n" + ascii_row * count + "01/07/2023 09:00,Caf\xe9,Long,00:01:00,5.0,1\n").encode('latin-1')
+        self.assertEqual(detect_encoding(raw[:SAMPLE_BYTES]), 'utf8')
+        self.assertEqual(content_encoding(raw), 'latin-1')
+
+        in_memory = load_trades(io.BytesIO(raw))
+        self.assertEqual(len(in_memory), count + 1)
+        self.assertEqual(in_memory['Symbol'][-1], 'Café')
+
+        path, encoding = spool_upload(io.BytesIO(raw))
+        try:
+            self.assertEqual(encoding, 'latin-1')
+            self.assertTrue(load_trades_path(path).equals(in_memory))
+        finally:
+            os.remove(path)
+
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        try:
+            self.assertTrue(load_file(path).equals(in_memory))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core.metrics import Histogram, Metrics, profiling, server_timing, stage
+from core.processor import process_csv
+
+CSV = b"""Date,Symbol,Direction,Duration,PnL
+2023-01-01,AAPL,Long,60,100.0
+2023-01-02,GOOG,Short,120,-50.0
+"""
+
+
+class TestProfiling(unittest.TestCase):
+    def test_records_pipeline_stages(self):
+        with profiling() as profile:
+            process_csv(io.BytesIO(CSV))
+        stages = {s.name: s for s in profile.stages}
+
+        self.assertEqual(list(stages), ["detect_formats", "read_csv", "normalize", "calculate_stats", "prepare_charts_data", "make_response"])
+        self.assertEqual(stages["read_csv"].bytes_in, len(CSV))
+        self.assertEqual(stages["read_csv"].rows, 2)
+        self.assertEqual(profile.info["rows"], 2)
+        self.assertEqual(profile.info["encoding"], "utf8")
+        self.assertGreaterEqual(profile.seconds, sum(s.seconds for s in profile.stages))
+
+    def test_inactive_without_profile(self):
+        with stage("orphan") as s:
+            pass
+        self.assertEqual(s.seconds, 0.0)
+
+    def test_dumps_debug_profile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch.dict(os.environ, {"UPLOAD_PROFILE": "1", "UPLOAD_PROFILE_DIR": tmp}):
+                with profiling("job"):
+                    process_csv(io.BytesIO(CSV))
+            files = sorted(os.listdir(tmp))
+        self.assertEqual([os.path.splitext(f)[1] for f in files], [".json", ".prof"])
+        self.assertTrue(files[0].endswith("-job.json"))
+
+    def test_server_timing(self):
+        header = server_timing([{"name": "read_csv", "seconds": 0.0125}], total=0.02)
+        self.assertEqual(header, "read_csv;dur=12.50, total;dur=20.00")
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_exposition(self):
+        h = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        h.observe(0.05, stage="a")
+        h.observe(0.5, stage="a")
+        h.observe(5.0, stage="a")
+        lines = h.render()
+        self.assertIn('latency_seconds_bucket{stage="a",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{stage="a",le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{stage="a",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_count{stage="a"} 3', lines)
+
+    def test_observe_upload(self):
+        metrics = Metrics()
+        profile = {"seconds": 0.2, "stages": [{"name": "read_csv", "seconds": 0.1}],
+                   "info": {"rows": 10, "cache_hit": False}}
+        metrics.observe_upload(profile, 0.3, bytes_in=100, bytes_out=50)
+        self.assertEqual(metrics.rows.value(), 10)
+        self.assertEqual(metrics.cache.value(result="miss"), 1)
+        self.assertEqual(metrics.stage_seconds.count(stage="read_csv"), 1)
+        self.assertIn("# TYPE upload_duration_seconds histogram", metrics.render())
+
+
+class TestEndpoints(unittest.TestCase):
+    def test_upload_server_timing_and_metrics(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        csv = CSV + b"2023-01-03,MSFT,Long,30,12.5\n"  # not cached by other tests
+        with TestClient(app) as client:
+            r = client.post("/upload", files={"file": ("t.csv", csv, "text/csv")})
+            self.assertEqual(r.status_code, 200)
+            timing = r.headers["Server-Timing"]
+            for name in ("queue", "read_csv", "calculate_stats", "serialize", "total"):
+                self.assertIn(f"{name};dur=", timing)
+
+            body = client.get("/metrics").text
+        self.assertIn('upload_stage_duration_seconds_count{stage="read_csv"}', body)
+        self.assertIn('http_request_duration_seconds_count{method="POST",route="/upload",status="200"}', body)
+
+
+if __name__ == "__main__":
+    unittest.main()
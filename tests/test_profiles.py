@@ -0,0 +1,51 @@
+import io
+import unittest
+
+import polars as pl
+
+from core.processor import load_trades, plan_trades
+from core.profiles import TOPSTEPX, match_profile
+from core.synthetic import generate_trades
+
+
+def with_extra_columns(df: pl.DataFrame, count: int) -> bytes:
+    extra = df.with_columns([pl.lit('x' * 20).alias(f'Note{i}') for i in range(count)])
+    return extra.write_csv().encode()
+
+
+class TestProfiles(unittest.TestCase):
+    def test_match_by_header(self):
+        header = tuple(generate_trades(1).columns)
+        self.assertIs(match_profile(header), TOPSTEPX)
+        self.assertIs(match_profile(header + ('Account',)), TOPSTEPX)
+        self.assertIsNone(match_profile(('Date', 'Symbol', 'PnL')))
+        self.assertIsNone(match_profile(tuple(c for c in header if c != 'PnL')))
+
+    def test_wide_export_reads_profile_columns_only(self):
+        raw = generate_trades(200, seed=2)
+        df = load_trades(io.BytesIO(with_extra_columns(raw, 30)))
+        plain = load_trades(io.BytesIO(raw.write_csv().encode()))
+
+        self.assertTrue(df.equals(plain))
+        self.assertFalse(any(c.startswith('Note') for c in df.columns))
+        self.assertEqual(df.schema['Id'], pl.Int64)
+        self.assertEqual(df.schema['EntryPrice'], pl.Float64)
+
+    def test_plan_uses_profile(self):
+        sample = pl.read_csv(io.BytesIO(with_extra_columns(generate_trades(5), 2)), infer_schema=False)
+        plan = plan_trades(sample)
+        self.assertIs(plan.profile, TOPSTEPX)
+        self.assertEqual(plan.projection, list(TOPSTEPX.columns))
+        self.assertEqual(plan.overrides['Size'], pl.Int64)
+        self.assertEqual(plan.overrides['EnteredAt'], pl.Utf8)
+
+    def test_unknown_layout_keeps_all_columns(self):
+        csv = b"Date,Symbol,PnL,Note\n2024-01-02,ES,10.0,a\n"
+        plan = plan_trades(pl.read_csv(io.BytesIO(csv), infer_schema=False))
+        self.assertIsNone(plan.profile)
+        self.assertIsNone(plan.projection)
+        self.assertIn('Note', load_trades(io.BytesIO(csv)).columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
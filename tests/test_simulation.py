@@ -0,0 +1,93 @@
+import io
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from core import simulation
+from core.datasets import DatasetStore
+from core.processor import load_trades
+from core.simulation import SimulationParams, run_paths, simulate, simulate_chunk
+
+
+def naive_path(pnl, draws, params):
+    """Reference for one path: plain loop over the drawn trades."""
+    equity = peak = max_drawdown = 0.0
+    for i, k in enumerate(draws):
+        equity += pnl[k]
+        peak = max(peak, equity)
+        max_drawdown = min(max_drawdown, equity - peak)
+        floor = -params.account_size
+        if params.trailing_drawdown is not None:
+            trailing = peak - params.trailing_drawdown
+            floor = max(min(trailing, 0.0) if params.lock_at_start else trailing, floor)
+        if equity <= floor:
+            return equity, max_drawdown, i
+    return equity, max_drawdown, -1
+
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        self.pnl = np.random.default_rng(7).normal(10, 150, 500)
+
+    def test_matches_naive_paths(self):
+        for params in (SimulationParams(paths=20, trades=200, trailing_drawdown=600),
+                       SimulationParams(paths=20, trades=200, trailing_drawdown=600, lock_at_start=False),
+                       SimulationParams(paths=20, trades=200, account_size=500, trailing_drawdown=None)):
+            seed = np.random.SeedSequence(3)
+            final, drawdown, ruin_at = simulate_chunk(self.pnl, 20, params, seed)
+            draws = np.random.default_rng(seed).integers(0, len(self.pnl), size=(20, 200), dtype=np.int32)
+            for i in range(20):
+                expected = naive_path(self.pnl, draws[i], params)
+                self.assertAlmostEqual(final[i], expected[0])
+                self.assertAlmostEqual(drawdown[i], expected[1])
+                self.assertEqual(ruin_at[i], expected[2])
+
+    def test_seeded_chunks(self):
+        params = SimulationParams(paths=300, trades=100, seed=5).validate(len(self.pnl))
+        whole = run_paths(self.pnl, params, workers=1)
+        with mock.patch.object(simulation, 'CHUNK_CELLS', 1000):
+            chunked = run_paths(self.pnl, params, workers=1)
+        # Chunks draw from their own streams: same distribution, not the same paths
+        self.assertEqual(len(chunked[0]), 300)
+        self.assertNotEqual(whole[0].tolist(), chunked[0].tolist())
+        self.assertEqual(run_paths(self.pnl, params, workers=1)[0].tolist(), whole[0].tolist())
+
+    def test_summary(self):
+        result = simulate(self.pnl, SimulationParams(paths=2000, seed=1, trailing_drawdown=1000))
+        self.assertEqual(result["params"]["trades"], 500)
+        self.assertEqual(sum(b["count"] for b in result["histogram"]), 2000)
+        self.assertLessEqual(result["final_pnl"]["p5"], result["final_pnl"]["p95"])
+        self.assertLessEqual(result["max_drawdown"]["p95"], 0)
+        self.assertTrue(0 < result["risk_of_ruin"] < 100)
+        # No drawdown rule and a huge account: nobody fails
+        safe = simulate(self.pnl, SimulationParams(paths=200, account_size=1e9, trailing_drawdown=None))
+        self.assertEqual(safe["risk_of_ruin"], 0.0)
+        self.assertIsNone(safe["median_trades_to_ruin"])
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            simulate(np.array([]))
+        with self.assertRaises(ValueError):
+            simulate(self.pnl, SimulationParams(paths=simulation.MAX_PATHS + 1))
+        with self.assertRaises(ValueError):
+            simulate(self.pnl, SimulationParams(paths=100_000, trades=100_000))
+
+    def test_dataset_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        csv = b"Date,Symbol,PnL\n2024-01-01,ES,100\n2024-01-02,ES,-80\n2024-01-03,ES,30\n"
+        dataset = DatasetStore().add("ds", load_trades(io.BytesIO(csv)))
+        self.assertEqual(dataset.simulate(params=SimulationParams(paths=10))["params"]["trades"], 3)
+
+        with TestClient(app) as client:
+            dataset_id = client.post("/upload", files={"file": ("t.csv", csv, "text/csv")}).json()["dataset_id"]
+            r = client.get(f"/datasets/{dataset_id}/simulate?paths=500&trades=50&trailing_drawdown=0")
+            self.assertEqual(r.status_code, 200)
+            self.assertIsNone(r.json()["params"]["trailing_drawdown"])
+            self.assertEqual(client.get(f"/datasets/{dataset_id}/simulate?paths=0").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
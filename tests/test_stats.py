@@ -0,0 +1,56 @@
+import json
+import os
+import unittest
+from datetime import date
+import polars as pl
+from core.processor import load_trades, build_results, calculate_stats, prepare_charts_data
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+GOLDEN = os.path.join(os.path.dirname(__file__), 'fixtures', 'stats_golden.json')
+
+
+class TestStatsRegression(unittest.TestCase):
+    """Stats engine output must match what the original per-filter
+    implementation produced (tests/fixtures/stats_golden.json)."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join(ROOT, 'data', 'trades_export_with_fake_data.csv'), 'rb') as f:
+            df = load_trades(f)
+        cls.cases = {
+            'full': df,
+            'november': df.filter(pl.col('Date').is_between(date(2025, 11, 1), date(2025, 11, 30))),
+            'empty': df.head(0),
+        }
+        with open(GOLDEN) as f:
+            cls.golden = json.load(f)
+
+    def assertChartsEqual(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        for name in expected:
+            self.assertEqual(len(actual[name]), len(expected[name]), name)
+            for a, e in zip(actual[name], expected[name]):
+                # New fields may be added to chart points; existing ones must not change
+                self.assertLessEqual(e.keys(), a.keys())
+                for key in e:
+                    if isinstance(e[key], float):
+                        self.assertAlmostEqual(a[key], e[key], places=9)
+                    else:
+                        self.assertEqual(a[key], e[key])
+
+    def test_matches_golden_output(self):
+        for name, df in self.cases.items():
+            with self.subTest(name):
+                results = build_results(df)
+                self.assertEqual(results['stats'], self.golden[name]['stats'])
+                self.assertChartsEqual(results['charts'], self.golden[name]['charts'])
+
+    def test_standalone_functions_match_build_results(self):
+        df = self.cases['full']
+        results = build_results(df)
+        self.assertEqual(calculate_stats(df), results['stats'])
+        self.assertEqual(prepare_charts_data(df), results['charts'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import polars as pl
+
+from core import streaming
+from core.encoding import dumps
+from core.processor import build_results, load_trades, make_response
+from core.streaming import read_records
+from core.synthetic import generate_trades
+
+
+def parse_events(body: bytes):
+    events = []
+    for block in body.decode().strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+class TestStreaming(unittest.TestCase):
+    def write(self, content: bytes) -> str:
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        return path
+
+    def test_read_records_keeps_quoted_newlines(self):
+        content = b'a,b\n1,"x\ny"\n2,z\n3,"p\n\nq"\n4,w'
+        for size in (1, 3, 7, 100):
+            chunks = list(read_records(self.write(content), size))
+            self.assertEqual(b"".join(c[1] for c in chunks), content[4:])
+            self.assertEqual(chunks[-1][2], len(content))
+            parsed = pl.concat([pl.read_csv(io.BytesIO(header + records)) for header, records, _ in chunks])
+            self.assertTrue(parsed.equals(pl.read_csv(io.BytesIO(content))))
+
+    def test_events_and_final_result(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        csv = generate_trades(3000, seed=77).write_csv().encode()
+        expected_df = load_trades(io.BytesIO(csv))
+        expected = make_response(expected_df, build_results(expected_df), include_data=True)
+
+        with TestClient(app) as client, mock.patch.object(streaming, 'chunk_size', return_value=40_000):
+            r = client.post("/upload/stream", files={"file": ("t.csv", csv, "text/csv")})
+            self.assertEqual(r.status_code, 200)
+            self.assertTrue(r.headers["content-type"].startswith("text/event-stream"))
+            events = parse_events(r.content)
+
+            names = [name for name, _ in events]
+            self.assertGreater(names.count("progress"), 3)
+            self.assertEqual(names[-4:], ["stats", "daily", "charts", "result"])
+            progress = [data for name, data in events if name == "progress"]
+            self.assertEqual(progress[-1], {"bytes_parsed": len(csv), "bytes_total": len(csv), "rows": 3000})
+            self.assertEqual([p["rows"] for p in progress], sorted(p["rows"] for p in progress))
+            partial = [data for name, data in events if name == "partial"]
+            self.assertLess(partial[0]["stats"]["summary"]["total_trades"], 3000)
+
+            result = events[-1][1]
+            self.assertEqual({k: v for k, v in result.items() if k != "dataset_id"}, json.loads(dumps(expected)))
+            self.assertEqual(events[-4][1], result["stats"])
+            self.assertEqual(events[-3][1], result["charts"]["daily_pnl"])
+
+            # Same dataset ID as /upload, which now hits the cache
+            upload = client.post("/upload", files={"file": ("t.csv", csv, "text/csv")}).json()
+            self.assertEqual(upload["dataset_id"], result["dataset_id"])
+            cached = parse_events(client.post("/upload/stream?include_data=false&max_points=20",
+                                              files={"file": ("t.csv", csv, "text/csv")}).content)
+            self.assertEqual([name for name, _ in cached], ["progress", "stats", "daily", "charts", "result"])
+            self.assertLessEqual(len(cached[-1][1]["charts"]["duration_scatter"]), 20)
+            self.assertNotIn("data", cached[-1][1])
+
+    def test_errors(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        with TestClient(app) as client:
+            r = client.post("/upload/stream", files={"file": ("t.csv", b"Foo,Bar\n1,2\n", "text/csv")})
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(parse_events(r.content)[-1][0], "error")
+            self.assertEqual(client.post("/upload/stream", files={"file": ("t.txt", b"x", "text/plain")}).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
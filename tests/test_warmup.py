@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import core.warmup
+import serve
+from benchmarks.startup import run_case
+from core.cache import get_cache
+from core.datasets import get_store
+from core.synthetic import export_csv
+from core.warmup import warmup, warmup_enabled
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(core.warmup.__file__)))
+
+
+class TestWarmup(unittest.TestCase):
+    def test_app_import_is_light(self):
+        code = "import sys, main; print(','.join(m for m in ('polars', 'numpy') if m in sys.modules))"
+        out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "")
+
+    def test_warmup_leaves_no_state(self):
+        store, cache = len(get_store()), len(get_cache())
+        timings = warmup(rows=100)
+        self.assertEqual(list(timings), ["import", "upload", "dataset"])
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+        self.assertEqual((len(get_store()), len(get_cache())), (store, cache))
+
+    def test_enabled_from_environment(self):
+        with mock.patch.dict(os.environ, {"APP_WARMUP": "1"}):
+            self.assertTrue(warmup_enabled())
+        with mock.patch.dict(os.environ, {"APP_WARMUP": "0"}):
+            self.assertFalse(warmup_enabled())
+
+    def test_startup_warms_up(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        with mock.patch.dict(os.environ, {"APP_WARMUP": "1", "APP_WARMUP_ROWS": "100"}), TestClient(app) as client:
+            self.assertIn('app_warmup_duration_seconds{step="upload"}', client.get("/metrics").text)
+
+    def test_startup_benchmark_case(self):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "wb") as f:
+            f.write(export_csv(300, seed=2))
+        self.addCleanup(os.remove, path)
+        result = run_case(path)
+        self.assertEqual(set(result["timings"]), {"import_main", "startup", "first_upload", "second_upload",
+                                                  "first_dataset", "first_response"})
+
+
+class TestServe(unittest.TestCase):
+    def launch(self, *argv):
+        env = {k: v for k, v in os.environ.items() if k not in ("RESULT_CACHE_DIR", "APP_WARMUP")}
+        with mock.patch.dict(os.environ, env, clear=True), mock.patch("uvicorn.run") as run:
+            serve.main(list(argv))
+            return run.call_args, dict(os.environ)
+
+    def test_workers_share_a_result_cache(self):
+        call, env = self.launch("--workers", "3")
+        self.assertEqual(call.args, ("main:app",))
+        self.assertEqual(call.kwargs["workers"], 3)
+        self.assertEqual(env["RESULT_CACHE_DIR"], serve.DEFAULT_CACHE_DIR)
+        self.assertEqual(env["APP_WARMUP"], "1")
+
+    def test_single_worker_serves_in_process(self):
+        call, env = self.launch("--workers", "1", "--no-warmup")
+        self.assertNotIsInstance(call.args[0], str)
+        self.assertNotIn("RESULT_CACHE_DIR", env)
+        self.assertEqual(env["APP_WARMUP"], "0")
+
+
+if __name__ == '__main__':
+    unittest.main()